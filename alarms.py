@@ -0,0 +1,97 @@
+"""The CloudWatch alarms the monitoring tier can create, with their default thresholds"""
+
+import dataclasses
+
+
+@dataclasses.dataclass(frozen=True)
+class AlarmSpec:
+    """One alarm on one metric of one of the stack's resources.
+
+    `resource` names what the dimensions come from (see Monitoring); resources the
+    stack has several of, like read replicas, get one alarm each. Thresholds are
+    in the metric's unit, except when `relative_to` is set: they are then a
+    percentage of that stack setting, like the Lambda timeout.
+    """
+
+    resource: str
+    namespace: str
+    metric: str
+    statistic: str
+    comparison: str
+    threshold: float
+    description: str
+    relative_to: str = None
+    evaluation_periods: int = 3
+    datapoints_to_alarm: int = 2
+
+
+_ABOVE = "GreaterThanThreshold"
+_AT_LEAST = "GreaterThanOrEqualToThreshold"
+_BELOW = "LessThanThreshold"
+
+# Alarm name -> spec, the defaults every stack starts from
+ALARMS = {
+    "albLatencyP95": AlarmSpec("targetGroup", "AWS/ApplicationELB", "TargetResponseTime", "p95", _ABOVE, 0.5,
+                               "p95 response time of the web app in seconds"),
+    "albLatencyP99": AlarmSpec("targetGroup", "AWS/ApplicationELB", "TargetResponseTime", "p99", _ABOVE, 1.5,
+                               "p99 response time of the web app in seconds"),
+    "albTarget5xx": AlarmSpec("targetGroup", "AWS/ApplicationELB", "HTTPCode_Target_5XX_Count", "Sum", _ABOVE, 10,
+                              "5xx responses from the web app per period"),
+    "albElb5xx": AlarmSpec("loadBalancer", "AWS/ApplicationELB", "HTTPCode_ELB_5XX_Count", "Sum", _ABOVE, 10,
+                           "5xx responses generated by the load balancer itself per period"),
+    "albUnhealthyHosts": AlarmSpec("targetGroup", "AWS/ApplicationELB", "UnHealthyHostCount", "Maximum", _AT_LEAST, 1,
+                                   "targets failing the health check"),
+    "asgCpu": AlarmSpec("autoScalingGroup", "AWS/EC2", "CPUUtilization", "Average", _ABOVE, 80,
+                        "average CPU of the web instances in percent"),
+    "rdsCpu": AlarmSpec("dbInstance", "AWS/RDS", "CPUUtilization", "Average", _ABOVE, 80,
+                        "database CPU in percent"),
+    "rdsConnections": AlarmSpec("dbInstance", "AWS/RDS", "DatabaseConnections", "Maximum", _ABOVE, 80,
+                                "open database connections", relative_to="maxConnections"),
+    "rdsReadLatencyP99": AlarmSpec("dbInstance", "AWS/RDS", "ReadLatency", "p99", _ABOVE, 0.02,
+                                   "p99 storage read latency in seconds"),
+    "rdsWriteLatencyP99": AlarmSpec("dbInstance", "AWS/RDS", "WriteLatency", "p99", _ABOVE, 0.05,
+                                    "p99 storage write latency in seconds"),
+    "rdsFreeStorage": AlarmSpec("dbInstance", "AWS/RDS", "FreeStorageSpace", "Minimum", _BELOW, 10,
+                                "free storage", relative_to="allocatedStorage"),
+    "rdsReplicaCpu": AlarmSpec("dbReplica", "AWS/RDS", "CPUUtilization", "Average", _ABOVE, 80,
+                               "read replica CPU in percent"),
+    "rdsReplicaLag": AlarmSpec("dbReplica", "AWS/RDS", "ReplicaLag", "Maximum", _ABOVE, 30,
+                               "replication lag of a read replica in seconds"),
+    "rdsProxyBorrowLatency": AlarmSpec("dbProxy", "AWS/RDS", "DatabaseConnectionsBorrowLatency", "Average", _ABOVE,
+                                       50000, "time the proxy waits for a pooled connection in microseconds"),
+    "rdsCpuCreditBalance": AlarmSpec("burstableDbInstance", "AWS/RDS", "CPUCreditBalance", "Minimum", _BELOW, 20,
+                                     "CPU credits left on a burstable instance class"),
+    "lambdaDurationP95": AlarmSpec("lambda", "AWS/Lambda", "Duration", "p95", _ABOVE, 50,
+                                   "p95 Lambda duration", relative_to="lambdaTimeout"),
+    "lambdaDurationP99": AlarmSpec("lambda", "AWS/Lambda", "Duration", "p99", _ABOVE, 80,
+                                   "p99 Lambda duration", relative_to="lambdaTimeout"),
+    "lambdaErrors": AlarmSpec("lambda", "AWS/Lambda", "Errors", "Sum", _AT_LEAST, 1,
+                              "failed Lambda invocations per period"),
+    "lambdaThrottles": AlarmSpec("lambda", "AWS/Lambda", "Throttles", "Sum", _AT_LEAST, 1,
+                                 "throttled Lambda invocations per period"),
+    "dynamoDbReadThrottles": AlarmSpec("table", "AWS/DynamoDB", "ReadThrottleEvents", "Sum", _AT_LEAST, 1,
+                                       "throttled reads on the table per period"),
+    "dynamoDbWriteThrottles": AlarmSpec("table", "AWS/DynamoDB", "WriteThrottleEvents", "Sum", _AT_LEAST, 1,
+                                        "throttled writes on the table per period"),
+    "daxCpu": AlarmSpec("daxCluster", "AWS/DAX", "CPUUtilization", "Average", _ABOVE, 80,
+                        "DAX cluster CPU in percent"),
+    "daxThrottles": AlarmSpec("daxCluster", "AWS/DAX", "ThrottledRequestCount", "Sum", _AT_LEAST, 1,
+                              "requests throttled by the DAX cluster per period"),
+    "cacheEngineCpu": AlarmSpec("cacheNode", "AWS/ElastiCache", "EngineCPUUtilization", "Average", _ABOVE, 80,
+                                "engine thread CPU of a cache node in percent"),
+    "cacheMemory": AlarmSpec("cacheNode", "AWS/ElastiCache", "DatabaseMemoryUsagePercentage", "Maximum", _ABOVE, 80,
+                             "memory used by a cache node's data in percent"),
+    "cacheEvictions": AlarmSpec("cacheNode", "AWS/ElastiCache", "Evictions", "Sum", _AT_LEAST, 1,
+                                "keys evicted from a cache node per period"),
+    "cloudFront5xxRate": AlarmSpec("distribution", "AWS/CloudFront", "5xxErrorRate", "Average", _ABOVE, 5,
+                                   "share of CloudFront responses that are 5xx in percent"),
+    "natPortAllocationErrors": AlarmSpec("natGateway", "AWS/NATGateway", "ErrorPortAllocation", "Sum", _AT_LEAST, 1,
+                                         "connections a NAT gateway could not allocate a source port to"),
+    "natPacketsDropped": AlarmSpec("natGateway", "AWS/NATGateway", "PacketsDropCount", "Sum", _ABOVE, 100,
+                                   "packets dropped by a NAT gateway per period"),
+    "sqsOldestMessageAge": AlarmSpec("queue", "AWS/SQS", "ApproximateAgeOfOldestMessage", "Maximum", _ABOVE, 300,
+                                     "age of the oldest buffered message in seconds"),
+    "sqsDeadLetters": AlarmSpec("deadLetterQueue", "AWS/SQS", "ApproximateNumberOfMessagesVisible", "Maximum",
+                                _AT_LEAST, 1, "messages moved to the dead-letter queue",
+                                evaluation_periods=1, datapoints_to_alarm=1),
+}
@@ -0,0 +1,69 @@
+"""Availability-zone lookups with a local on-disk cache"""
+
+import json
+import os
+import time
+
+import pulumi
+import pulumi_aws as aws
+
+from paths import CACHE_DIR
+
+
+def _cache_path(account_id: str, profile: str, region: str) -> str:
+    # AZ names map to different zones in every account, so entries are never shared across accounts or profiles
+    return os.path.join(CACHE_DIR, f"azs-{account_id}-{profile or 'default'}-{region}.json")
+
+
+def _read_cache(path: str, ttl: int):
+    try:
+        with open(path) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if time.time() - entry.get("fetchedAt", 0) > ttl:
+        return None
+    return entry.get("names")
+
+
+def _write_cache(path: str, entry: dict):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({**entry, "fetchedAt": time.time()}, f)
+    # Swap the file in atomically so concurrent previews never read a partial entry
+    os.replace(tmp_path, path)
+
+
+def get_availability_zones(region: str, account_id: str, profile: str, ttl: int,
+                           opts: pulumi.InvokeOptions = None) -> list:
+    """Return the region's available AZ names for the account behind `profile`.
+
+    Previews are served from the cache while it is younger than `ttl` seconds, so
+    they skip the provider invoke entirely. Updates always ask the provider and
+    refresh the cache. `opts` selects the provider, and so the region, of the lookup.
+    """
+    path = _cache_path(account_id, profile, region)
+    if ttl > 0 and pulumi.runtime.is_dry_run():
+        cached = _read_cache(path, ttl)
+        if cached is not None:
+            return cached
+
+    names = aws.get_availability_zones(state="available", opts=opts).names
+    if ttl > 0:
+        _write_cache(path, {"accountId": account_id, "profile": profile, "region": region, "names": names})
+    return names
+
+
+def select_availability_zones(names: list, count: int, preferred=None) -> list:
+    """Pick the AZs to fan out over: an explicit list if given, else the first `count`."""
+    if preferred:
+        unknown = [az for az in preferred if az not in names]
+        if unknown:
+            raise ValueError(f"Availability zones {unknown} are not available, choose from {names}")
+        return list(preferred)
+
+    if count < 1 or count > len(names):
+        raise ValueError(f"azCount must be between 1 and {len(names)}, got {count}")
+    return names[:count]
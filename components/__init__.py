@@ -0,0 +1,21 @@
+"""Component resources that make up the stack"""
+
+from components.base import StackComponent
+from components.networking import Networking
+from components.data import Data
+from components.cache import Cache
+from components.messaging import Messaging
+from components.compute import Compute
+from components.monitoring import Monitoring
+from components.gcp_storage import GcpStorage
+
+__all__ = [
+    "StackComponent",
+    "Networking",
+    "Data",
+    "Cache",
+    "Messaging",
+    "Compute",
+    "Monitoring",
+    "GcpStorage",
+]
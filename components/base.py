@@ -0,0 +1,30 @@
+"""Shared plumbing for the stack's component resources"""
+
+import pulumi
+
+
+class StackComponent(pulumi.ComponentResource):
+    """ComponentResource whose children keep the URNs they had as top-level resources.
+
+    The resources used to be declared directly in __main__.py, so every child is
+    aliased to the root stack to avoid replacing anything on existing stacks.
+    `region` is set on the copies of a tier created for the stack's extra regions.
+    """
+
+    TYPE = "pulumi_python:components:StackComponent"
+
+    def __init__(self, name: str, opts: pulumi.ResourceOptions = None, region: str = None):
+        self.region = region
+        super().__init__(self.TYPE, name, None, opts)
+
+    def child_name(self, name: str) -> str:
+        # A child's URN holds its parent's type but not the parent's name, so the copies
+        # of a tier in extra regions suffix their children's names to keep them apart
+        return f"{name}-{self.region}" if self.region else name
+
+    def child_opts(self, **kwargs) -> pulumi.ResourceOptions:
+        # Extra regions never had resources at the root, so there is nothing to alias
+        return pulumi.ResourceOptions(
+            parent=self,
+            aliases=None if self.region else [pulumi.Alias(parent=pulumi.ROOT_STACK_RESOURCE)],
+            **kwargs)
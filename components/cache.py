@@ -0,0 +1,73 @@
+"""ElastiCache (Redis or Valkey) read-through cache for the web app"""
+
+import pulumi
+import pulumi_aws as aws
+
+from components.base import StackComponent
+from settings import CACHE_ENGINE_VERSIONS, Settings
+
+CACHE_PORT = 6379
+
+
+class Cache(StackComponent):
+    """A replication group in the private subnets, reachable only from the app security group.
+
+    With more than one shard the group runs in cluster mode and clients connect
+    to its configuration endpoint, otherwise to the primary endpoint.
+    """
+
+    TYPE = "pulumi_python:components:Cache"
+
+    def __init__(self, name: str, settings: Settings,
+                 private_subnet_ids: list,
+                 cache_security_group: aws.ec2.SecurityGroup,
+                 parameter_path: str = None,
+                 opts: pulumi.ResourceOptions = None,
+                 region: str = None):
+        super().__init__(name, opts, region)
+
+        cluster_mode = settings.cache_shard_count > 1
+        engine_version = settings.cache_engine_version or CACHE_ENGINE_VERSIONS[settings.cache_engine]
+        engine_major = engine_version.split(".")[0]
+
+        self.subnet_group = aws.elasticache.SubnetGroup(self.child_name("cacheSubnetGroup"),
+            subnet_ids=private_subnet_ids,
+            description="Private subnets for the web app cache",
+            opts=self.child_opts())
+
+        self.replication_group = aws.elasticache.ReplicationGroup(self.child_name("cacheReplicationGroup"),
+            replication_group_id=f"{settings.identifier}-cache",
+            description="Read-through cache for the web app",
+            engine=settings.cache_engine,
+            engine_version=engine_version,
+            node_type=settings.cache_node_type,
+            port=CACHE_PORT,
+            cluster_mode="enabled" if cluster_mode else "disabled",
+            parameter_group_name=(f"default.{settings.cache_engine}{engine_major}.cluster.on"
+                                  if cluster_mode else None),
+            num_node_groups=settings.cache_shard_count,
+            replicas_per_node_group=settings.cache_replicas_per_shard,
+            # Failover needs a replica to promote
+            automatic_failover_enabled=cluster_mode or settings.cache_replicas_per_shard > 0,
+            multi_az_enabled=settings.cache_replicas_per_shard > 0,
+            at_rest_encryption_enabled=True,
+            subnet_group_name=self.subnet_group.name,
+            security_group_ids=[cache_security_group.id],
+            opts=self.child_opts())
+
+        self.host = (self.replication_group.configuration_endpoint_address if cluster_mode
+                     else self.replication_group.primary_endpoint_address)
+        self.port = CACHE_PORT
+
+        # In ssm mode the instances read the cache endpoint next to the database connection info
+        if parameter_path:
+            for key, value in (("cache-host", self.host), ("cache-port", str(CACHE_PORT))):
+                aws.ssm.Parameter(self.child_name(f"cacheParameter-{key}"),
+                    name=f"{parameter_path}/{key}",
+                    type="String",
+                    value=value,
+                    opts=self.child_opts())
+
+        self.register_outputs({
+            "cacheHost": self.host,
+        })
@@ -0,0 +1,738 @@
+"""Web app instances, load balancer, auto scaling and DNS"""
+
+import json
+
+import pulumi
+import pulumi_aws as aws
+
+from components.base import StackComponent
+from components.cache import Cache
+from components.data import Data
+from components.networking import Networking
+from settings import CacheBehavior, PredictiveScaling, Settings, StepScaling, TargetTrackingScaling, is_graviton
+from user_data import render_user_data
+
+# AWS managed CloudFront policies
+CACHING_DISABLED_POLICY_ID = "4135ea2d-6df8-44a3-9df3-4b5a84be39ad"
+ALL_VIEWER_ORIGIN_REQUEST_POLICY_ID = "216adef6-5c7f-47e4-b989-5492eafa07d3"
+
+# Fetches the database connection info the stack publishes to Parameter Store
+_SSM_PRELUDE = """
+PARAMETER_PATH="{parameter_path}"
+
+# Wait for the stack to publish the database connection info, RDS may still be creating
+for attempt in $(seq 1 120); do
+    PARAMS=$(aws ssm get-parameters-by-path --region {aws_region} --path "$PARAMETER_PATH" --with-decryption --query "Parameters[*].[Name,Value]" --output text)
+    echo "$PARAMS" | grep -q "^$PARAMETER_PATH/host" && break
+    sleep 15
+done
+
+param() {{
+    echo "$PARAMS" | awk -F '\\t' -v name="$PARAMETER_PATH/$1" '$1 == name {{ print $2 }}'
+}}
+"""
+
+
+def app_env(settings: Settings, db_env: dict, sns_topic_arn: str) -> dict:
+    """Environment for the web app's .env file, on top of the database entries.
+
+    AWS_REGION is the topic's region, which is the home region even for instances
+    running in one of the stack's extra regions.
+    """
+    return {
+        **db_env,
+        "PORT": settings.application_port,
+        "CSV_PATH": "/home/ec2-user/webapp/users.csv",
+        "SNS_TOPIC_ARN": sns_topic_arn,
+        "AWS_REGION": sns_topic_arn.split(":")[3],
+    }
+
+
+def inline_user_data(settings: Settings, data: Data, sns_topic_arn: str, cache: Cache = None) -> pulumi.Output:
+    def render(args):
+        host, read_host, port, username, password, *cache_endpoint = args
+        env = {
+            "DBHOST": host,
+            "DBREADHOST": read_host,
+            "DBPORT": port,
+            "DBUSER": username,
+            "DBPASS": password,
+            "DATABASE": settings.db_name,
+        }
+        if cache_endpoint:
+            env["CACHE_HOST"], env["CACHE_PORT"] = cache_endpoint
+        return render_user_data(app_env(settings, env, sns_topic_arn))
+
+    connection = [data.connection_host, data.read_host, data.connection_port,
+                  settings.db_username, settings.db_password]
+    if cache:
+        connection += [cache.host, cache.port]
+    return pulumi.Output.all(*connection).apply(render)
+
+
+def ssm_user_data(settings: Settings, parameter_path: str, sns_topic_arn: str, cache: Cache = None) -> str:
+    env = {
+        "DBHOST": "$(param host)",
+        "DBREADHOST": "$(param read-host)",
+        "DBPORT": "$(param port)",
+        "DBUSER": "$(param username)",
+        "DBPASS": "$(param password)",
+        "DATABASE": "$(param name)",
+    }
+    if cache:
+        env["CACHE_HOST"] = "$(param cache-host)"
+        env["CACHE_PORT"] = "$(param cache-port)"
+    return render_user_data(app_env(settings, env, sns_topic_arn),
+        prelude=_SSM_PRELUDE.format(parameter_path=parameter_path, aws_region=settings.aws_region), expand=True)
+
+
+class Compute(StackComponent):
+    """The web app tier: instance role, EC2 instance, ALB, launch template, ASG, an optional CloudFront distribution and DNS.
+
+    With computeTopology "private" the standalone EC2 instance is dropped and the
+    ASG runs in the private subnets, reaching out through the NAT gateways.
+
+    The load balancer, target group and instance role only depend on networking,
+    so they are created while RDS is still coming up. With dbConnectionMode "ssm"
+    the instances read the connection info from Parameter Store at boot, so
+    nothing in this tier waits for the database; with "inline" only what
+    consumes the rendered user_data does.
+    """
+
+    TYPE = "pulumi_python:components:Compute"
+
+    def __init__(self, name: str, settings: Settings,
+                 networking: Networking,
+                 data: Data,
+                 sns_topic_arn: str,
+                 cache: Cache = None,
+                 opts: pulumi.ResourceOptions = None,
+                 region: str = None):
+        super().__init__(name, opts, region)
+        self.settings = settings
+        self.networking = networking
+
+        # Base64 of the gzipped cloud-init document, shared by the instance and the launch template
+        self.db_parameter_path = data.connection_parameter_path
+        if self.db_parameter_path:
+            self.user_data = pulumi.Output.from_input(ssm_user_data(settings, self.db_parameter_path, sns_topic_arn, cache))
+        else:
+            self.user_data = pulumi.Output.secret(inline_user_data(settings, data, sns_topic_arn, cache))
+
+        self._create_instance_profile(sns_topic_arn)
+        # The private topology has no standalone instance, only the ASG behind the load balancer
+        self.ec2_instance = None if settings.private_compute else self._create_instance()
+        self._create_load_balancer()
+        self._create_auto_scaling_group()
+        self._create_scaling_policies()
+        self.distribution = self._create_distribution() if settings.cloudfront_enabled else None
+        self._create_dns_record()
+
+        self.register_outputs({
+            **({"ec2PublicIP": self.ec2_instance.public_ip} if self.ec2_instance else {}),
+            "loadBalancerDnsName": self.app_load_balancer.dns_name,
+            "autoScalingGroupName": self.auto_scaling_group.name,
+        })
+
+    def _create_instance_profile(self, sns_topic_arn: str):
+        settings = self.settings
+
+        cloud_watch_agent_server_policy = aws.iam.Policy(self.child_name("cloudWatchAgentServerPolicy"),
+            description="A policy that allows sending logs to CloudWatch and publishing to SNS topics",
+            policy=json.dumps({
+                "Version": "2012-10-17",
+                "Statement": [
+                    {
+                        "Effect": "Allow",
+                        "Action": [
+                            "cloudwatch:PutMetricData",
+                            "ec2:DescribeVolumes",
+                            "ec2:DescribeTags",
+                            "logs:PutLogEvents",
+                            "logs:DescribeLogStreams",
+                            "logs:DescribeLogGroups",
+                            "logs:CreateLogStream",
+                            "logs:CreateLogGroup",
+                            "elasticloadbalancing:Describe*",
+                            "autoscaling:DescribeAutoScalingGroups",
+                            "autoscaling:DescribeAutoScalingInstances",
+                            "autoscaling:DescribeLaunchConfigurations",
+                            "autoscaling:DescribePolicies",
+                            "sns:Publish",
+                        ],
+                        "Resource": "*"
+                    },
+                    {
+                        "Effect": "Allow",
+                        "Action": [
+                            "ssm:GetParameter"
+                        ],
+                        "Resource": "arn:aws:ssm:*:*:parameter/AmazonCloudWatch-*"
+                    },
+                    {
+                        "Effect": "Allow",
+                        "Action": "sns:Publish",
+                        "Resource": sns_topic_arn
+                    }
+                ] + ([
+                    {
+                        "Effect": "Allow",
+                        "Action": "ssm:GetParametersByPath",
+                        "Resource": f"arn:aws:ssm:{settings.aws_region}:{settings.account_id}:parameter{self.db_parameter_path}"
+                    }
+                ] if self.db_parameter_path else [])
+            }),
+            opts=self.child_opts())
+
+        self.instance_role = aws.iam.Role(self.child_name("cloudWatchAgentRole"),
+            assume_role_policy={
+                "Version": "2012-10-17",
+                "Statement": [{
+                    "Action": "sts:AssumeRole",
+                    "Principal": {
+                        "Service": "ec2.amazonaws.com",
+                    },
+                    "Effect": "Allow",
+                }]
+            },
+            opts=self.child_opts())
+
+        aws.iam.RolePolicyAttachment(self.child_name("cloudWatchAgentRoleAttachment"),
+            role=self.instance_role.name,
+            policy_arn=cloud_watch_agent_server_policy.arn,
+            opts=self.child_opts())
+
+        # Private instances have no SSH access, Session Manager reaches them through the SSM agent
+        if settings.private_compute:
+            aws.iam.RolePolicyAttachment(self.child_name("ssmManagedInstanceCoreAttachment"),
+                role=self.instance_role.name,
+                policy_arn="arn:aws:iam::aws:policy/AmazonSSMManagedInstanceCore",
+                opts=self.child_opts())
+
+        self.instance_profile = aws.iam.InstanceProfile(self.child_name("cloudWatchAgentInstanceProfile"),
+            role=self.instance_role.name,
+            opts=self.child_opts())
+
+    def _create_instance(self) -> aws.ec2.Instance:
+        settings = self.settings
+
+        # Create an EC2 instance
+        return aws.ec2.Instance(self.child_name(settings.ec2_name),
+            ami=self._image_id(settings.instance_types[0]),
+            instance_type=settings.instance_types[0],
+            vpc_security_group_ids=[self.networking.app_security_group.id],
+            subnet_id=pulumi.Output.from_input(self.networking.public_subnet_ids[0]),
+            associate_public_ip_address=True,
+            key_name=settings.key_pair,
+            disable_api_termination=False,
+            root_block_device=aws.ec2.InstanceRootBlockDeviceArgs(
+                delete_on_termination=True,  # Ensure the EBS volume is deleted upon termination
+                volume_size=settings.root_volume_size,
+                volume_type="gp3",  # gp3 IOPS and throughput are provisioned independently of the size
+                iops=settings.root_volume_iops,
+                throughput=settings.root_volume_throughput,
+            ),
+            tags={
+                "Name": settings.ec2_name,
+            },
+            user_data_base64=self.user_data,
+            iam_instance_profile=self.instance_profile.name,
+            opts=self.child_opts())
+
+    def _create_load_balancer(self):
+        settings = self.settings
+        lb = settings.load_balancer
+
+        # Create a Load Balancer
+        self.app_load_balancer = aws.lb.LoadBalancer(self.child_name("appLoadBalancer"),
+            internal=False,
+            security_groups=[self.networking.lb_security_group.id],
+            subnets=self.networking.public_subnet_ids,
+            enable_deletion_protection=False,
+            idle_timeout=lb.idle_timeout,
+            client_keep_alive=lb.client_keep_alive,
+            opts=self.child_opts())
+
+        # Create a Target Group
+        self.target_group = aws.lb.TargetGroup(self.child_name("targetGroup"),
+            port=settings.application_port,
+            protocol="HTTP",
+            vpc_id=self.networking.vpc.id,
+            target_type="instance",
+            health_check=aws.lb.TargetGroupHealthCheckArgs(
+                enabled=True,
+                path=lb.health_check.path,
+                matcher=lb.health_check.matcher,
+                interval=lb.health_check.interval,
+                timeout=lb.health_check.timeout,
+                healthy_threshold=lb.health_check.healthy_threshold,
+                unhealthy_threshold=lb.health_check.unhealthy_threshold,
+            ),
+            # Scale-in waits this long for in-flight requests before terminating an instance
+            deregistration_delay=lb.deregistration_delay,
+            # Fresh instances are ramped up to their full share of requests instead of getting it at once
+            slow_start=lb.slow_start,
+            load_balancing_algorithm_type=lb.algorithm,
+            opts=self.child_opts())
+
+        # Create a Listener
+        self.listener = aws.lb.Listener(self.child_name("listener"),
+            load_balancer_arn=self.app_load_balancer.arn,
+            port=settings.listener_port,
+            protocol="HTTPS",
+            ssl_policy=settings.ssl_policy,
+            certificate_arn=settings.certificate_arn,
+            default_actions=[aws.lb.ListenerDefaultActionArgs(
+                type="forward",
+                target_group_arn=self.target_group.arn,
+            )],
+            opts=self.child_opts())
+
+        # Redirect plain HTTP to the HTTPS listener; behind CloudFront, which redirects
+        # viewers itself, port 80 is closed and there is nothing to redirect
+        if lb.http_redirect and not settings.cloudfront_enabled:
+            aws.lb.Listener(self.child_name("httpRedirectListener"),
+                load_balancer_arn=self.app_load_balancer.arn,
+                port=80,
+                protocol="HTTP",
+                default_actions=[aws.lb.ListenerDefaultActionArgs(
+                    type="redirect",
+                    redirect=aws.lb.ListenerDefaultActionRedirectArgs(
+                        protocol="HTTPS",
+                        port=str(settings.listener_port),
+                        status_code="HTTP_301",
+                    ),
+                )],
+                opts=self.child_opts())
+
+    def _image_id(self, instance_type: str) -> str:
+        return self.settings.arm64_ami_id if is_graviton(instance_type) else self.settings.ami_id
+
+    def _create_launch_template(self, name: str, template_name: str, instance_type: str) -> aws.ec2.LaunchTemplate:
+        settings = self.settings
+
+        return aws.ec2.LaunchTemplate(self.child_name(name),
+            name = template_name,
+            image_id=self._image_id(instance_type),
+            instance_type=instance_type,
+            key_name=None if settings.private_compute else settings.key_pair,
+            network_interfaces=[aws.ec2.LaunchTemplateNetworkInterfaceArgs(
+                associate_public_ip_address=not settings.private_compute,
+                security_groups=[self.networking.app_security_group.id],
+            )],
+            block_device_mappings=[aws.ec2.LaunchTemplateBlockDeviceMappingArgs(
+                device_name=settings.root_device_name,
+                ebs=aws.ec2.LaunchTemplateBlockDeviceMappingEbsArgs(
+                    delete_on_termination="true",
+                    volume_size=settings.root_volume_size,
+                    volume_type="gp3",
+                    iops=settings.root_volume_iops,
+                    throughput=settings.root_volume_throughput,
+                ),
+            )],
+            user_data=self.user_data,
+            iam_instance_profile=aws.ec2.LaunchTemplateIamInstanceProfileArgs(
+                name=self.instance_profile.name,
+            ),
+            opts=self.child_opts())
+
+    def _mixed_instances_policy(self) -> aws.autoscaling.GroupMixedInstancesPolicyArgs:
+        settings = self.settings
+        primary = settings.instance_types[0]
+
+        # Types of the other architecture boot from their own AMI, through a second launch template
+        other_template = None
+        if any(is_graviton(t) != is_graviton(primary) for t in settings.instance_types):
+            other_arch = "x86_64" if is_graviton(primary) else "arm64"
+            other_type = next(t for t in settings.instance_types if is_graviton(t) != is_graviton(primary))
+            other_template = self._create_launch_template(f"launch_template-{other_arch}",
+                f"{settings.launch_template_name}-{other_arch}", other_type)
+
+        overrides = []
+        for instance_type in settings.instance_types:
+            override = {"instance_type": instance_type}
+            if is_graviton(instance_type) != is_graviton(primary):
+                override["launch_template_specification"] = aws.autoscaling.GroupMixedInstancesPolicyLaunchTemplateOverrideLaunchTemplateSpecificationArgs(
+                    launch_template_id=other_template.id,
+                    version="$Latest",
+                )
+            overrides.append(aws.autoscaling.GroupMixedInstancesPolicyLaunchTemplateOverrideArgs(**override))
+
+        return aws.autoscaling.GroupMixedInstancesPolicyArgs(
+            launch_template=aws.autoscaling.GroupMixedInstancesPolicyLaunchTemplateArgs(
+                launch_template_specification=aws.autoscaling.GroupMixedInstancesPolicyLaunchTemplateLaunchTemplateSpecificationArgs(
+                    launch_template_id=self.launch_template.id,
+                    version="$Latest",
+                ),
+                overrides=overrides,
+            ),
+            instances_distribution=aws.autoscaling.GroupMixedInstancesPolicyInstancesDistributionArgs(
+                # On-demand capacity is filled in the order of instanceTypes
+                on_demand_allocation_strategy="prioritized",
+                on_demand_base_capacity=settings.on_demand_base_capacity,
+                on_demand_percentage_above_base_capacity=settings.on_demand_percentage,
+                spot_allocation_strategy=settings.spot_allocation_strategy,
+            ),
+        )
+
+    def _create_auto_scaling_group(self):
+        settings = self.settings
+
+        # Create a Launch Template
+        self.launch_template = self._create_launch_template("launch_template",
+            settings.launch_template_name, settings.instance_types[0])
+
+        # With several instance types or spot capacity the group launches through a mixed
+        # instances policy, otherwise straight from the launch template
+        mixed_instances_policy = None
+        launch_template = aws.autoscaling.GroupLaunchTemplateArgs(
+            id=self.launch_template.id,
+            version="$Latest",
+        )
+        if settings.uses_mixed_instances_policy:
+            mixed_instances_policy = self._mixed_instances_policy()
+            launch_template = None
+
+        # Instances wait in the warm pool already booted through user_data, so scaling
+        # out only has to start them; scale-in returns instances to the pool
+        warm_pool = aws.autoscaling.GroupWarmPoolArgs(
+            pool_state=settings.warm_pool_state,
+            min_size=settings.warm_pool_min_size,
+            instance_reuse_policy=aws.autoscaling.GroupWarmPoolInstanceReusePolicyArgs(
+                reuse_on_scale_in=True,
+            ),
+        ) if settings.warm_pool_enabled else None
+
+        # Create an Auto Scaling Group
+        self.auto_scaling_group = aws.autoscaling.Group(self.child_name("webAppAutoScalingGroup"),
+            name = settings.auto_scaling_group_name,
+            max_size=settings.max_size,
+            min_size=settings.min_size,
+            desired_capacity=settings.desired_capacity,
+            vpc_zone_identifiers=pulumi.Output.from_input(self.networking.private_subnet_ids if settings.private_compute
+                                                          else self.networking.public_subnet_ids),
+            launch_template=launch_template,
+            mixed_instances_policy=mixed_instances_policy,
+            capacity_rebalance=settings.capacity_rebalance or None,
+            warm_pool=warm_pool,
+            tags=[{
+                "key": "Name",
+                "value": "web-app",
+                "propagate_at_launch": True,
+            }],
+            default_cooldown=60,
+            target_group_arns=[self.target_group.arn],
+            opts=self.child_opts())
+
+    def _create_scaling_policies(self):
+        scaling = self.settings.scaling
+
+        if scaling.mode == "simple":
+            self._create_simple_scaling_policies()
+        elif scaling.mode == "target-tracking":
+            self._create_target_tracking_policy(scaling.target_tracking)
+        elif scaling.mode == "step":
+            self._create_step_scaling_policies(scaling.step)
+        elif scaling.mode == "predictive":
+            self._create_predictive_scaling_policy(scaling.predictive)
+
+        for action in scaling.schedules:
+            aws.autoscaling.Schedule(self.child_name(f"schedule-{action.name}"),
+                autoscaling_group_name=self.auto_scaling_group.name,
+                scheduled_action_name=action.name,
+                recurrence=action.recurrence,
+                min_size=action.min_size,
+                max_size=action.max_size,
+                desired_capacity=action.desired_capacity,
+                time_zone=action.time_zone,
+                opts=self.child_opts())
+
+    def _request_count_label(self) -> pulumi.Output:
+        # ALB metrics are keyed on "app/<lb>/<id>/targetgroup/<tg>/<id>"
+        return pulumi.Output.concat(self.app_load_balancer.arn_suffix, "/", self.target_group.arn_suffix)
+
+    def _create_simple_scaling_policies(self):
+        settings = self.settings
+
+        # Create scale up policy
+        scale_up_policy = aws.autoscaling.Policy(self.child_name("scaleUp"),
+            autoscaling_group_name=self.auto_scaling_group.name,
+            cooldown=settings.cool_down,
+            adjustment_type="ChangeInCapacity",
+            scaling_adjustment=1,
+            metric_aggregation_type="Average",
+            policy_type="SimpleScaling",
+            opts=self.child_opts())
+
+        # Create scale down policy
+        scale_down_policy = aws.autoscaling.Policy(self.child_name("scaleDown"),
+            autoscaling_group_name=self.auto_scaling_group.name,
+            cooldown=settings.cool_down,
+            adjustment_type="ChangeInCapacity",
+            scaling_adjustment=-1,
+            metric_aggregation_type="Average",
+            policy_type="SimpleScaling",
+            opts=self.child_opts())
+
+        # Create a CPU high CloudWatch alarm
+        aws.cloudwatch.MetricAlarm(self.child_name("cpuHighAlarm"),
+            metric_name="CPUUtilization",
+            namespace="AWS/EC2",
+            statistic="Average",
+            period=settings.period,
+            evaluation_periods=1,
+            threshold=settings.up_threshold,
+            comparison_operator="GreaterThanThreshold",
+            alarm_actions=[scale_up_policy.arn],
+            dimensions={"AutoScalingGroupName": self.auto_scaling_group.name},
+            opts=self.child_opts())
+
+        # Create a CPU low CloudWatch alarm
+        aws.cloudwatch.MetricAlarm(self.child_name("cpuLowAlarm"),
+            metric_name="CPUUtilization",
+            namespace="AWS/EC2",
+            statistic="Average",
+            period=settings.period,
+            evaluation_periods=1,
+            threshold=settings.down_threshold,
+            comparison_operator="LessThanThreshold",
+            alarm_actions=[scale_down_policy.arn],
+            dimensions={"AutoScalingGroupName": self.auto_scaling_group.name},
+            opts=self.child_opts())
+
+    def _create_target_tracking_policy(self, config: TargetTrackingScaling):
+        if config.metric == "requestCount":
+            metric = aws.autoscaling.PolicyTargetTrackingConfigurationPredefinedMetricSpecificationArgs(
+                predefined_metric_type="ALBRequestCountPerTarget",
+                resource_label=self._request_count_label(),
+            )
+        else:
+            metric = aws.autoscaling.PolicyTargetTrackingConfigurationPredefinedMetricSpecificationArgs(
+                predefined_metric_type="ASGAverageCPUUtilization",
+            )
+
+        # Target tracking creates and owns its CloudWatch alarms
+        aws.autoscaling.Policy(self.child_name("targetTracking"),
+            autoscaling_group_name=self.auto_scaling_group.name,
+            policy_type="TargetTrackingScaling",
+            estimated_instance_warmup=config.instance_warmup,
+            target_tracking_configuration=aws.autoscaling.PolicyTargetTrackingConfigurationArgs(
+                predefined_metric_specification=metric,
+                target_value=config.target_value,
+                disable_scale_in=config.disable_scale_in,
+            ),
+            opts=self.child_opts())
+
+    def _create_step_scaling_policies(self, config: StepScaling):
+        settings = self.settings
+
+        def step_adjustments(steps):
+            # Bounds are relative to the alarm threshold
+            return [aws.autoscaling.PolicyStepAdjustmentArgs(
+                scaling_adjustment=step.adjustment,
+                metric_interval_lower_bound=None if step.lower_bound is None else str(step.lower_bound),
+                metric_interval_upper_bound=None if step.upper_bound is None else str(step.upper_bound),
+            ) for step in steps]
+
+        # Create step scale out policy
+        scale_out_policy = aws.autoscaling.Policy(self.child_name("stepScaleOut"),
+            autoscaling_group_name=self.auto_scaling_group.name,
+            policy_type="StepScaling",
+            adjustment_type="ChangeInCapacity",
+            metric_aggregation_type="Average",
+            estimated_instance_warmup=config.instance_warmup,
+            step_adjustments=step_adjustments(config.scale_out),
+            opts=self.child_opts())
+
+        # Create step scale in policy
+        scale_in_policy = aws.autoscaling.Policy(self.child_name("stepScaleIn"),
+            autoscaling_group_name=self.auto_scaling_group.name,
+            policy_type="StepScaling",
+            adjustment_type="ChangeInCapacity",
+            metric_aggregation_type="Average",
+            step_adjustments=step_adjustments(config.scale_in),
+            opts=self.child_opts())
+
+        # Create a CPU high CloudWatch alarm
+        aws.cloudwatch.MetricAlarm(self.child_name("cpuHighAlarm"),
+            metric_name="CPUUtilization",
+            namespace="AWS/EC2",
+            statistic="Average",
+            period=settings.period,
+            evaluation_periods=config.evaluation_periods,
+            threshold=settings.up_threshold,
+            comparison_operator="GreaterThanThreshold",
+            alarm_actions=[scale_out_policy.arn],
+            dimensions={"AutoScalingGroupName": self.auto_scaling_group.name},
+            opts=self.child_opts())
+
+        # Create a CPU low CloudWatch alarm
+        aws.cloudwatch.MetricAlarm(self.child_name("cpuLowAlarm"),
+            metric_name="CPUUtilization",
+            namespace="AWS/EC2",
+            statistic="Average",
+            period=settings.period,
+            evaluation_periods=config.evaluation_periods,
+            threshold=settings.down_threshold,
+            comparison_operator="LessThanThreshold",
+            alarm_actions=[scale_in_policy.arn],
+            dimensions={"AutoScalingGroupName": self.auto_scaling_group.name},
+            opts=self.child_opts())
+
+    def _create_predictive_scaling_policy(self, config: PredictiveScaling):
+        if config.metric == "requestCount":
+            metric_pair = aws.autoscaling.PolicyPredictiveScalingConfigurationMetricSpecificationPredefinedMetricPairSpecificationArgs(
+                predefined_metric_type="ALBRequestCount",
+                resource_label=self._request_count_label(),
+            )
+        else:
+            metric_pair = aws.autoscaling.PolicyPredictiveScalingConfigurationMetricSpecificationPredefinedMetricPairSpecificationArgs(
+                predefined_metric_type="ASGCPUUtilization",
+            )
+
+        aws.autoscaling.Policy(self.child_name("predictiveScaling"),
+            autoscaling_group_name=self.auto_scaling_group.name,
+            policy_type="PredictiveScaling",
+            predictive_scaling_configuration=aws.autoscaling.PolicyPredictiveScalingConfigurationArgs(
+                metric_specification=aws.autoscaling.PolicyPredictiveScalingConfigurationMetricSpecificationArgs(
+                    target_value=config.target_value,
+                    predefined_metric_pair_specification=metric_pair,
+                ),
+                mode=config.mode,
+                scheduling_buffer_time=str(config.scheduling_buffer_time),
+            ),
+            opts=self.child_opts())
+
+    def _create_cache_policy(self, name: str, behavior: CacheBehavior) -> aws.cloudfront.CachePolicy:
+        return aws.cloudfront.CachePolicy(self.child_name(name),
+            comment=f"{self.settings.domain_name} {behavior.path_pattern}",
+            min_ttl=behavior.min_ttl,
+            default_ttl=behavior.default_ttl,
+            max_ttl=behavior.max_ttl,
+            parameters_in_cache_key_and_forwarded_to_origin=aws.cloudfront.CachePolicyParametersInCacheKeyAndForwardedToOriginArgs(
+                cookies_config=aws.cloudfront.CachePolicyParametersInCacheKeyAndForwardedToOriginCookiesConfigArgs(
+                    cookie_behavior="none",
+                ),
+                headers_config=aws.cloudfront.CachePolicyParametersInCacheKeyAndForwardedToOriginHeadersConfigArgs(
+                    header_behavior="none",
+                ),
+                query_strings_config=aws.cloudfront.CachePolicyParametersInCacheKeyAndForwardedToOriginQueryStringsConfigArgs(
+                    query_string_behavior="all" if behavior.query_strings else "none",
+                ),
+                # Compressed variants are cached separately, per accepted encoding
+                enable_accept_encoding_gzip=behavior.compress,
+                enable_accept_encoding_brotli=behavior.compress,
+            ),
+            opts=self.child_opts())
+
+    def _create_distribution(self) -> aws.cloudfront.Distribution:
+        settings = self.settings
+        origin_id = "appLoadBalancer"
+
+        # Everything is passed through uncached unless a behavior says otherwise. The
+        # viewer's Host header is forwarded, which is also the name CloudFront checks
+        # the load balancer's certificate against.
+        default_behavior = {
+            "cache_policy_id": CACHING_DISABLED_POLICY_ID,
+            "compress": True,
+        }
+        ordered_behaviors = []
+        for i, behavior in enumerate(settings.cloudfront_behaviors):
+            policy = self._create_cache_policy(f"cachePolicy-{i}", behavior)
+            if behavior.path_pattern == "*":
+                default_behavior = {"cache_policy_id": policy.id, "compress": behavior.compress}
+                continue
+            ordered_behaviors.append(aws.cloudfront.DistributionOrderedCacheBehaviorArgs(
+                path_pattern=behavior.path_pattern,
+                target_origin_id=origin_id,
+                viewer_protocol_policy="redirect-to-https",
+                allowed_methods=["GET", "HEAD", "OPTIONS"],
+                cached_methods=["GET", "HEAD"],
+                cache_policy_id=policy.id,
+                origin_request_policy_id=ALL_VIEWER_ORIGIN_REQUEST_POLICY_ID,
+                compress=behavior.compress,
+            ))
+
+        # Create a CloudFront distribution in front of the load balancer
+        return aws.cloudfront.Distribution(self.child_name("cdnDistribution"),
+            enabled=True,
+            comment=settings.domain_name,
+            aliases=[settings.domain_name],
+            http_version="http2and3",
+            is_ipv6_enabled=True,
+            price_class=settings.cloudfront_price_class,
+            origins=[aws.cloudfront.DistributionOriginArgs(
+                origin_id=origin_id,
+                domain_name=self.app_load_balancer.dns_name,
+                custom_origin_config=aws.cloudfront.DistributionOriginCustomOriginConfigArgs(
+                    http_port=80,
+                    https_port=settings.listener_port,
+                    origin_protocol_policy="https-only",
+                    origin_ssl_protocols=["TLSv1.2"],
+                ),
+                # One regional cache in front of the origin collapses the edge locations' misses
+                origin_shield=aws.cloudfront.DistributionOriginOriginShieldArgs(
+                    enabled=True,
+                    origin_shield_region=settings.cloudfront_origin_shield_region or settings.aws_region,
+                ) if settings.cloudfront_origin_shield else None,
+            )],
+            default_cache_behavior=aws.cloudfront.DistributionDefaultCacheBehaviorArgs(
+                target_origin_id=origin_id,
+                viewer_protocol_policy="redirect-to-https",
+                allowed_methods=["GET", "HEAD", "OPTIONS", "PUT", "POST", "PATCH", "DELETE"],
+                cached_methods=["GET", "HEAD"],
+                origin_request_policy_id=ALL_VIEWER_ORIGIN_REQUEST_POLICY_ID,
+                **default_behavior,
+            ),
+            ordered_cache_behaviors=ordered_behaviors,
+            restrictions=aws.cloudfront.DistributionRestrictionsArgs(
+                geo_restriction=aws.cloudfront.DistributionRestrictionsGeoRestrictionArgs(
+                    restriction_type="none",
+                ),
+            ),
+            viewer_certificate=aws.cloudfront.DistributionViewerCertificateArgs(
+                acm_certificate_arn=settings.cloudfront_certificate_arn or settings.certificate_arn,
+                ssl_support_method="sni-only",
+                minimum_protocol_version="TLSv1.2_2021",
+            ),
+            opts=self.child_opts())
+
+    def _create_dns_record(self):
+        settings = self.settings
+
+        # With several regions each one adds a latency record for the same name, and
+        # Route53 answers with the load balancer closest to the client that is healthy
+        multi_region = len(settings.regions) > 1
+        if self.distribution:
+            # CloudFront aliases cannot evaluate target health
+            target = {
+                "name": self.distribution.domain_name,
+                "zone_id": self.distribution.hosted_zone_id,
+                "evaluate_target_health": False,
+            }
+        else:
+            target = {
+                "name": self.app_load_balancer.dns_name,
+                "zone_id": self.app_load_balancer.zone_id,
+                "evaluate_target_health": True,
+            }
+        self.a_record = aws.route53.Record(self.child_name("aRecord"),
+            zone_id=settings.hosted_zone_id,
+            name=settings.domain_name,
+            type="A",
+            aliases=[target],
+            set_identifier=settings.aws_region if multi_region else None,
+            latency_routing_policies=[aws.route53.RecordLatencyRoutingPolicyArgs(
+                region=settings.aws_region,
+            )] if multi_region else None,
+            opts=self.child_opts())
+
+        # CloudFront also answers over IPv6, which needs its own alias record
+        self.aaaa_record = None
+        if self.distribution:
+            self.aaaa_record = aws.route53.Record(self.child_name("aaaaRecord"),
+                zone_id=settings.hosted_zone_id,
+                name=settings.domain_name,
+                type="AAAA",
+                aliases=[target],
+                opts=self.child_opts())
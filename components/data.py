@@ -0,0 +1,390 @@
+"""Postgres on RDS, its optional RDS Proxy, and the DynamoDB table with its optional DAX cache"""
+
+import json
+
+import pulumi
+import pulumi_aws as aws
+
+from components.base import StackComponent
+from db_instance_classes import MAX_CONNECTIONS_FORMULA, postgres_parameters
+from settings import Settings
+
+# RDS Proxy always listens on the engine's default port
+PROXY_PORT = 5432
+
+
+class Data(StackComponent):
+    """The RDS instance the web app talks to and the DynamoDB table the Lambda writes to.
+
+    The two stores share no inputs, so the DynamoDB table (and everything that
+    waits on it) never waits for the much slower RDS instance.
+    """
+
+    TYPE = "pulumi_python:components:Data"
+
+    def __init__(self, name: str, settings: Settings,
+                 private_subnet_ids: list,
+                 rds_security_group: aws.ec2.SecurityGroup,
+                 proxy_security_group: aws.ec2.SecurityGroup = None,
+                 vpc_id: pulumi.Input[str] = None,
+                 availability_zones: list = (),
+                 dax_security_group: aws.ec2.SecurityGroup = None,
+                 opts: pulumi.ResourceOptions = None,
+                 region: str = None):
+        super().__init__(name, opts, region)
+
+        # The table lives in the home region only, next to the Lambda that writes to it
+        self.dynamodb_table = None
+        self.dax_cluster = None
+        if not region:
+            self._create_dynamodb_table(settings)
+            if settings.dax_enabled:
+                self._create_dax_cluster(settings, private_subnet_ids, dax_security_group)
+
+        self.parameter_group = aws.rds.ParameterGroup(self.child_name(settings.parameter_group_name),
+            family="Postgres16",
+            description="Custom parameter group for PostgreSOL 16.1",
+            parameters=self._parameters(settings),
+            opts=self.child_opts())
+
+        # Creating a DB subnet group
+        self.subnet_group = aws.rds.SubnetGroup(self.child_name(settings.db_subnet_group_name),
+            subnet_ids=private_subnet_ids,
+            tags={
+                "Name": settings.db_subnet_group_name,
+            },
+            opts=self.child_opts())
+
+        # Create an RDS instance with PostgreSQL
+        self.db_instance = aws.rds.Instance(self.child_name("mydbinstance"),
+            instance_class=settings.instance_class,
+            db_subnet_group_name=self.subnet_group.name,
+            parameter_group_name=self.parameter_group.name,
+            engine=settings.engine,
+            engine_version=settings.engine_version,
+            allocated_storage=settings.allocated_storage,
+            storage_type=settings.storage_type,
+            iops=settings.db_storage_iops,
+            storage_throughput=settings.db_storage_throughput,
+            # Storage autoscaling grows the volume up to this size when free space runs low
+            max_allocated_storage=settings.db_max_allocated_storage,
+            username= settings.db_username,
+            password= settings.db_password,
+            skip_final_snapshot=True,
+            vpc_security_group_ids=[rds_security_group.id],
+            publicly_accessible=False,
+            identifier=settings.identifier,
+            db_name=settings.db_name,
+            multi_az=settings.db_multi_az,
+            performance_insights_enabled=settings.db_performance_insights,
+            performance_insights_retention_period=self._performance_insights_retention(settings),
+            opts=self.child_opts())
+
+        # Where the web app connects, the proxy when there is one
+        self.connection_host = self.db_instance.address
+        self.connection_port = self.db_instance.port
+        self.db_proxy = None
+        if settings.db_proxy_enabled:
+            self._create_proxy(settings, private_subnet_ids, proxy_security_group)
+            self.connection_host = self.db_proxy.endpoint
+            self.connection_port = pulumi.Output.from_input(PROXY_PORT)
+
+        # Reads go to the replicas when there are any, RDS Proxy only pools writer connections for RDS instances
+        self.read_replicas = []
+        self.read_host = self.connection_host
+        if settings.db_read_replica_count:
+            self._create_read_replicas(settings, rds_security_group, vpc_id, availability_zones)
+
+        self.connection_parameter_path = None
+        if settings.db_connection_mode == "ssm":
+            self._publish_connection_parameters(settings)
+
+        self.register_outputs({
+            "dbEndpoint": self.db_instance.endpoint,
+            "dbConnectionHost": self.connection_host,
+            "dbReadHost": self.read_host,
+            "dynamoDbTableArn": self.dynamodb_table.arn if self.dynamodb_table else None,
+        })
+
+    @staticmethod
+    def _parameters(settings: Settings) -> list:
+        connections = settings.db_max_connections
+        if settings.db_tune_parameters:
+            parameters = postgres_parameters(settings.instance_class, settings.storage_type, connections)
+        else:
+            parameters = {"max_connections": (connections or MAX_CONNECTIONS_FORMULA, "pending-reboot")}
+        # Explicit values win; parameters not known here wait for a reboot, which works for static ones too
+        for name, value in (settings.db_parameters or {}).items():
+            parameters[name] = (value, parameters.get(name, (None, "pending-reboot"))[1])
+
+        return [{
+            "name": name,
+            "value": str(value),
+            "applyMethod": apply_method,
+        } for name, (value, apply_method) in parameters.items()]
+
+    def _create_dynamodb_table(self, settings: Settings):
+        provisioned = settings.dynamodb_billing_mode == "PROVISIONED"
+        capacity = settings.dynamodb_capacity
+
+        # Every key attribute of the table and its indexes has to be declared once
+        key_types = {"id": "S"}
+        for index in settings.dynamodb_indexes:
+            key_types.setdefault(index.hash_key, index.hash_key_type)
+            if index.range_key:
+                key_types.setdefault(index.range_key, index.range_key_type)
+
+        # Define a DynamoDB table
+        self.dynamodb_table = aws.dynamodb.Table(self.child_name("myDynamoDbTable"),
+            name=settings.dynamodb_table_name,
+            attributes=[aws.dynamodb.TableAttributeArgs(
+                name=name,
+                type=key_type
+            ) for name, key_type in key_types.items()],
+            hash_key="id",
+            billing_mode=settings.dynamodb_billing_mode,
+            read_capacity=capacity.min_read if provisioned else None,
+            write_capacity=capacity.min_write if provisioned else None,
+            global_secondary_indexes=[aws.dynamodb.TableGlobalSecondaryIndexArgs(
+                name=index.name,
+                hash_key=index.hash_key,
+                range_key=index.range_key,
+                projection_type=index.projection_type,
+                non_key_attributes=list(index.non_key_attributes) or None,
+                read_capacity=capacity.min_read if provisioned else None,
+                write_capacity=capacity.min_write if provisioned else None,
+            ) for index in settings.dynamodb_indexes] or None,
+            ttl=aws.dynamodb.TableTtlArgs(
+                attribute_name=settings.dynamodb_ttl_attribute,
+                enabled=True,
+            ) if settings.dynamodb_ttl_attribute else None,
+            # Application Auto Scaling owns the throughput of the table and its indexes once it is provisioned
+            opts=self.child_opts(ignore_changes=[
+                "readCapacity", "writeCapacity",
+                "globalSecondaryIndexes[*].readCapacity", "globalSecondaryIndexes[*].writeCapacity",
+            ] if provisioned else None))
+
+        if provisioned:
+            resources = [("", self.dynamodb_table.name.apply(lambda name: f"table/{name}"), "table")]
+            resources += [(f"-{index.name}",
+                           self.dynamodb_table.name.apply(lambda name, index=index: f"table/{name}/index/{index.name}"),
+                           "index")
+                          for index in settings.dynamodb_indexes]
+            for suffix, resource_id, kind in resources:
+                for direction, metric, min_capacity, max_capacity in (
+                        ("Read", "DynamoDBReadCapacityUtilization", capacity.min_read, capacity.max_read),
+                        ("Write", "DynamoDBWriteCapacityUtilization", capacity.min_write, capacity.max_write)):
+                    target = aws.appautoscaling.Target(self.child_name(f"dynamoDb{direction}Target{suffix}"),
+                        service_namespace="dynamodb",
+                        resource_id=resource_id,
+                        scalable_dimension=f"dynamodb:{kind}:{direction}CapacityUnits",
+                        min_capacity=min_capacity,
+                        max_capacity=max_capacity,
+                        opts=self.child_opts())
+
+                    aws.appautoscaling.Policy(self.child_name(f"dynamoDb{direction}Policy{suffix}"),
+                        policy_type="TargetTrackingScaling",
+                        service_namespace=target.service_namespace,
+                        resource_id=target.resource_id,
+                        scalable_dimension=target.scalable_dimension,
+                        target_tracking_scaling_policy_configuration=aws.appautoscaling.PolicyTargetTrackingScalingPolicyConfigurationArgs(
+                            predefined_metric_specification=aws.appautoscaling.PolicyTargetTrackingScalingPolicyConfigurationPredefinedMetricSpecificationArgs(
+                                predefined_metric_type=metric,
+                            ),
+                            target_value=capacity.target_utilization,
+                        ),
+                        opts=self.child_opts())
+
+    def _create_dax_cluster(self, settings: Settings, private_subnet_ids: list,
+                            dax_security_group: aws.ec2.SecurityGroup):
+        dax_role = aws.iam.Role(self.child_name("daxRole"),
+            assume_role_policy={
+                "Version": "2012-10-17",
+                "Statement": [{
+                    "Action": "sts:AssumeRole",
+                    "Principal": {
+                        "Service": "dax.amazonaws.com",
+                    },
+                    "Effect": "Allow",
+                }]
+            },
+            opts=self.child_opts())
+
+        # DAX reads and writes through to the table and its indexes on behalf of its clients
+        aws.iam.RolePolicy(self.child_name("daxTablePolicy"),
+            role=dax_role.id,
+            policy=self.dynamodb_table.arn.apply(lambda arn: json.dumps({
+                "Version": "2012-10-17",
+                "Statement": [{
+                    "Effect": "Allow",
+                    "Action": [
+                        "dynamodb:GetItem",
+                        "dynamodb:BatchGetItem",
+                        "dynamodb:Query",
+                        "dynamodb:Scan",
+                        "dynamodb:PutItem",
+                        "dynamodb:UpdateItem",
+                        "dynamodb:DeleteItem",
+                        "dynamodb:BatchWriteItem",
+                        "dynamodb:ConditionCheckItem",
+                        "dynamodb:DescribeTable"
+                    ],
+                    "Resource": [arn, f"{arn}/index/*"],
+                }]
+            })),
+            opts=self.child_opts())
+
+        dax_subnet_group = aws.dax.SubnetGroup(self.child_name("daxSubnetGroup"),
+            subnet_ids=private_subnet_ids,
+            opts=self.child_opts())
+
+        self.dax_cluster = aws.dax.Cluster(self.child_name("daxCluster"),
+            cluster_name=f"{settings.identifier}-dax",
+            node_type=settings.dax_node_type,
+            replication_factor=settings.dax_replication_factor,
+            iam_role_arn=dax_role.arn,
+            subnet_group_name=dax_subnet_group.name,
+            security_group_ids=[dax_security_group.id],
+            server_side_encryption=aws.dax.ClusterServerSideEncryptionArgs(
+                enabled=True,
+            ),
+            opts=self.child_opts())
+
+    @staticmethod
+    def _performance_insights_retention(settings: Settings):
+        return settings.db_performance_insights_retention if settings.db_performance_insights else None
+
+    def _create_read_replicas(self, settings: Settings, rds_security_group: aws.ec2.SecurityGroup,
+                              vpc_id: pulumi.Input[str], availability_zones: list):
+        # Spread the replicas over the AZs of the private subnets, round robin
+        for i in range(settings.db_read_replica_count):
+            self.read_replicas.append(aws.rds.Instance(self.child_name(f"mydbinstance-replica-{i}"),
+                replicate_source_db=self.db_instance.identifier,
+                instance_class=settings.instance_class,
+                availability_zone=availability_zones[i % len(availability_zones)],
+                parameter_group_name=self.parameter_group.name,
+                storage_type=settings.storage_type,
+                iops=settings.db_storage_iops,
+                storage_throughput=settings.db_storage_throughput,
+                max_allocated_storage=settings.db_max_allocated_storage,
+                skip_final_snapshot=True,
+                vpc_security_group_ids=[rds_security_group.id],
+                publicly_accessible=False,
+                identifier=f"{settings.identifier}-replica-{i}",
+                performance_insights_enabled=settings.db_performance_insights,
+                performance_insights_retention_period=self._performance_insights_retention(settings),
+                opts=self.child_opts()))
+
+        if len(self.read_replicas) == 1:
+            self.read_host = self.read_replicas[0].address
+            return
+
+        # Several replicas share one reader name, weighted CNAMEs in a zone only the VPC resolves
+        self.reader_zone = aws.route53.Zone(self.child_name("dbReaderZone"),
+            name=f"{settings.identifier}.db.internal",
+            comment="Reader endpoint for the RDS read replicas",
+            vpcs=[aws.route53.ZoneVpcArgs(
+                vpc_id=vpc_id,
+            )],
+            opts=self.child_opts())
+
+        reader_name = f"reader.{settings.identifier}.db.internal"
+        for i, replica in enumerate(self.read_replicas):
+            aws.route53.Record(self.child_name(f"dbReaderRecord-{i}"),
+                zone_id=self.reader_zone.zone_id,
+                name=reader_name,
+                type="CNAME",
+                ttl=5,
+                records=[replica.address],
+                set_identifier=f"replica-{i}",
+                weighted_routing_policies=[aws.route53.RecordWeightedRoutingPolicyArgs(
+                    weight=1,
+                )],
+                opts=self.child_opts())
+        self.read_host = pulumi.Output.from_input(reader_name)
+
+    def _create_proxy(self, settings: Settings, private_subnet_ids: list,
+                      proxy_security_group: aws.ec2.SecurityGroup):
+        # The proxy authenticates to Postgres with credentials from Secrets Manager
+        self.proxy_secret = aws.secretsmanager.Secret(self.child_name("dbProxySecret"),
+            name_prefix=f"{settings.identifier}-proxy-",
+            description="Database credentials used by the RDS Proxy",
+            opts=self.child_opts())
+
+        aws.secretsmanager.SecretVersion(self.child_name("dbProxySecretVersion"),
+            secret_id=self.proxy_secret.id,
+            secret_string=pulumi.Output.all(settings.db_username, settings.db_password).apply(
+                lambda args: json.dumps({"username": args[0], "password": args[1]})),
+            opts=self.child_opts())
+
+        proxy_role = aws.iam.Role(self.child_name("dbProxyRole"),
+            assume_role_policy={
+                "Version": "2012-10-17",
+                "Statement": [{
+                    "Action": "sts:AssumeRole",
+                    "Principal": {
+                        "Service": "rds.amazonaws.com",
+                    },
+                    "Effect": "Allow",
+                }]
+            },
+            opts=self.child_opts())
+
+        aws.iam.RolePolicy(self.child_name("dbProxySecretPolicy"),
+            role=proxy_role.id,
+            policy=self.proxy_secret.arn.apply(lambda arn: json.dumps({
+                "Version": "2012-10-17",
+                "Statement": [{
+                    "Effect": "Allow",
+                    "Action": "secretsmanager:GetSecretValue",
+                    "Resource": arn,
+                }]
+            })),
+            opts=self.child_opts())
+
+        self.db_proxy = aws.rds.Proxy(self.child_name("dbProxy"),
+            name=f"{settings.identifier}-proxy",
+            engine_family="POSTGRESQL",
+            role_arn=proxy_role.arn,
+            require_tls=settings.db_proxy_require_tls,
+            vpc_subnet_ids=private_subnet_ids,
+            vpc_security_group_ids=[proxy_security_group.id],
+            auths=[aws.rds.ProxyAuthArgs(
+                auth_scheme="SECRETS",
+                iam_auth="DISABLED",
+                secret_arn=self.proxy_secret.arn,
+            )],
+            opts=self.child_opts())
+
+        proxy_target_group = aws.rds.ProxyDefaultTargetGroup(self.child_name("dbProxyTargetGroup"),
+            db_proxy_name=self.db_proxy.name,
+            connection_pool_config=aws.rds.ProxyDefaultTargetGroupConnectionPoolConfigArgs(
+                max_connections_percent=settings.db_proxy_max_connections_percent,
+            ),
+            opts=self.child_opts())
+
+        aws.rds.ProxyTarget(self.child_name("dbProxyTarget"),
+            db_proxy_name=self.db_proxy.name,
+            target_group_name=proxy_target_group.name,
+            db_instance_identifier=self.db_instance.identifier,
+            opts=self.child_opts())
+
+    def _publish_connection_parameters(self, settings: Settings):
+        # Consumers read these at boot, so they only need the (static) path and never wait on RDS
+        self.connection_parameter_path = (settings.db_parameter_path
+            or f"/{pulumi.get_project()}/{pulumi.get_stack()}/db")
+
+        parameters = {
+            "host": ("String", self.connection_host),
+            "read-host": ("String", self.read_host),
+            "port": ("String", self.connection_port.apply(str)),
+            "name": ("String", settings.db_name),
+            "username": ("SecureString", settings.db_username),
+            "password": ("SecureString", settings.db_password),
+        }
+        for key, (parameter_type, value) in parameters.items():
+            aws.ssm.Parameter(self.child_name(f"dbParameter-{key}"),
+                name=f"{self.connection_parameter_path}/{key}",
+                type=parameter_type,
+                value=value,
+                opts=self.child_opts())
@@ -0,0 +1,54 @@
+"""GCS bucket and the service account the Lambda uploads with"""
+
+import pulumi
+import pulumi_gcp as gcp
+
+from components.base import StackComponent
+from settings import Settings
+
+
+class GcpStorage(StackComponent):
+    """A GCS bucket plus a service account and key allowed to create objects in it."""
+
+    TYPE = "pulumi_python:components:GcpStorage"
+
+    def __init__(self, name: str, settings: Settings, opts: pulumi.ResourceOptions = None):
+        super().__init__(name, opts)
+
+        # Create a Google Service Account
+        self.service_account = gcp.serviceaccount.Account("myBucketAccount",
+            account_id=settings.bucket_account_id,
+            display_name=settings.bucket_display_name,
+            opts=self.child_opts())
+
+        # Assign the Service Account Admin role to the newly created service account
+        gcp.projects.IAMBinding("serviceAccountAdminBinding",
+            members=[pulumi.Output.concat("serviceAccount:", self.service_account.email)],
+            role="roles/iam.serviceAccountAdmin",
+            project=settings.gcp_project,
+            opts=self.child_opts())
+
+        # Create a Google Cloud Storage Bucket
+        self.bucket = gcp.storage.Bucket("myBucket",
+            name=settings.gcp_bucket_name,
+            location=settings.bucket_location,
+            force_destroy=True,
+            opts=self.child_opts())
+
+        # Create access key for the bucket service account
+        self.service_account_key = gcp.serviceaccount.Key("bucketAccessKey",
+            service_account_id=self.service_account.name,
+            key_algorithm= "KEY_ALG_RSA_2048",
+            opts=self.child_opts())
+
+        # Attach the roles/storage.objectCreator role to the service account for the bucket
+        gcp.storage.BucketIAMBinding("myBucketIamBinding",
+            bucket=self.bucket.name,
+            role="roles/storage.objectCreator",
+            members=[pulumi.Output.concat("serviceAccount:", pulumi.Output.secret(self.service_account.email))],
+            opts=self.child_opts())
+
+        self.register_outputs({
+            "bucketName": self.bucket.name,
+            "serviceAccountEmail": self.service_account.email,
+        })
@@ -0,0 +1,257 @@
+"""SNS topic and the Lambda function that consumes it, directly or through SQS"""
+
+import base64
+import json
+
+import pulumi
+import pulumi_aws as aws
+
+from components.base import StackComponent
+from lambda_package import build_function_package, build_layer_package, file_base64_sha256
+from settings import Settings
+
+LAMBDA_RUNTIME = aws.lambda_.Runtime.PYTHON3D11
+
+
+class Messaging(StackComponent):
+    """The SNS topic the web app publishes to and the Lambda subscribed to it.
+
+    With sqsBufferEnabled the topic feeds a queue (with a dead-letter queue) that
+    the Lambda drains in batches, instead of one invocation per message.
+    """
+
+    TYPE = "pulumi_python:components:Messaging"
+
+    def __init__(self, name: str, settings: Settings,
+                 dynamodb_table: aws.dynamodb.Table,
+                 gcp_service_account_key: pulumi.Output,
+                 opts: pulumi.ResourceOptions = None):
+        super().__init__(name, opts)
+
+        # Create an SNS topic
+        self.sns_topic = aws.sns.Topic("myTopic", name=settings.sns_topic_name,
+            opts=self.child_opts())
+
+        # The ARN is known up front, so publishers don't have to wait on the topic itself
+        self.sns_topic_arn = f"arn:aws:sns:{settings.aws_region}:{settings.account_id}:{settings.sns_topic_name}"
+
+        # Define a Lambda role with an AssumeRolePolicy
+        self.lambda_role = aws.iam.Role("lambdaRole",
+            assume_role_policy=json.dumps({
+                "Version": "2012-10-17",
+                "Statement": [{
+                    "Action": "sts:AssumeRole",
+                    "Effect": "Allow",
+                    "Principal": {
+                        "Service": "lambda.amazonaws.com",
+                    },
+                }],
+            }),
+            opts=self.child_opts())
+
+        # Attach the basic execution role policy to the Lambda role
+        basic_execution_attachment = aws.iam.RolePolicyAttachment("lambdaBasicExecutionRoleAttachment",
+            role=self.lambda_role.name,
+            policy_arn="arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole",
+            opts=self.child_opts())
+
+        # Attach the Amazon SNS full access policy to the Lambda role
+        sns_attachment = aws.iam.RolePolicyAttachment("lambdaSnsFullAccessPolicyAttachment",
+            role=self.lambda_role.name,
+            policy_arn="arn:aws:iam::aws:policy/AmazonSNSFullAccess",
+            opts=self.child_opts())
+
+        # Create a policy for DynamoDB operations
+        dynamodb_policy = aws.iam.Policy("dynamoDbPolicy",
+            description="A policy for DynamoDB operations",
+            policy=dynamodb_table.arn.apply(lambda arn: json.dumps({
+                "Version": "2012-10-17",
+                "Statement": [{
+                    "Action": [
+                        "dynamodb:PutItem",
+                        "dynamodb:GetItem",
+                        "dynamodb:UpdateItem",
+                        "dynamodb:Query"
+                    ],
+                    "Effect": "Allow",
+                    "Resource": arn,
+                }] + ([{
+                    # Lookups by the configured indexes only, never a scan of them
+                    "Action": "dynamodb:Query",
+                    "Effect": "Allow",
+                    "Resource": [f"{arn}/index/{index.name}" for index in settings.dynamodb_indexes],
+                }] if settings.dynamodb_indexes else []),
+            })),
+            opts=self.child_opts())
+
+        # Attach the DynamoDB policy to the Lambda role
+        dynamodb_attachment = aws.iam.RolePolicyAttachment("lambdaDynamoDbPolicyAttachment",
+            role=self.lambda_role.name,
+            policy_arn=dynamodb_policy.arn,
+            opts=self.child_opts())
+
+        # Reproducible zips cached by content hash, unchanged code is neither re-zipped nor re-uploaded
+        function_package = build_function_package(settings.lambda_file_path)
+        layer_package = build_layer_package(settings.lambda_file_path, LAMBDA_RUNTIME.value, settings.lambda_architecture)
+
+        # Dependencies go into their own layer, so code-only changes upload a small package
+        self.lambda_layer = None
+        if layer_package:
+            self.lambda_layer = aws.lambda_.LayerVersion("myLambdaLayer",
+                layer_name=f"{pulumi.get_project()}-{pulumi.get_stack()}-deps",
+                code=pulumi.FileArchive(layer_package),
+                source_code_hash=file_base64_sha256(layer_package),
+                compatible_runtimes=[LAMBDA_RUNTIME],
+                compatible_architectures=[settings.lambda_architecture],
+                opts=self.child_opts())
+
+        # Define your Lambda function; it only needs its policies in place before it is invoked
+        self.lambda_function = aws.lambda_.Function("myLambdaFunction",
+            runtime=LAMBDA_RUNTIME,
+            code=pulumi.FileArchive(function_package),
+            source_code_hash=file_base64_sha256(function_package),
+            layers=[self.lambda_layer.arn] if self.lambda_layer else None,
+            handler="main.handler",
+            role=self.lambda_role.arn,
+            architectures=[settings.lambda_architecture],
+            memory_size=settings.lambda_memory_size,
+            timeout=settings.lambda_timeout,
+            ephemeral_storage=aws.lambda_.FunctionEphemeralStorageArgs(
+                size=settings.lambda_ephemeral_storage,
+            ),
+            reserved_concurrent_executions=settings.lambda_reserved_concurrency,
+            # Every deploy publishes a version, which the alias below then points at
+            publish=True,
+            environment=aws.lambda_.FunctionEnvironmentArgs(
+                variables={
+                    "GOOGLE_APPLICATION_CREDENTIALS": gcp_service_account_key.apply(
+                        lambda key: base64.b64decode(key).decode('utf-8')),
+                    "GCS_BUCKET_NAME": settings.gcp_bucket_name,
+                    "MAILGUN_API_KEY": settings.mailgun_api_key,
+                    "MAILGUN_DOMAIN": settings.mailgun_domain,
+                    "DYNAMODB_TABLE": settings.dynamodb_table_name,
+                    "REGION": settings.aws_region
+                },
+            ),
+            opts=self.child_opts(depends_on=[basic_execution_attachment, sns_attachment, dynamodb_attachment]))
+
+        # SNS invokes the alias, so provisioned concurrency applies to the published version it points at
+        self.lambda_alias = aws.lambda_.Alias("myLambdaAlias",
+            name="live",
+            function_name=self.lambda_function.name,
+            function_version=self.lambda_function.version,
+            opts=self.child_opts())
+
+        if settings.lambda_provisioned_concurrency:
+            aws.lambda_.ProvisionedConcurrencyConfig("myLambdaProvisionedConcurrency",
+                function_name=self.lambda_function.name,
+                qualifier=self.lambda_alias.name,
+                provisioned_concurrent_executions=settings.lambda_provisioned_concurrency,
+                opts=self.child_opts())
+
+        self.queue = None
+        self.dead_letter_queue = None
+        self.lambda_permission = None
+        self.lambda_subscription = None
+        if settings.sqs_buffer_enabled:
+            self._subscribe_through_queue(settings)
+        else:
+            self._subscribe_directly()
+
+        self.register_outputs({
+            "snsTopicArn": self.sns_topic.arn,
+            "lambdaFunctionArn": self.lambda_function.arn,
+            "lambdaAliasArn": self.lambda_alias.arn,
+        })
+
+    def _subscribe_directly(self):
+        # Grant permission to SNS to invoke the Lambda function
+        self.lambda_permission = aws.lambda_.Permission("myLambdaPermission",
+            action="lambda:InvokeFunction",
+            function=self.lambda_function.name,
+            qualifier=self.lambda_alias.name,
+            principal="sns.amazonaws.com",
+            source_arn=self.sns_topic.arn,
+            opts=self.child_opts())
+
+        # Create an SNS topic subscription for the Lambda function once SNS is allowed to invoke it
+        self.lambda_subscription = aws.sns.TopicSubscription("myLambdaSubscription",
+            topic=self.sns_topic.arn,
+            protocol="lambda",
+            endpoint=self.lambda_alias.arn,
+            opts=self.child_opts(depends_on=[self.lambda_permission]))
+
+    def _subscribe_through_queue(self, settings: Settings):
+        # Messages that keep failing end up here instead of being retried forever
+        self.dead_letter_queue = aws.sqs.Queue("myLambdaDeadLetterQueue",
+            message_retention_seconds=14 * 24 * 3600,
+            opts=self.child_opts())
+
+        self.queue = aws.sqs.Queue("myLambdaQueue",
+            visibility_timeout_seconds=settings.sqs_visibility_timeout or 6 * settings.lambda_timeout,
+            receive_wait_time_seconds=20,
+            redrive_policy=self.dead_letter_queue.arn.apply(lambda arn: json.dumps({
+                "deadLetterTargetArn": arn,
+                "maxReceiveCount": settings.sqs_max_receive_count,
+            })),
+            opts=self.child_opts())
+
+        # Allow only this topic to send to the queue
+        queue_policy = aws.sqs.QueuePolicy("myLambdaQueuePolicy",
+            queue_url=self.queue.id,
+            policy=pulumi.Output.all(self.queue.arn, self.sns_topic.arn).apply(lambda args: json.dumps({
+                "Version": "2012-10-17",
+                "Statement": [{
+                    "Effect": "Allow",
+                    "Principal": {
+                        "Service": "sns.amazonaws.com",
+                    },
+                    "Action": "sqs:SendMessage",
+                    "Resource": args[0],
+                    "Condition": {"ArnEquals": {"aws:SourceArn": args[1]}},
+                }],
+            })),
+            opts=self.child_opts())
+
+        # Raw delivery hands the Lambda the published message as the record body, without the SNS envelope
+        self.queue_subscription = aws.sns.TopicSubscription("myLambdaQueueSubscription",
+            topic=self.sns_topic.arn,
+            protocol="sqs",
+            endpoint=self.queue.arn,
+            raw_message_delivery=True,
+            opts=self.child_opts(depends_on=[queue_policy]))
+
+        # Create a policy that lets the Lambda consume this queue only
+        sqs_policy = aws.iam.Policy("lambdaSqsPolicy",
+            description="A policy for consuming the Lambda's SQS queue",
+            policy=self.queue.arn.apply(lambda arn: json.dumps({
+                "Version": "2012-10-17",
+                "Statement": [{
+                    "Action": [
+                        "sqs:ReceiveMessage",
+                        "sqs:DeleteMessage",
+                        "sqs:ChangeMessageVisibility",
+                        "sqs:GetQueueAttributes"
+                    ],
+                    "Effect": "Allow",
+                    "Resource": arn,
+                }],
+            })),
+            opts=self.child_opts())
+
+        sqs_attachment = aws.iam.RolePolicyAttachment("lambdaSqsPolicyAttachment",
+            role=self.lambda_role.name,
+            policy_arn=sqs_policy.arn,
+            opts=self.child_opts())
+
+        # Lambda polls the queue and hands the alias batches of messages; creating the mapping checks the role
+        self.event_source_mapping = aws.lambda_.EventSourceMapping("myLambdaEventSourceMapping",
+            event_source_arn=self.queue.arn,
+            function_name=self.lambda_alias.arn,
+            batch_size=settings.sqs_batch_size,
+            maximum_batching_window_in_seconds=settings.sqs_batching_window,
+            scaling_config=aws.lambda_.EventSourceMappingScalingConfigArgs(
+                maximum_concurrency=settings.sqs_max_concurrency,
+            ) if settings.sqs_max_concurrency else None,
+            function_response_types=["ReportBatchItemFailures"] if settings.sqs_report_batch_item_failures else None,
+            opts=self.child_opts(depends_on=[sqs_attachment]))
@@ -0,0 +1,248 @@
+"""CloudWatch dashboard and alarms over the stack's resources, alerting through SNS"""
+
+import pulumi
+import pulumi_aws as aws
+
+from alarms import ALARMS, AlarmSpec
+from components.base import StackComponent
+from components.cache import Cache
+from components.compute import Compute
+from components.data import Data
+from components.messaging import Messaging
+from components.networking import Networking
+from db_instance_classes import GIB, max_connections
+from settings import Settings
+
+
+class Monitoring(StackComponent):
+    """Alarms from the table in alarms.py, merged with the stack's alarmThresholds, and a dashboard.
+
+    An alarm is only created when the resource it watches exists on the stack,
+    so the SQS alarms for instance only come with sqsBufferEnabled. Every alarm
+    notifies the alerting topic, both when it fires and when it recovers.
+
+    Only the home region is watched. CloudFront publishes its metrics in us-east-1
+    and alarms can only notify a topic of their own region, so a stack homed
+    elsewhere gets a second alerting topic there for the CloudFront alarms.
+    """
+
+    TYPE = "pulumi_python:components:Monitoring"
+
+    def __init__(self, name: str, settings: Settings,
+                 networking: Networking,
+                 compute: Compute,
+                 data: Data,
+                 messaging: Messaging,
+                 cache: Cache = None,
+                 opts: pulumi.ResourceOptions = None):
+        super().__init__(name, opts)
+        self.settings = settings
+
+        # CloudWatch dimensions of every resource an alarm can watch
+        self.dimensions = {
+            "loadBalancer": {"LoadBalancer": compute.app_load_balancer.arn_suffix},
+            "targetGroup": {
+                "LoadBalancer": compute.app_load_balancer.arn_suffix,
+                "TargetGroup": compute.target_group.arn_suffix,
+            },
+            "autoScalingGroup": {"AutoScalingGroupName": compute.auto_scaling_group.name},
+            "dbInstance": {"DBInstanceIdentifier": data.db_instance.identifier},
+            "lambda": {"FunctionName": messaging.lambda_function.name},
+        }
+        # Only burstable classes earn CPU credits
+        if settings.instance_class.startswith("db.t"):
+            self.dimensions["burstableDbInstance"] = self.dimensions["dbInstance"]
+        if data.dynamodb_table:
+            self.dimensions["table"] = {"TableName": data.dynamodb_table.name}
+        if messaging.queue:
+            self.dimensions["queue"] = {"QueueName": messaging.queue.name}
+            self.dimensions["deadLetterQueue"] = {"QueueName": messaging.dead_letter_queue.name}
+        if data.db_proxy:
+            self.dimensions["dbProxy"] = {"ProxyName": data.db_proxy.name}
+        if data.dax_cluster:
+            self.dimensions["daxCluster"] = {"ClusterId": data.dax_cluster.cluster_name}
+        if compute.distribution:
+            self.dimensions["distribution"] = {"DistributionId": compute.distribution.id, "Region": "Global"}
+
+        # Resources the stack has several of, alarmed on one by one: resource -> [(label, dimensions)]
+        self.instances = {
+            "dbReplica": [(str(i), {"DBInstanceIdentifier": replica.identifier})
+                          for i, replica in enumerate(data.read_replicas)],
+            "natGateway": [(str(i), {"NatGatewayId": nat.id}) for i, nat in enumerate(networking.nat_gateways)],
+        }
+        if cache:
+            # ElastiCache reports per member cluster, which it names after the replication group
+            if settings.cache_shard_count > 1:
+                members = [f"{shard:04d}-{node:03d}" for shard in range(1, settings.cache_shard_count + 1)
+                           for node in range(1, settings.cache_replicas_per_shard + 2)]
+            else:
+                members = [f"{node:03d}" for node in range(1, settings.cache_replicas_per_shard + 2)]
+            self.instances["cacheNode"] = [
+                (member, {"CacheClusterId": pulumi.Output.concat(cache.replication_group.replication_group_id,
+                                                                 "-", member)})
+                for member in members]
+
+        # Create the alerting topic
+        self.alert_topic = self._create_alert_topic()
+        self.cloudfront_alert_topic, self.cloudfront_provider = self.alert_topic, None
+        if compute.distribution and settings.aws_region != "us-east-1":
+            self.cloudfront_provider = aws.Provider("monitoringProvider-us-east-1",
+                region="us-east-1",
+                profile=settings.aws_profile,
+                opts=self.child_opts())
+            self.cloudfront_alert_topic = self._create_alert_topic("-us-east-1", self.cloudfront_provider)
+
+        self.alarms = {}
+        thresholds = {**{name: spec.threshold for name, spec in ALARMS.items()}, **(settings.alarm_thresholds or {})}
+        for alarm_name, spec in ALARMS.items():
+            # A null threshold drops the alarm on this stack
+            if thresholds[alarm_name] is None:
+                continue
+            for label, dimensions in self._targets(spec.resource):
+                name = f"{alarm_name}-{label}" if label else alarm_name
+                self.alarms[name] = self._create_alarm(name, spec, thresholds[alarm_name], dimensions)
+
+        self._create_dashboard()
+
+        self.register_outputs({
+            "alertTopicArn": self.alert_topic.arn,
+            "dashboardName": self.dashboard.dashboard_name,
+        })
+
+    def _create_alert_topic(self, suffix: str = "", provider: aws.Provider = None) -> aws.sns.Topic:
+        topic = aws.sns.Topic(f"alertTopic{suffix}",
+            opts=self.child_opts(provider=provider))
+
+        if self.settings.alarm_email:
+            aws.sns.TopicSubscription(f"alertEmailSubscription{suffix}",
+                topic=topic.arn,
+                protocol="email",
+                endpoint=self.settings.alarm_email,
+                opts=self.child_opts(provider=provider))
+        return topic
+
+    def _targets(self, resource: str) -> list:
+        """(label, dimensions) of every instance of `resource`, the label being None for single resources."""
+        if resource in self.dimensions:
+            return [(None, self.dimensions[resource])]
+        return self.instances.get(resource, [])
+
+    def _absolute_threshold(self, spec: AlarmSpec, threshold: float) -> float:
+        settings = self.settings
+        if spec.relative_to == "maxConnections":
+            base = settings.db_max_connections or max_connections(settings.instance_class)
+        elif spec.relative_to == "allocatedStorage":
+            # With storage autoscaling the volume can grow up to its ceiling
+            base = (settings.db_max_allocated_storage or settings.allocated_storage) * GIB
+        elif spec.relative_to == "lambdaTimeout":
+            base = settings.lambda_timeout * 1000
+        else:
+            return threshold
+        return base * threshold / 100
+
+    def _create_alarm(self, alarm_name: str, spec: AlarmSpec, threshold: float,
+                      dimensions: dict) -> aws.cloudwatch.MetricAlarm:
+        # Percentiles are extended statistics, everything else is a plain one
+        percentile = spec.statistic.startswith("p")
+        cloudfront = spec.resource == "distribution"
+        alert_topic = self.cloudfront_alert_topic if cloudfront else self.alert_topic
+
+        return aws.cloudwatch.MetricAlarm(f"alarm-{alarm_name}",
+            alarm_description=f"{alarm_name}: {spec.description}",
+            namespace=spec.namespace,
+            metric_name=spec.metric,
+            statistic=None if percentile else spec.statistic,
+            extended_statistic=spec.statistic if percentile else None,
+            dimensions=dimensions,
+            period=self.settings.alarm_period,
+            evaluation_periods=spec.evaluation_periods,
+            datapoints_to_alarm=spec.datapoints_to_alarm,
+            threshold=self._absolute_threshold(spec, threshold),
+            comparison_operator=spec.comparison,
+            # No traffic is not an outage, the health check alarms cover that
+            treat_missing_data="notBreaching",
+            alarm_actions=[alert_topic.arn],
+            ok_actions=[alert_topic.arn],
+            opts=self.child_opts(provider=self.cloudfront_provider if cloudfront else None))
+
+    def _metrics(self, resource: str, namespace: str, *series) -> list:
+        """Dashboard metric rows of every instance of `resource`, one per (metric, stat) pair."""
+        rows = []
+        for label, dimensions in self._targets(resource):
+            dimensions = [value for pair in dimensions.items() for value in pair]
+            prefix = f"{label} " if label else ""
+            rows += [[namespace, metric, *dimensions, {"stat": stat, "label": f"{prefix}{metric} {stat}"}]
+                     for metric, stat in series]
+        return rows
+
+    def _create_dashboard(self):
+        settings = self.settings
+
+        panels = [
+            ("Web response time", self._metrics("targetGroup", "AWS/ApplicationELB",
+                ("TargetResponseTime", "p50"), ("TargetResponseTime", "p95"), ("TargetResponseTime", "p99"))),
+            ("Web requests and errors", self._metrics("loadBalancer", "AWS/ApplicationELB",
+                ("RequestCount", "Sum"), ("HTTPCode_Target_5XX_Count", "Sum"), ("HTTPCode_ELB_5XX_Count", "Sum"))),
+            ("Web instances", self._metrics("autoScalingGroup", "AWS/EC2", ("CPUUtilization", "Average"))
+                + self._metrics("targetGroup", "AWS/ApplicationELB",
+                    ("HealthyHostCount", "Minimum"), ("UnHealthyHostCount", "Maximum"))),
+            ("Database load", self._metrics("dbInstance", "AWS/RDS",
+                ("CPUUtilization", "Average"), ("DatabaseConnections", "Maximum"))),
+            ("Database latency", self._metrics("dbInstance", "AWS/RDS",
+                ("ReadLatency", "p99"), ("WriteLatency", "p99"))),
+            ("Lambda duration", self._metrics("lambda", "AWS/Lambda",
+                ("Duration", "p95"), ("Duration", "p99"))),
+            ("Lambda invocations", self._metrics("lambda", "AWS/Lambda",
+                ("Invocations", "Sum"), ("Errors", "Sum"), ("Throttles", "Sum"), ("ConcurrentExecutions", "Maximum"))),
+        ]
+        if self.instances["dbReplica"]:
+            panels.append(("Read replicas", self._metrics("dbReplica", "AWS/RDS",
+                ("ReplicaLag", "Maximum"), ("CPUUtilization", "Average"))))
+        if "dbProxy" in self.dimensions:
+            panels.append(("Database proxy", self._metrics("dbProxy", "AWS/RDS",
+                ("ClientConnections", "Maximum"), ("DatabaseConnectionsBorrowLatency", "Average"))))
+        if "cacheNode" in self.instances:
+            panels.append(("Cache", self._metrics("cacheNode", "AWS/ElastiCache",
+                ("EngineCPUUtilization", "Average"), ("DatabaseMemoryUsagePercentage", "Maximum"))))
+        if self.instances["natGateway"]:
+            panels.append(("NAT gateways", self._metrics("natGateway", "AWS/NATGateway",
+                ("BytesOutToDestination", "Sum"), ("ErrorPortAllocation", "Sum"), ("PacketsDropCount", "Sum"))))
+        if "table" in self.dimensions:
+            panels.append(("DynamoDB", self._metrics("table", "AWS/DynamoDB",
+                ("ConsumedReadCapacityUnits", "Sum"), ("ConsumedWriteCapacityUnits", "Sum"),
+                ("ReadThrottleEvents", "Sum"), ("WriteThrottleEvents", "Sum"))))
+        if "queue" in self.dimensions:
+            panels.append(("Message queue", self._metrics("queue", "AWS/SQS",
+                ("ApproximateNumberOfMessagesVisible", "Maximum"), ("ApproximateAgeOfOldestMessage", "Maximum"))
+                + self._metrics("deadLetterQueue", "AWS/SQS", ("ApproximateNumberOfMessagesVisible", "Maximum"))))
+        if "daxCluster" in self.dimensions:
+            panels.append(("DAX", self._metrics("daxCluster", "AWS/DAX",
+                ("CPUUtilization", "Average"), ("ThrottledRequestCount", "Sum"), ("ErrorRequestCount", "Sum"))))
+
+        widgets = [{
+            "type": "alarm",
+            "width": 24,
+            "height": 4,
+            "properties": {
+                "title": "Alarms",
+                "alarms": [alarm.arn for alarm in self.alarms.values()],
+            },
+        }] if self.alarms else []
+        widgets += [{
+            "type": "metric",
+            "width": 12,
+            "height": 6,
+            "properties": {
+                "title": title,
+                "region": settings.aws_region,
+                "period": settings.alarm_period,
+                "view": "timeSeries",
+                "metrics": metrics,
+            },
+        } for title, metrics in panels]
+
+        # Create a CloudWatch dashboard
+        self.dashboard = aws.cloudwatch.Dashboard("dashboard",
+            dashboard_name=f"{settings.identifier}-{pulumi.get_stack()}",
+            dashboard_body=pulumi.Output.json_dumps({"widgets": widgets}),
+            opts=self.child_opts())
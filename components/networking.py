@@ -0,0 +1,380 @@
+"""VPC, subnets, routing and security groups"""
+
+import pulumi
+import pulumi_aws as aws
+
+from availability_zones import get_availability_zones, select_availability_zones
+from components.base import StackComponent
+from settings import GATEWAY_ENDPOINT_SERVICES, Settings
+from subnet_planner import SubnetPlanner, plan_ipv6_subnets
+
+
+class Networking(StackComponent):
+    """The VPC with one public and one private subnet per AZ, plus the tier security groups."""
+
+    TYPE = "pulumi_python:components:Networking"
+
+    def __init__(self, name: str, settings: Settings, opts: pulumi.ResourceOptions = None, region: str = None):
+        super().__init__(name, opts, region)
+        self.settings = settings
+
+        # Create a new VPC for the current AWS region.
+        self.vpc = aws.ec2.Vpc(self.child_name(settings.vpc_name),
+            cidr_block=str(settings.vpc_cidr_block),
+            assign_generated_ipv6_cidr_block=settings.ipv6_enabled or None,
+            tags= {"Name": settings.vpc_name},
+            opts=self.child_opts())
+
+        #fetching the available az's, previews reuse the on-disk cache while it is fresh
+        available_azs = get_availability_zones(settings.aws_region, settings.account_id, settings.aws_profile,
+                                               settings.az_cache_ttl, pulumi.InvokeOptions(parent=self))
+
+        # limit the az's to the configured count, or to an explicit list
+        self.azs = select_availability_zones(available_azs, settings.az_count, settings.availability_zones)
+
+        # Plan all public subnets first and then the private ones, so existing CIDRs stay put
+        subnet_planner = SubnetPlanner(str(settings.vpc_cidr_block))
+        public_cidr_blocks = [str(subnet_planner.allocate(settings.subnet_mask)) for _ in self.azs]
+        private_cidr_blocks = [str(subnet_planner.allocate(settings.subnet_mask)) for _ in self.azs]
+
+        self.public_subnet_ids = []
+        self.private_subnet_ids = []
+
+        for i, az in enumerate(self.azs):
+            # Create a public subnet
+            public_subnet = aws.ec2.Subnet(self.child_name(f"{settings.public_subnet_name}-{i}"),
+                vpc_id=self.vpc.id,
+                cidr_block=public_cidr_blocks[i],
+                ipv6_cidr_block=self._ipv6_subnet_cidr_block(i),
+                assign_ipv6_address_on_creation=settings.ipv6_enabled or None,
+                availability_zone=az,
+                map_public_ip_on_launch=True,
+                tags= {"Name": f"{settings.public_subnet_name}-{i}"},
+                opts=self.child_opts())
+            self.public_subnet_ids.append(public_subnet.id)
+
+            # Create a private subnet
+            private_subnet = aws.ec2.Subnet(self.child_name(f"{settings.private_subnet_name}-{i}"),
+                vpc_id=self.vpc.id,
+                cidr_block=private_cidr_blocks[i],
+                ipv6_cidr_block=self._ipv6_subnet_cidr_block(len(self.azs) + i),
+                assign_ipv6_address_on_creation=settings.ipv6_enabled or None,
+                availability_zone=az,
+                tags= {"Name": f"{settings.private_subnet_name}-{i}"},
+                opts=self.child_opts())
+            self.private_subnet_ids.append(private_subnet.id)
+
+        self.internet_gateway = aws.ec2.InternetGateway(self.child_name(settings.internet_gateway_name),
+            vpc_id=self.vpc.id,
+            tags= {"Name": settings.internet_gateway_name},
+            opts=self.child_opts())
+
+        self.public_route_table = aws.ec2.RouteTable(self.child_name(settings.public_rt_name),
+            vpc_id=self.vpc.id,
+            routes=[
+                aws.ec2.RouteTableRouteArgs(
+                    cidr_block=str(settings.public_cidr_block),
+                    gateway_id=self.internet_gateway.id,
+                ),
+            ] + ([
+                aws.ec2.RouteTableRouteArgs(
+                    ipv6_cidr_block="::/0",
+                    gateway_id=self.internet_gateway.id,
+                ),
+            ] if settings.ipv6_enabled else []),
+            tags= {"Name": settings.public_rt_name},
+            opts=self.child_opts())
+
+        for i, subnet_id in enumerate(self.public_subnet_ids):
+            aws.ec2.RouteTableAssociation(self.child_name(f"{settings.public_rt_name}-{i}"),
+                route_table_id=self.public_route_table.id,
+                subnet_id=subnet_id,
+                opts=self.child_opts())
+
+        self.private_route_table = aws.ec2.RouteTable(self.child_name(settings.private_rt_name),
+            vpc_id=self.vpc.id,
+            tags= {"Name": settings.private_rt_name},
+            opts=self.child_opts())
+
+        # Private route table of each AZ; they only differ when every AZ has its own NAT gateway
+        self.private_route_tables = [self.private_route_table] * len(self.azs)
+        self.nat_gateways = []
+        if settings.private_compute and settings.nat_gateways != "none":
+            self._create_nat_gateways()
+
+        for i, subnet_id in enumerate(self.private_subnet_ids):
+            aws.ec2.RouteTableAssociation(self.child_name(f"{settings.private_rt_name}-{i}"),
+                route_table_id=self.private_route_tables[i].id,
+                subnet_id=subnet_id,
+                opts=self.child_opts())
+
+        self.proxy_security_group = None
+        self.cache_security_group = None
+        self.dax_security_group = None
+        self._create_security_groups()
+
+        self.vpc_endpoints = {}
+        if settings.vpc_endpoints:
+            self._create_vpc_endpoints()
+
+        self.register_outputs({
+            "vpcId": self.vpc.id,
+            "publicSubnetIds": self.public_subnet_ids,
+            "privateSubnetIds": self.private_subnet_ids,
+        })
+
+    def _create_nat_gateways(self):
+        settings = self.settings
+        nat_count = len(self.azs) if settings.nat_gateways == "per-az" else 1
+
+        for i in range(nat_count):
+            eip = aws.ec2.Eip(self.child_name(f"natEip-{i}"),
+                domain="vpc",
+                tags= {"Name": f"{settings.vpc_name}-nat-{i}"},
+                opts=self.child_opts())
+
+            # Create a NAT gateway in the public subnet of the AZ
+            self.nat_gateways.append(aws.ec2.NatGateway(self.child_name(f"natGateway-{i}"),
+                allocation_id=eip.id,
+                subnet_id=self.public_subnet_ids[i],
+                tags= {"Name": f"{settings.vpc_name}-nat-{i}"},
+                opts=self.child_opts(depends_on=[self.internet_gateway])))
+
+        # The first AZ keeps the shared private route table, the others get their own
+        # so that their traffic leaves through the NAT gateway in the same AZ
+        if nat_count > 1:
+            self.private_route_tables = [self.private_route_table] + [
+                aws.ec2.RouteTable(self.child_name(f"{settings.private_rt_name}-az{i}"),
+                    vpc_id=self.vpc.id,
+                    tags= {"Name": f"{settings.private_rt_name}-az{i}"},
+                    opts=self.child_opts())
+                for i in range(1, nat_count)
+            ]
+
+        for i, route_table in enumerate(self.private_route_tables[:nat_count]):
+            aws.ec2.Route(self.child_name(f"privateNatRoute-{i}"),
+                route_table_id=route_table.id,
+                destination_cidr_block=str(settings.public_cidr_block),
+                nat_gateway_id=self.nat_gateways[i].id,
+                opts=self.child_opts())
+
+    def _create_vpc_endpoints(self):
+        settings = self.settings
+
+        # Traffic to AWS services stays on the AWS network instead of going out through the
+        # internet gateway or a NAT gateway. Gateway endpoints are routes, interface
+        # endpoints are ENIs in the private subnets that the services' DNS names resolve to.
+        route_table_ids = [self.public_route_table.id] + [
+            route_table.id for route_table in dict.fromkeys(self.private_route_tables)]
+
+        interface_services = [service for service in settings.vpc_endpoints
+                              if service not in GATEWAY_ENDPOINT_SERVICES]
+        if interface_services:
+            self.endpoint_security_group = aws.ec2.SecurityGroup(self.child_name("endpoint-sg"),
+                vpc_id=self.vpc.id,
+                description="VPC Endpoint Security Group",
+                opts=self.child_opts())
+
+            aws.ec2.SecurityGroupRule(self.child_name("endpoint-ingress-https"),
+                type="ingress",
+                from_port=443,
+                to_port=443,
+                protocol="tcp",
+                cidr_blocks=[str(settings.vpc_cidr_block)],
+                security_group_id=self.endpoint_security_group.id,
+                opts=self.child_opts())
+
+        for service in settings.vpc_endpoints:
+            gateway = service in GATEWAY_ENDPOINT_SERVICES
+            self.vpc_endpoints[service] = aws.ec2.VpcEndpoint(self.child_name(f"vpcEndpoint-{service}"),
+                vpc_id=self.vpc.id,
+                service_name=f"com.amazonaws.{settings.aws_region}.{service}",
+                vpc_endpoint_type="Gateway" if gateway else "Interface",
+                route_table_ids=route_table_ids if gateway else None,
+                subnet_ids=None if gateway else self.private_subnet_ids,
+                security_group_ids=None if gateway else [self.endpoint_security_group.id],
+                private_dns_enabled=None if gateway else True,
+                tags= {"Name": f"{settings.vpc_name}-{service}"},
+                opts=self.child_opts())
+
+    def _ipv6_subnet_cidr_block(self, subnet_index: int):
+        if not self.settings.ipv6_enabled:
+            return None
+        subnet_count = 2 * len(self.azs)
+        # Each subnet gets its own /64 out of the VPC's Amazon-provided /56
+        return self.vpc.ipv6_cidr_block.apply(
+            lambda block: plan_ipv6_subnets(block, subnet_count)[subnet_index])
+
+    def _create_security_groups(self):
+        settings = self.settings
+        anywhere = str(settings.public_cidr_block)
+
+        self.lb_security_group = aws.ec2.SecurityGroup(self.child_name("lb-sg"),
+            vpc_id=self.vpc.id,
+            description="Load Balancer Security Group",
+            opts=self.child_opts())
+
+        # Behind CloudFront the load balancer only admits CloudFront's origin-facing
+        # addresses, so clients cannot bypass the cache by calling it directly. The
+        # prefix list counts as about 55 rules against the group's quota, and CloudFront
+        # only reaches the origin over HTTPS, so port 80 stays closed.
+        lb_sources = {"cidr_blocks": [anywhere]}
+        if settings.cloudfront_enabled:
+            origin_facing = aws.ec2.get_managed_prefix_list(name="com.amazonaws.global.cloudfront.origin-facing",
+                opts=pulumi.InvokeOptions(parent=self))
+            lb_sources = {"prefix_list_ids": [origin_facing.id]}
+        else:
+            aws.ec2.SecurityGroupRule(self.child_name("lb-ingress-http"),
+                type="ingress",
+                from_port=80,
+                to_port=80,
+                protocol="tcp",
+                **lb_sources,
+                security_group_id=self.lb_security_group.id,
+                opts=self.child_opts())
+
+        aws.ec2.SecurityGroupRule(self.child_name("lb-ingress-https"),
+            type="ingress",
+            from_port=443,
+            to_port=443,
+            protocol="tcp",
+            **lb_sources,
+            security_group_id=self.lb_security_group.id,
+            opts=self.child_opts())
+
+        aws.ec2.SecurityGroupRule(self.child_name("lb-egress"),
+            type="egress",
+            from_port=0,
+            to_port=0,
+            protocol="-1",
+            cidr_blocks=[anywhere],
+            security_group_id=self.lb_security_group.id,
+            opts=self.child_opts())
+
+        self.app_security_group = aws.ec2.SecurityGroup(self.child_name("app-sg"),
+            vpc_id=self.vpc.id,
+            description="Application Security Group",
+            opts=self.child_opts())
+
+        # Private instances are reached through SSM Session Manager instead of SSH
+        if not settings.private_compute:
+            aws.ec2.SecurityGroupRule(self.child_name("app-ingress-ssh"),
+                type="ingress",
+                from_port=22,
+                to_port=22,
+                protocol="tcp",
+                security_group_id=self.app_security_group.id,
+                source_security_group_id=self.lb_security_group.id,
+                opts=self.child_opts())
+
+        aws.ec2.SecurityGroupRule(self.child_name("app-ingress-app"),
+            type="ingress",
+            from_port=settings.application_port,
+            to_port=settings.application_port,
+            protocol="tcp",
+            security_group_id=self.app_security_group.id,
+            source_security_group_id=self.lb_security_group.id,
+            opts=self.child_opts())
+
+        aws.ec2.SecurityGroupRule(self.child_name("app-egress"),
+            type="egress",
+            from_port=0,
+            to_port=0,
+            protocol="-1",
+            cidr_blocks=[anywhere],
+            security_group_id=self.app_security_group.id,
+            opts=self.child_opts())
+
+        self.rds_security_group = aws.ec2.SecurityGroup(self.child_name("rds-sg"),
+            vpc_id=self.vpc.id,
+            description="RDS Security Group",
+            opts=self.child_opts())
+
+        aws.ec2.SecurityGroupRule(self.child_name("rds-ingress-pgsql"),
+            type="ingress",
+            from_port=5432,
+            to_port=5432,
+            protocol="tcp",
+            security_group_id=self.rds_security_group.id,
+            source_security_group_id=self.app_security_group.id,
+            opts=self.child_opts())
+
+        if settings.db_proxy_enabled:
+            self._create_proxy_security_group()
+
+        if settings.dax_enabled:
+            self._create_dax_security_group()
+
+        if settings.cache_enabled:
+            self.cache_security_group = aws.ec2.SecurityGroup(self.child_name("cache-sg"),
+                vpc_id=self.vpc.id,
+                description="Cache Security Group",
+                opts=self.child_opts())
+
+            aws.ec2.SecurityGroupRule(self.child_name("cache-ingress-redis"),
+                type="ingress",
+                from_port=6379,
+                to_port=6379,
+                protocol="tcp",
+                security_group_id=self.cache_security_group.id,
+                source_security_group_id=self.app_security_group.id,
+                opts=self.child_opts())
+
+        aws.ec2.SecurityGroupRule(self.child_name("rds-egress"),
+            type="egress",
+            from_port=0,
+            to_port=0,
+            protocol="-1",
+            cidr_blocks=[anywhere],
+            security_group_id=self.rds_security_group.id,
+            opts=self.child_opts())
+
+    def _create_dax_security_group(self):
+        # DAX is only reachable inside the VPC, clients connect on its unencrypted port
+        self.dax_security_group = aws.ec2.SecurityGroup(self.child_name("dax-sg"),
+            vpc_id=self.vpc.id,
+            description="DAX Security Group",
+            opts=self.child_opts())
+
+        aws.ec2.SecurityGroupRule(self.child_name("dax-ingress"),
+            type="ingress",
+            from_port=8111,
+            to_port=8111,
+            protocol="tcp",
+            security_group_id=self.dax_security_group.id,
+            source_security_group_id=self.app_security_group.id,
+            opts=self.child_opts())
+
+    def _create_proxy_security_group(self):
+        # The proxy sits between the app and RDS, so it takes the app's connections and opens its own
+        self.proxy_security_group = aws.ec2.SecurityGroup(self.child_name("proxy-sg"),
+            vpc_id=self.vpc.id,
+            description="RDS Proxy Security Group",
+            opts=self.child_opts())
+
+        aws.ec2.SecurityGroupRule(self.child_name("proxy-ingress-pgsql"),
+            type="ingress",
+            from_port=5432,
+            to_port=5432,
+            protocol="tcp",
+            security_group_id=self.proxy_security_group.id,
+            source_security_group_id=self.app_security_group.id,
+            opts=self.child_opts())
+
+        aws.ec2.SecurityGroupRule(self.child_name("proxy-egress-pgsql"),
+            type="egress",
+            from_port=5432,
+            to_port=5432,
+            protocol="tcp",
+            security_group_id=self.proxy_security_group.id,
+            source_security_group_id=self.rds_security_group.id,
+            opts=self.child_opts())
+
+        aws.ec2.SecurityGroupRule(self.child_name("rds-ingress-proxy"),
+            type="ingress",
+            from_port=5432,
+            to_port=5432,
+            protocol="tcp",
+            security_group_id=self.rds_security_group.id,
+            source_security_group_id=self.proxy_security_group.id,
+            opts=self.child_opts())
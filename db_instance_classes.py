@@ -0,0 +1,112 @@
+"""Hardware of the RDS instance classes this project sizes Postgres settings from"""
+
+GIB = 1024 ** 3
+MIB = 1024 ** 2
+KIB = 1024
+
+# Postgres counts shared_buffers and effective_cache_size in 8 kB pages
+PAGE_SIZE = 8 * KIB
+
+# RDS's default for Postgres, evaluated by RDS against the instance's DBInstanceClassMemory
+MAX_CONNECTIONS_FORMULA = "LEAST({DBInstanceClassMemory/9531392},5000)"
+
+# Instance class -> (vCPUs, memory in GiB)
+DB_INSTANCE_CLASSES = {
+    "db.t3.micro": (2, 1),
+    "db.t3.small": (2, 2),
+    "db.t3.medium": (2, 4),
+    "db.t3.large": (2, 8),
+    "db.t3.xlarge": (4, 16),
+    "db.t3.2xlarge": (8, 32),
+    "db.t4g.micro": (2, 1),
+    "db.t4g.small": (2, 2),
+    "db.t4g.medium": (2, 4),
+    "db.t4g.large": (2, 8),
+    "db.t4g.xlarge": (4, 16),
+    "db.t4g.2xlarge": (8, 32),
+    "db.m5.large": (2, 8),
+    "db.m5.xlarge": (4, 16),
+    "db.m5.2xlarge": (8, 32),
+    "db.m5.4xlarge": (16, 64),
+    "db.m6g.large": (2, 8),
+    "db.m6g.xlarge": (4, 16),
+    "db.m6g.2xlarge": (8, 32),
+    "db.m6g.4xlarge": (16, 64),
+    "db.m7g.large": (2, 8),
+    "db.m7g.xlarge": (4, 16),
+    "db.m7g.2xlarge": (8, 32),
+    "db.m7g.4xlarge": (16, 64),
+    "db.r5.large": (2, 16),
+    "db.r5.xlarge": (4, 32),
+    "db.r5.2xlarge": (8, 64),
+    "db.r5.4xlarge": (16, 128),
+    "db.r6g.large": (2, 16),
+    "db.r6g.xlarge": (4, 32),
+    "db.r6g.2xlarge": (8, 64),
+    "db.r6g.4xlarge": (16, 128),
+    "db.r7g.large": (2, 16),
+    "db.r7g.xlarge": (4, 32),
+    "db.r7g.2xlarge": (8, 64),
+    "db.r7g.4xlarge": (16, 128),
+}
+
+
+def instance_vcpus(instance_class: str) -> int:
+    try:
+        return DB_INSTANCE_CLASSES[instance_class][0]
+    except KeyError:
+        raise ValueError(f"unknown RDS instance class {instance_class!r}") from None
+
+
+def instance_memory_bytes(instance_class: str) -> int:
+    try:
+        return DB_INSTANCE_CLASSES[instance_class][1] * GIB
+    except KeyError:
+        raise ValueError(f"unknown RDS instance class {instance_class!r}") from None
+
+
+def instance_class_memory_bytes(instance_class: str) -> int:
+    """Estimate of DBInstanceClassMemory, the memory RDS leaves to Postgres.
+
+    RDS reserves part of the nominal memory for the OS and its own agents, about
+    a tenth of it and never less than 256 MiB. The real value is only known to
+    RDS, so this stays on the low side.
+    """
+    memory = instance_memory_bytes(instance_class)
+    return memory - max(memory // 10, 256 * MIB)
+
+
+def max_connections(instance_class: str) -> int:
+    """What MAX_CONNECTIONS_FORMULA comes to on `instance_class`, for sizing things against it."""
+    return min(instance_class_memory_bytes(instance_class) // 9531392, 5000)
+
+
+def postgres_parameters(instance_class: str, storage_type: str, connections: int = None) -> dict:
+    """Postgres settings sized for `instance_class`, as {name: (value, apply method)}.
+
+    Memory-based sizes are RDS formulas over DBInstanceClassMemory, so RDS works them
+    out from the memory it actually leaves to Postgres. work_mem divides by the
+    connection count, which a formula cannot, so it uses the estimate of that memory.
+    Values use the units RDS expects: 8 kB pages for the buffer sizes and kB for work_mem.
+    Static parameters only take effect after a reboot, RDS rejects "immediate" for them.
+    """
+    memory = instance_class_memory_bytes(instance_class)
+    vcpus = instance_vcpus(instance_class)
+
+    # What shared_buffers leaves for sorts and hashes, split over every connection running a few of them at once
+    work_mem = max((memory - memory // 4) // 4 // (connections or max_connections(instance_class)) // KIB, 4 * KIB)
+
+    return {
+        "max_connections": (connections or MAX_CONNECTIONS_FORMULA, "pending-reboot"),
+        # A quarter of the memory, in pages: DBInstanceClassMemory / 4 / PAGE_SIZE
+        "shared_buffers": (f"{{DBInstanceClassMemory/{4 * PAGE_SIZE}}}", "pending-reboot"),
+        # Planner hint for what the OS page cache and shared_buffers hold together, three quarters of the memory
+        "effective_cache_size": (f"{{DBInstanceClassMemory*3/{4 * PAGE_SIZE}}}", "immediate"),
+        "work_mem": (work_mem, "immediate"),
+        # Random reads on EBS SSDs cost about as much as sequential ones
+        "random_page_cost": ("4" if storage_type == "standard" else "1.1", "immediate"),
+        "max_worker_processes": (max(8, vcpus), "pending-reboot"),
+        "max_parallel_workers": (vcpus, "immediate"),
+        "max_parallel_workers_per_gather": (max(1, vcpus // 2), "immediate"),
+        "shared_preload_libraries": ("pg_stat_statements", "pending-reboot"),
+    }
@@ -0,0 +1,223 @@
+"""Critical-path profiler for `pulumi up`
+
+Rebuilds the resource dependency DAG by evaluating the program offline against
+mocks (see offline.py) and lays per-resource create times over it. Times come
+from a recorded `pulumi up --event-log` file when one is given, and from
+typical provisioning times otherwise. The result is the critical path, the
+slack of every resource and tier, as JSON and as a flame-style text report.
+
+    pulumi up --event-log events.jsonl
+    python deploy_profiler.py --stack dev --event-log events.jsonl --json profile.json
+"""
+
+import argparse
+import json
+import sys
+
+# Rough create times in seconds, used for resources the event log doesn't cover
+TYPICAL_CREATE_SECONDS = {
+    "aws:rds/instance:Instance": 600,
+    "aws:rds/proxy:Proxy": 300,
+    "aws:elasticache/replicationGroup:ReplicationGroup": 600,
+    "aws:dax/cluster:Cluster": 600,
+    "aws:cloudfront/distribution:Distribution": 300,
+    "aws:lb/loadBalancer:LoadBalancer": 180,
+    "aws:ec2/natGateway:NatGateway": 120,
+    "aws:ec2/vpcEndpoint:VpcEndpoint": 90,
+    "aws:autoscaling/group:Group": 60,
+    "aws:ec2/instance:Instance": 45,
+    "aws:route53/record:Record": 45,
+    "aws:lambda/provisionedConcurrencyConfig:ProvisionedConcurrencyConfig": 120,
+    "aws:lambda/function:Function": 15,
+    "gcp:storage/bucket:Bucket": 5,
+    "gcp:serviceaccount/account:Account": 5,
+}
+DEFAULT_CREATE_SECONDS = 3
+
+
+def load_event_log(path: str) -> dict:
+    """Read create start/end timestamps per URN from a `pulumi up --event-log` file."""
+    timings = {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            for kind, edge in (("resourcePreEvent", "start"),
+                               ("resOutputsEvent", "end"),
+                               ("resOpFailedEvent", "end")):
+                if kind not in event:
+                    continue
+                metadata = event[kind]["metadata"]
+                if metadata.get("op") == "same":
+                    continue
+                timing = timings.setdefault(metadata["urn"], {})
+                timestamp = event["timestamp"]
+                if edge == "start":
+                    timing["start"] = min(timing.get("start", timestamp), timestamp)
+                else:
+                    timing["end"] = max(timing.get("end", timestamp), timestamp)
+    return {urn: timing for urn, timing in timings.items() if "start" in timing and "end" in timing}
+
+
+def build_graph(registrations: dict) -> dict:
+    """Turn recorded registrations into a DAG of URN -> node.
+
+    Providers and the stack itself are dropped. A component counts as finished
+    when all of its children are, so it depends on every child.
+    """
+    nodes = {}
+    for urn, registration in registrations.items():
+        if registration["type"].startswith("pulumi:providers:") or registration["type"] == "pulumi:pulumi:Stack":
+            continue
+        nodes[urn] = {**registration, "dependencies": set(registration["dependencies"])}
+
+    for urn, node in nodes.items():
+        if node["parent"] in nodes:
+            nodes[node["parent"]]["dependencies"].add(urn)
+    for node in nodes.values():
+        node["dependencies"] &= nodes.keys()
+
+    for urn, node in nodes.items():
+        tier = node
+        while tier["parent"] in nodes:
+            tier = nodes[tier["parent"]]
+        node["tier"] = tier["name"]
+    return nodes
+
+
+def _topological_order(nodes: dict) -> list:
+    remaining = {urn: len(node["dependencies"]) for urn, node in nodes.items()}
+    dependents = {urn: [] for urn in nodes}
+    for urn, node in nodes.items():
+        for dependency in node["dependencies"]:
+            dependents[dependency].append(urn)
+
+    ready = sorted(urn for urn, count in remaining.items() if count == 0)
+    order = []
+    while ready:
+        urn = ready.pop()
+        order.append(urn)
+        for dependent in dependents[urn]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                ready.append(dependent)
+
+    if len(order) != len(nodes):
+        raise ValueError("Resource graph has a cycle")
+    return order
+
+
+def analyze(nodes: dict, timings: dict = None) -> dict:
+    """Schedule every resource as early as its dependencies allow and find the critical path."""
+    timings = timings or {}
+    order = _topological_order(nodes)
+
+    durations = {}
+    for urn, node in nodes.items():
+        if not node["custom"]:
+            durations[urn] = 0
+        elif urn in timings:
+            durations[urn] = timings[urn]["end"] - timings[urn]["start"]
+        else:
+            durations[urn] = TYPICAL_CREATE_SECONDS.get(node["type"], DEFAULT_CREATE_SECONDS)
+
+    earliest_start, earliest_finish = {}, {}
+    for urn in order:
+        earliest_start[urn] = max((earliest_finish[d] for d in nodes[urn]["dependencies"]), default=0)
+        earliest_finish[urn] = earliest_start[urn] + durations[urn]
+    makespan = max(earliest_finish.values(), default=0)
+
+    latest_finish = {urn: makespan for urn in nodes}
+    for urn in reversed(order):
+        latest_start = latest_finish[urn] - durations[urn]
+        for dependency in nodes[urn]["dependencies"]:
+            latest_finish[dependency] = min(latest_finish[dependency], latest_start)
+
+    # Walk back from the last resource to finish through whichever dependency finished last,
+    # breaking ties on the URN so the same graph always reports the same path
+    finish_order = lambda u: (earliest_finish[u], u)
+    critical_path = []
+    urn = max(earliest_finish, key=finish_order, default=None)
+    while urn is not None:
+        critical_path.append(urn)
+        urn = max(nodes[urn]["dependencies"], key=finish_order, default=None)
+    critical_path.reverse()
+    on_critical_path = set(critical_path)
+
+    resources = []
+    tiers = {}
+    for urn in sorted(nodes, key=lambda u: (earliest_start[u], nodes[u]["name"])):
+        node = nodes[urn]
+        slack = latest_finish[urn] - earliest_finish[urn]
+        resources.append({
+            "urn": urn,
+            "name": node["name"],
+            "type": node["type"],
+            "tier": node["tier"],
+            "start": earliest_start[urn],
+            "duration": durations[urn],
+            "finish": earliest_finish[urn],
+            "slack": slack,
+            "measured": urn in timings,
+            "critical": urn in on_critical_path,
+        })
+        if node["custom"]:
+            tier = tiers.setdefault(node["tier"], {"start": earliest_start[urn], "finish": 0, "slack": slack})
+            tier["start"] = min(tier["start"], earliest_start[urn])
+            tier["finish"] = max(tier["finish"], earliest_finish[urn])
+            tier["slack"] = min(tier["slack"], slack)
+
+    return {
+        "makespan": makespan,
+        "criticalPath": [nodes[urn]["name"] for urn in critical_path if nodes[urn]["custom"]],
+        "tiers": tiers,
+        "resources": resources,
+    }
+
+
+def render_report(profile: dict, width: int = 60) -> str:
+    """Render the schedule as one bar per resource, critical resources marked with '*'."""
+    makespan = profile["makespan"] or 1
+    lines = [f"makespan {profile['makespan']:.0f}s  critical path: " + " -> ".join(profile["criticalPath"]), ""]
+    for resource in profile["resources"]:
+        if resource["duration"] == 0:
+            continue
+        offset = int(resource["start"] / makespan * width)
+        length = max(1, int(resource["duration"] / makespan * width))
+        bar = " " * offset + ("#" if resource["critical"] else "=") * length
+        lines.append(f"{bar:<{width}} {'*' if resource['critical'] else ' '} "
+                     f"{resource['duration']:>5.0f}s slack {resource['slack']:>5.0f}s  "
+                     f"{resource['tier']}/{resource['name']}")
+    lines.append("")
+    for name, tier in sorted(profile["tiers"].items(), key=lambda item: item[1]["slack"]):
+        lines.append(f"tier {name:<20} {tier['start']:>5.0f}s -> {tier['finish']:>5.0f}s  slack {tier['slack']:>5.0f}s")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stack", default="dev", help="stack whose Pulumi.<stack>.yaml is evaluated")
+    parser.add_argument("--event-log", help="event log written by `pulumi up --event-log`")
+    parser.add_argument("--json", help="write the full profile as JSON to this file")
+    parser.add_argument("--config", action="append", default=[], metavar="KEY=VALUE",
+                        help="override a config value for the offline evaluation")
+    args = parser.parse_args(argv)
+
+    # Imported lazily so the analysis functions above stay usable without the Pulumi SDK
+    from offline import run_program
+
+    overrides = dict(item.split("=", 1) for item in args.config)
+    monitor = run_program(args.stack, overrides)
+    nodes = build_graph(monitor.registrations)
+    timings = load_event_log(args.event_log) if args.event_log else None
+    profile = analyze(nodes, timings)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(profile, f, indent=2)
+    print(render_report(profile))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
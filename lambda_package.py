@@ -0,0 +1,185 @@
+"""Reproducible, content-addressed Lambda packaging with an on-disk cache"""
+
+import argparse
+import base64
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+from paths import CACHE_DIR
+
+PACKAGE_CACHE_DIR = os.path.join(CACHE_DIR, "lambda")
+
+# Same timestamp for every entry (the earliest a zip can hold), so the bytes only depend on content
+_ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+_IGNORED_NAMES = {"__pycache__", ".git", ".venv", ".pytest_cache", ".DS_Store"}
+_IGNORED_SUFFIXES = (".pyc", ".pyo")
+
+_PIP_PLATFORMS = {"x86_64": "manylinux2014_x86_64", "arm64": "manylinux2014_aarch64"}
+
+
+def _walk(root: str) -> list:
+    """Sorted relative paths of the files under `root`, skipping caches and VCS metadata."""
+    paths = []
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in _IGNORED_NAMES]
+        for filename in filenames:
+            if filename in _IGNORED_NAMES or filename.endswith(_IGNORED_SUFFIXES):
+                continue
+            paths.append(os.path.relpath(os.path.join(directory, filename), root).replace(os.sep, "/"))
+    return sorted(paths)
+
+
+def _vendored_top_levels(root: str) -> set:
+    """Top-level entries of `root` that belong to an installed (vendored) distribution."""
+    owned = set()
+    for entry in os.listdir(root):
+        if not entry.endswith(".dist-info"):
+            continue
+        owned.add(entry)
+        record = os.path.join(root, entry, "RECORD")
+        if os.path.exists(record):
+            with open(record) as f:
+                for line in f:
+                    path = line.split(",", 1)[0]
+                    if path and not path.startswith(".."):
+                        owned.add(path.split("/", 1)[0])
+    return owned
+
+
+def _split_sources(root: str):
+    """Split the files of `root` into the function's own sources and its vendored dependencies."""
+    vendored = _vendored_top_levels(root)
+    function_files, dependency_files = [], []
+    for path in _walk(root):
+        top_level = path.split("/", 1)[0]
+        if top_level in vendored:
+            dependency_files.append(path)
+        elif path != "requirements.txt":
+            function_files.append(path)
+    return function_files, dependency_files
+
+
+def _hash_files(root: str, paths: list, *extra: str) -> str:
+    digest = hashlib.sha256()
+    for value in extra:
+        digest.update(value.encode("utf-8") + b"\0")
+    for path in paths:
+        digest.update(path.encode("utf-8") + b"\0")
+        with open(os.path.join(root, path), "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def write_reproducible_zip(zip_path: str, files: list):
+    """Write `files`, (archive name, source path) pairs, as a zip that is byte-identical for identical content."""
+    tmp_path = f"{zip_path}.{os.getpid()}.tmp"
+    with zipfile.ZipFile(tmp_path, "w") as archive:
+        for name, source in sorted(files):
+            info = zipfile.ZipInfo(name, date_time=_ZIP_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.create_system = 3
+            mode = 0o755 if os.access(source, os.X_OK) else 0o644
+            info.external_attr = (0o100000 | mode) << 16
+            with open(source, "rb") as f:
+                archive.writestr(info, f.read(), compresslevel=9)
+    # Swap the file in atomically so concurrent builds never read a partial zip
+    os.replace(tmp_path, zip_path)
+
+
+def file_base64_sha256(path: str) -> str:
+    """The `source_code_hash` Lambda expects for a package, base64 of the zip's SHA-256."""
+    with open(path, "rb") as f:
+        return base64.b64encode(hashlib.sha256(f.read()).digest()).decode("utf-8")
+
+
+def _cached_zip(kind: str, key: str, build) -> str:
+    zip_path = os.path.join(PACKAGE_CACHE_DIR, f"{kind}-{key[:32]}.zip")
+    if not os.path.exists(zip_path):
+        os.makedirs(PACKAGE_CACHE_DIR, exist_ok=True)
+        build(zip_path)
+    return zip_path
+
+
+def _pip_install(requirements: str, target: str, runtime: str, architecture: str):
+    python_version = runtime.replace("python", "")
+    subprocess.run([
+        sys.executable, "-m", "pip", "install", "--quiet", "--no-compile",
+        "--requirement", requirements,
+        "--target", target,
+        "--platform", _PIP_PLATFORMS[architecture],
+        "--implementation", "cp",
+        "--python-version", python_version,
+        "--only-binary=:all:",
+    ], check=True)
+
+
+def build_function_package(source_dir: str) -> str:
+    """Zip the function's own sources, without any vendored dependencies, and return the cached path."""
+    function_files, _ = _split_sources(source_dir)
+    key = _hash_files(source_dir, function_files, "function")
+
+    return _cached_zip("function", key, lambda zip_path: write_reproducible_zip(
+        zip_path, [(path, os.path.join(source_dir, path)) for path in function_files]))
+
+
+def build_layer_package(source_dir: str, runtime: str, architecture: str):
+    """Zip the function's dependencies as a layer and return the cached path, or None if it has none.
+
+    Dependencies are whatever is vendored next to the sources plus requirements.txt,
+    installed for the Lambda's runtime and architecture under python/.
+    """
+    _, dependency_files = _split_sources(source_dir)
+    requirements = os.path.join(source_dir, "requirements.txt")
+    has_requirements = os.path.exists(requirements)
+    if not dependency_files and not has_requirements:
+        return None
+
+    hashed = dependency_files + (["requirements.txt"] if has_requirements else [])
+    key = _hash_files(source_dir, hashed, "layer", runtime, architecture)
+
+    def build(zip_path: str):
+        files = [(f"python/{path}", os.path.join(source_dir, path)) for path in dependency_files]
+        with tempfile.TemporaryDirectory() as target:
+            if has_requirements:
+                _pip_install(requirements, target, runtime, architecture)
+            vendored = {name for name, _ in files}
+            files += [(f"python/{path}", os.path.join(target, path)) for path in _walk(target)
+                      if f"python/{path}" not in vendored]
+            write_reproducible_zip(zip_path, files)
+
+    return _cached_zip("layer", key, build)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the Lambda function and layer packages, reporting cache hits.")
+    parser.add_argument("source_dir", help="directory holding the function sources")
+    parser.add_argument("--runtime", default="python3.11")
+    parser.add_argument("--architecture", default="x86_64", choices=sorted(_PIP_PLATFORMS))
+    parser.add_argument("--clean", action="store_true", help="drop the package cache before building")
+    args = parser.parse_args(argv)
+
+    if args.clean:
+        shutil.rmtree(PACKAGE_CACHE_DIR, ignore_errors=True)
+
+    for kind, build in (("function", lambda: build_function_package(args.source_dir)),
+                        ("layer", lambda: build_layer_package(args.source_dir, args.runtime, args.architecture))):
+        started = time.perf_counter()
+        cached = set(os.listdir(PACKAGE_CACHE_DIR)) if os.path.isdir(PACKAGE_CACHE_DIR) else set()
+        zip_path = build()
+        elapsed = time.perf_counter() - started
+        if zip_path is None:
+            print(f"{kind:<9} none")
+            continue
+        state = "cached" if os.path.basename(zip_path) in cached else "built"
+        print(f"{kind:<9} {state:<6} {elapsed * 1000:8.1f} ms  {os.path.getsize(zip_path):>10} B  {zip_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Run preview, up or refresh across several stacks concurrently
+
+Real runs go through the Automation API against the project in this directory,
+with one LocalWorkspace per stack and at most --concurrency stacks at a time.
+Each stack's output is streamed with a [stack] prefix, and a summary with
+per-stack timings is printed at the end. With --offline every stack is instead
+evaluated against mocks (see offline.py) in its own process, so the driver runs
+without the pulumi CLI, credentials or a backend.
+
+    python multi_stack.py preview --stack dev --stack prod --concurrency 2
+    python multi_stack.py up --backend-url file://~/.pulumi-local
+    python multi_stack.py preview --offline
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import glob
+import os
+import sys
+import threading
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+OPERATIONS = ("preview", "up", "refresh")
+OFFLINE_OPERATIONS = ("preview", "up")
+
+
+@dataclasses.dataclass
+class StackResult:
+    stack: str
+    operation: str
+    status: str = "pending"
+    seconds: float = 0.0
+    changes: dict = dataclasses.field(default_factory=dict)
+    error: str = None
+
+
+def discover_stacks() -> list:
+    """Every stack with a Pulumi.<stack>.yaml next to the program."""
+    paths = glob.glob(os.path.join(PROJECT_DIR, "Pulumi.*.yaml"))
+    return sorted(os.path.basename(path)[len("Pulumi."):-len(".yaml")] for path in paths)
+
+
+class PrefixedOutput:
+    """Writes lines from concurrent stacks without interleaving them, each prefixed with its stack."""
+
+    def __init__(self, stacks: list):
+        self.width = max(map(len, stacks))
+        self.lock = threading.Lock()
+
+    def __call__(self, stack: str, text: str):
+        with self.lock:
+            for line in text.rstrip("\n").splitlines():
+                print(f"[{stack:<{self.width}}] {line}", flush=True)
+
+
+def _run_automation(stack_name: str, operation: str, backend_url: str, parallel: int, output: PrefixedOutput,
+                    program=None) -> dict:
+    """Run `operation` on one stack through the Automation API and return its resource changes.
+
+    `program` runs an inline program in place of the project in this directory.
+    """
+    from pulumi import automation as auto
+
+    env_vars = {"PULUMI_BACKEND_URL": backend_url} if backend_url else None
+    opts = auto.LocalWorkspaceOptions(env_vars=env_vars)
+    if program:
+        stack = auto.create_or_select_stack(stack_name, project_name="multi_stack", program=program, opts=opts)
+    else:
+        stack = auto.create_or_select_stack(stack_name, work_dir=PROJECT_DIR, opts=opts)
+    on_output = lambda line: output(stack_name, line)
+
+    if operation == "preview":
+        changes = stack.preview(parallel=parallel, color="never", on_output=on_output).change_summary
+    elif operation == "up":
+        changes = stack.up(parallel=parallel, color="never", on_output=on_output).summary.resource_changes
+    else:
+        changes = stack.refresh(parallel=parallel, color="never", on_output=on_output).summary.resource_changes
+    # Previews count changes by OpType, updates by the op's name
+    return {getattr(kind, "value", kind): count for kind, count in (changes or {}).items()}
+
+
+async def _run_offline(stack: str, operation: str, output: PrefixedOutput) -> dict:
+    """Evaluate one stack against the mocks in a subprocess, streaming its output as it comes."""
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.abspath(__file__), operation, "--worker", stack,
+        cwd=PROJECT_DIR, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+
+    changes = {}
+    tail = []
+    async for raw in process.stdout:
+        line = raw.decode("utf-8", "replace").rstrip("\n")
+        if line.startswith("+ "):
+            changes["create"] = changes.get("create", 0) + 1
+        tail = (tail + [line])[-20:]
+        output(stack, line)
+
+    if await process.wait() != 0:
+        raise RuntimeError("\n".join(tail))
+    return changes
+
+
+def run_worker(stack: str, operation: str):
+    """Entry point of the --offline subprocesses: evaluate the stack and print what it would create."""
+    from offline import run_program
+
+    monitor = run_program(stack, preview=operation == "preview")
+    registrations = sorted(monitor.registrations.values(), key=lambda registration: registration["registeredAt"])
+    for registration in registrations:
+        if registration["type"] == "pulumi:pulumi:Stack" or registration["type"].startswith("pulumi:providers:"):
+            continue
+        print(f"+ {registration['type']:<60} {registration['name']}", flush=True)
+
+
+async def run_stack(stack: str, operation: str, semaphore: asyncio.Semaphore, args, output: PrefixedOutput) -> StackResult:
+    result = StackResult(stack, operation)
+    async with semaphore:
+        output(stack, f"{operation} started")
+        started = time.perf_counter()
+        try:
+            if args.offline:
+                result.changes = await _run_offline(stack, operation, output)
+            else:
+                # The Automation API blocks on the pulumi CLI, so each stack gets a thread of its own
+                result.changes = await asyncio.to_thread(_run_automation, stack, operation,
+                                                         args.backend_url, args.parallel, output)
+            result.status = "succeeded"
+        except Exception as e:
+            result.status = "failed"
+            result.error = str(e).strip().splitlines()[-1] if str(e).strip() else type(e).__name__
+            output(stack, f"{operation} failed:\n{e}")
+        result.seconds = time.perf_counter() - started
+        output(stack, f"{operation} {result.status} in {result.seconds:.1f} s")
+    return result
+
+
+def render_summary(results: list, wall_seconds: float) -> str:
+    width = max(len("stack"), *(len(result.stack) for result in results))
+    lines = [f"{'stack':<{width}}  {'operation':<9}  {'status':<9}  {'time':>8}  changes"]
+    for result in results:
+        changes = ", ".join(f"{kind}={count}" for kind, count in sorted(result.changes.items())) or "-"
+        lines.append(f"{result.stack:<{width}}  {result.operation:<9}  {result.status:<9}  "
+                     f"{result.seconds:7.1f}s  {result.error or changes}")
+    serial_seconds = sum(result.seconds for result in results)
+    lines.append(f"{len(results)} stacks in {wall_seconds:.1f} s, {serial_seconds:.1f} s if run one after another")
+    return "\n".join(lines)
+
+
+async def run_all(args) -> list:
+    stacks = args.stack or discover_stacks()
+    output = PrefixedOutput(stacks)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    return await asyncio.gather(*(run_stack(stack, args.operation, semaphore, args, output) for stack in stacks))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("operation", choices=OPERATIONS)
+    parser.add_argument("--stack", action="append",
+                        help="stack to run, repeatable (default: every Pulumi.<stack>.yaml)")
+    parser.add_argument("--concurrency", type=int, default=2, help="stacks running at the same time")
+    parser.add_argument("--parallel", type=int, help="resource operations pulumi runs in parallel within a stack")
+    parser.add_argument("--backend-url", help="state backend, e.g. file://~/.pulumi-local (default: current login)")
+    parser.add_argument("--offline", action="store_true", help="evaluate against mocks instead of deploying")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args.worker, args.operation)
+        return 0
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.offline and args.operation not in OFFLINE_OPERATIONS:
+        parser.error(f"--offline supports {' and '.join(OFFLINE_OPERATIONS)}, there is no state to refresh")
+
+    started = time.perf_counter()
+    results = asyncio.run(run_all(args))
+    print(render_summary(results, time.perf_counter() - started))
+    return 0 if all(result.status == "succeeded" for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""Run this Pulumi program offline against mocks and record what it registers"""
+
+import base64
+import json
+import os
+import runpy
+import tempfile
+import time
+
+import pulumi
+import yaml
+from pulumi.runtime.mocks import MockMonitor
+from pulumi.runtime.stack import wait_for_rpcs
+from pulumi.runtime.sync_await import _sync_await
+
+import lambda_package
+from settings import PROJECT_NAMESPACE, load_settings
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Outputs the real providers compute that the program reads back
+_COMPUTED_OUTPUTS = {
+    "email": "{name}@offline.iam.gserviceaccount.com",
+    "dns_name": "{name}.elb.offline.amazonaws.com",
+    "arn_suffix": "{name}/offline",
+    "domain_name": "{name}.cloudfront.net",
+    "zone_id": "ZOFFLINE",
+    "hosted_zone_id": "ZOFFLINE",
+    "endpoint": "{name}.offline.rds.amazonaws.com:5432",
+    "address": "{name}.offline.rds.amazonaws.com",
+    "reader_endpoint": "{name}.ro.offline.rds.amazonaws.com",
+    "primary_endpoint_address": "{name}.offline.cache.amazonaws.com",
+    "configuration_endpoint_address": "{name}.cfg.offline.cache.amazonaws.com",
+    "cluster_address": "{name}.offline.dax.amazonaws.com",
+    "ipv6_cidr_block": "2600:1f18:0:ff00::/56",
+    "public_ip": "203.0.113.10",
+    "version": "1",
+    "url": "https://sqs.offline.amazonaws.com/000000000000/{name}",
+}
+
+_OFFLINE_AZS = ["a", "b", "c", "d", "e", "f"]
+
+
+def load_stack_config(stack: str, overrides: dict = None):
+    """Read Pulumi.<stack>.yaml into a flat config map, replacing secrets with placeholders.
+
+    Returns the config map and the list of secret keys.
+    """
+    with open(os.path.join(PROJECT_DIR, f"Pulumi.{stack}.yaml")) as f:
+        raw = yaml.safe_load(f).get("config", {})
+
+    config = {}
+    secret_keys = []
+    for key, value in {**raw, **(overrides or {})}.items():
+        if ":" not in key:
+            key = f"{PROJECT_NAMESPACE}:{key}"
+        if isinstance(value, dict) and "secure" in value:
+            secret_keys.append(key)
+            value = f"offline-{key.split(':', 1)[1]}"
+        config[key] = value if isinstance(value, str) else json.dumps(value)
+    return config, secret_keys
+
+
+class OfflineMocks(pulumi.runtime.Mocks):
+    """Echoes inputs back as outputs and fills in the computed outputs the program reads."""
+
+    def __init__(self, region: str):
+        self.region = region
+        # provider id -> region, so invokes through an explicit provider answer for its region
+        self.provider_regions = {}
+
+    def new_resource(self, args: pulumi.runtime.MockResourceArgs):
+        outputs = dict(args.inputs)
+        for key, value in list(outputs.items()):
+            # Policies go in as dicts but always come back as JSON strings
+            if key.lower().endswith("policy") and isinstance(value, (dict, list)):
+                outputs[key] = json.dumps(value)
+        for key, template in _COMPUTED_OUTPUTS.items():
+            if outputs.get(key) is None:
+                outputs[key] = template.format(name=args.name.lower())
+        if outputs.get("name") is None:
+            outputs["name"] = args.name
+        outputs.setdefault("arn", f"arn:aws:offline:{self.region}:000000000000:{args.name}")
+        if args.typ == "pulumi:providers:aws" and outputs.get("region"):
+            self.provider_regions[f"{args.name}-id"] = outputs["region"]
+        if args.typ == "aws:rds/instance:Instance" and outputs.get("port") is None:
+            outputs["port"] = 5432
+        if args.typ == "aws:rds/proxy:Proxy":
+            # Unlike an instance endpoint, a proxy endpoint has no port
+            outputs["endpoint"] = outputs["address"]
+        if args.typ == "gcp:serviceaccount/key:Key":
+            outputs["private_key"] = base64.b64encode(b"{}").decode("utf-8")
+        return f"{args.name}-id", outputs
+
+    def call(self, args: pulumi.runtime.MockCallArgs):
+        if args.token == "aws:index/getAvailabilityZones:getAvailabilityZones":
+            region = self.provider_regions.get((args.provider or "").rsplit("::", 1)[-1], self.region)
+            names = [f"{region}{suffix}" for suffix in _OFFLINE_AZS]
+            return {"names": names, "zoneIds": names}
+        if args.token == "aws:ec2/getManagedPrefixList:getManagedPrefixList":
+            return {"id": "pl-offline", "name": args.args.get("name")}
+        return {}
+
+
+class RecordingMonitor(MockMonitor):
+    """MockMonitor that keeps every registration, including its dependency URNs and ignored changes."""
+
+    def __init__(self, mocks: pulumi.runtime.Mocks):
+        super().__init__(mocks)
+        self.registrations = {}
+        self.started_at = time.perf_counter()
+
+    def RegisterResource(self, request):
+        response = super().RegisterResource(request)
+        dependencies = set(request.dependencies)
+        for property_dependencies in request.propertyDependencies.values():
+            dependencies.update(property_dependencies.urns)
+        self.registrations[response.urn] = {
+            "urn": response.urn,
+            "type": request.type,
+            "name": request.name,
+            "custom": request.custom,
+            "parent": request.parent or None,
+            "dependencies": sorted(dependencies),
+            "ignoreChanges": list(request.ignoreChanges),
+            "registeredAt": time.perf_counter() - self.started_at,
+        }
+        return response
+
+
+def _offline_lambda_dir(configured: str) -> str:
+    """The configured Lambda source dir, or a stub handler when it is not checked out next to the project."""
+    path = os.path.join(PROJECT_DIR, configured)
+    if os.path.isdir(path):
+        return path
+    stub = tempfile.mkdtemp(prefix="offline-lambda-")
+    with open(os.path.join(stub, "main.py"), "w") as f:
+        f.write("def handler(event, context):\n    return None\n")
+    return stub
+
+
+_package_cache_dir = None
+
+
+def _offline_package_cache_dir() -> str:
+    """A package cache for this process, so offline runs never write into the one real deploys use."""
+    global _package_cache_dir
+    if _package_cache_dir is None:
+        _package_cache_dir = tempfile.mkdtemp(prefix="offline-lambda-packages-")
+    return _package_cache_dir
+
+
+def run_program(stack: str, overrides: dict = None, preview: bool = True, program: str = None) -> RecordingMonitor:
+    """Evaluate __main__.py, or the program at path `program`, for `stack` with no network access.
+
+    The Pulumi runtime is process-global: each call starts over with a new root
+    stack resource and freshly loaded settings, so calls must not overlap.
+    """
+    # Never let mocked AZ names leak into the on-disk cache used by real previews
+    overrides = {"azCacheTtl": "0", **(overrides or {})}
+    config, secret_keys = load_stack_config(stack, overrides)
+    lambda_key = f"{PROJECT_NAMESPACE}:lambdaFilePath"
+    config[lambda_key] = _offline_lambda_dir(config.get(lambda_key, ""))
+    lambda_package.PACKAGE_CACHE_DIR = _offline_package_cache_dir()
+    pulumi.runtime.set_all_config(config, secret_keys)
+    load_settings.cache_clear()
+    pulumi.runtime.settings.set_root_resource(None)
+
+    region = config.get("aws:region", "us-east-1")
+    monitor = RecordingMonitor(OfflineMocks(region))
+    pulumi.runtime.set_mocks(monitor.mocks, project="pulumi_python", stack=stack,
+                             preview=preview, monitor=monitor)
+
+    runpy.run_path(program or os.path.join(PROJECT_DIR, "__main__.py"), run_name="__main__")
+    _sync_await(wait_for_rpcs())
+    return monitor
@@ -0,0 +1,6 @@
+"""Locations on disk shared by the modules that cache between runs"""
+
+import os
+
+# Next to the project and out of version control, see .gitignore
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".pulumi-cache")
@@ -0,0 +1,754 @@
+"""Typed, validated stack settings loaded once from the Pulumi config"""
+
+import dataclasses
+import functools
+import ipaddress
+import json
+import re
+
+import pulumi
+
+from alarms import ALARMS
+from db_instance_classes import DB_INSTANCE_CLASSES
+from subnet_planner import SubnetPlanner
+
+PROJECT_NAMESPACE = "pulumi_python"
+
+
+def _parse_bool(value: str) -> bool:
+    if value.lower() in ("true", "1", "yes"):
+        return True
+    if value.lower() in ("false", "0", "no"):
+        return False
+    raise ValueError(f"expected a boolean, got {value!r}")
+
+
+def _parse_cidr(value: str):
+    return ipaddress.ip_network(value)
+
+
+def _parse_json(value: str):
+    return json.loads(value)
+
+
+def _camel_to_snake(name: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+def _from_object(cls, raw, path: str, **converted):
+    """Build the frozen dataclass `cls` from a camelCase config object, rejecting unknown keys.
+
+    Nested values that need their own conversion are passed in `converted` and
+    take precedence over the raw ones.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError(f"{path} must be an object")
+    names = {field.name for field in dataclasses.fields(cls)}
+    kwargs = {}
+    for key, value in raw.items():
+        name = _camel_to_snake(key)
+        if name not in names:
+            raise ValueError(f"unknown key {path}.{key}")
+        kwargs[name] = value
+    kwargs.update(converted)
+    return cls(**kwargs)
+
+
+@dataclasses.dataclass(frozen=True)
+class TargetTrackingScaling:
+    metric: str = "cpu"
+    target_value: float = 50.0
+    disable_scale_in: bool = False
+    instance_warmup: int = 120
+
+
+@dataclasses.dataclass(frozen=True)
+class StepAdjustment:
+    adjustment: int
+    lower_bound: float = None
+    upper_bound: float = None
+
+
+@dataclasses.dataclass(frozen=True)
+class StepScaling:
+    scale_out: tuple = (StepAdjustment(1, 0, 20), StepAdjustment(2, 20, 40), StepAdjustment(3, 40))
+    scale_in: tuple = (StepAdjustment(-1, upper_bound=0),)
+    evaluation_periods: int = 2
+    instance_warmup: int = 120
+
+
+@dataclasses.dataclass(frozen=True)
+class PredictiveScaling:
+    metric: str = "cpu"
+    target_value: float = 50.0
+    mode: str = "ForecastAndScale"
+    scheduling_buffer_time: int = 300
+
+
+@dataclasses.dataclass(frozen=True)
+class ScheduledAction:
+    name: str
+    recurrence: str
+    min_size: int = -1
+    max_size: int = -1
+    desired_capacity: int = -1
+    time_zone: str = "UTC"
+
+
+@dataclasses.dataclass(frozen=True)
+class ScalingSettings:
+    """How the web ASG scales; only the block matching `mode` is used.
+
+    Scheduled actions are created in every mode, "scheduled" just means no
+    dynamic policy on top of them.
+    """
+
+    mode: str = "simple"
+    target_tracking: TargetTrackingScaling = TargetTrackingScaling()
+    step: StepScaling = StepScaling()
+    predictive: PredictiveScaling = PredictiveScaling()
+    schedules: tuple = ()
+
+
+# VPC endpoint services a stack can select, by endpoint type
+GATEWAY_ENDPOINT_SERVICES = ("s3", "dynamodb")
+INTERFACE_ENDPOINT_SERVICES = ("sns", "ssm", "ssmmessages", "ec2messages", "logs", "monitoring")
+
+# Engine version used when a stack does not pin cacheEngineVersion
+CACHE_ENGINE_VERSIONS = {"valkey": "8.0", "redis": "7.1"}
+
+SCALING_MODES = ("simple", "target-tracking", "step", "scheduled", "predictive")
+SCALING_METRICS = ("cpu", "requestCount")
+
+
+def _parse_steps(raw, path: str) -> tuple:
+    if not isinstance(raw, list) or not raw:
+        raise ValueError(f"{path} must be a non-empty list")
+    return tuple(_from_object(StepAdjustment, step, f"{path}[{i}]") for i, step in enumerate(raw))
+
+
+def _parse_scaling(value: str) -> ScalingSettings:
+    raw = json.loads(value)
+    if not isinstance(raw, dict):
+        raise ValueError("scaling must be an object")
+
+    converted = {}
+    if "targetTracking" in raw:
+        converted["target_tracking"] = _from_object(TargetTrackingScaling, raw["targetTracking"], "targetTracking")
+    if "step" in raw:
+        step = raw["step"]
+        converted["step"] = _from_object(StepScaling, step, "step", **{
+            name: _parse_steps(step[key], f"step.{key}")
+            for key, name in (("scaleOut", "scale_out"), ("scaleIn", "scale_in")) if key in step
+        })
+    if "predictive" in raw:
+        converted["predictive"] = _from_object(PredictiveScaling, raw["predictive"], "predictive")
+    if "schedules" in raw:
+        converted["schedules"] = tuple(_from_object(ScheduledAction, action, f"schedules[{i}]")
+                                       for i, action in enumerate(raw["schedules"]))
+    scaling = _from_object(ScalingSettings, raw, "scaling", **converted)
+
+    if scaling.mode not in SCALING_MODES:
+        raise ValueError(f"mode must be one of {SCALING_MODES}, got {scaling.mode!r}")
+    for block in (scaling.target_tracking, scaling.predictive):
+        if block.metric not in SCALING_METRICS:
+            raise ValueError(f"metric must be one of {SCALING_METRICS}, got {block.metric!r}")
+    if any(step.adjustment <= 0 for step in scaling.step.scale_out):
+        raise ValueError("step.scaleOut adjustments must be positive")
+    if any(step.adjustment >= 0 for step in scaling.step.scale_in):
+        raise ValueError("step.scaleIn adjustments must be negative")
+    if scaling.predictive.mode not in ("ForecastAndScale", "ForecastOnly"):
+        raise ValueError(f"predictive.mode must be ForecastAndScale or ForecastOnly, got {scaling.predictive.mode!r}")
+    if scaling.mode == "scheduled" and not scaling.schedules:
+        raise ValueError("scheduled mode needs at least one entry in schedules")
+    return scaling
+
+
+@dataclasses.dataclass(frozen=True)
+class GlobalSecondaryIndex:
+    name: str
+    hash_key: str
+    hash_key_type: str = "S"
+    range_key: str = None
+    range_key_type: str = "S"
+    projection_type: str = "ALL"
+    non_key_attributes: tuple = ()
+
+
+@dataclasses.dataclass(frozen=True)
+class DynamoDbCapacity:
+    """Provisioned throughput bounds, applied to the table and to each index."""
+
+    min_read: int = 5
+    max_read: int = 50
+    min_write: int = 5
+    max_write: int = 50
+    target_utilization: float = 70.0
+
+
+def _parse_indexes(value: str) -> tuple:
+    raw = json.loads(value)
+    if not isinstance(raw, list):
+        raise ValueError("must be a list of index objects")
+    indexes = tuple(_from_object(GlobalSecondaryIndex, index, f"[{i}]",
+                                 non_key_attributes=tuple(index.get("nonKeyAttributes", ())))
+                    for i, index in enumerate(raw))
+    for index in indexes:
+        if index.projection_type not in ("ALL", "KEYS_ONLY", "INCLUDE"):
+            raise ValueError(f"{index.name}: projectionType must be ALL, KEYS_ONLY or INCLUDE")
+        if bool(index.non_key_attributes) != (index.projection_type == "INCLUDE"):
+            raise ValueError(f"{index.name}: nonKeyAttributes go with projectionType INCLUDE, and only with it")
+        if {index.hash_key_type, index.range_key_type} - {"S", "N", "B"}:
+            raise ValueError(f"{index.name}: key types must be S, N or B")
+    if len({index.name for index in indexes}) != len(indexes):
+        raise ValueError("index names must be unique")
+    return indexes
+
+
+def _parse_capacity(value: str) -> DynamoDbCapacity:
+    capacity = _from_object(DynamoDbCapacity, json.loads(value), "dynamoDbCapacity")
+    if not 1 <= capacity.min_read <= capacity.max_read or not 1 <= capacity.min_write <= capacity.max_write:
+        raise ValueError("capacities must satisfy 1 <= min <= max")
+    if not 20 <= capacity.target_utilization <= 90:
+        raise ValueError("targetUtilization must be between 20 and 90 percent")
+    return capacity
+
+
+@dataclasses.dataclass(frozen=True)
+class RegionSettings:
+    """One entry of `regions`; AMIs and ACM certificates are regional, so extra regions need their own."""
+
+    region: str
+    ami_id: str = None
+    arm64_ami_id: str = None
+    certificate_arn: str = None
+    vpc_cidr_block: str = None
+
+
+def _parse_regions(value: str) -> tuple:
+    raw = json.loads(value)
+    if not isinstance(raw, list):
+        raise ValueError("must be a list of region names or objects")
+    regions = tuple(RegionSettings(entry) if isinstance(entry, str) else _from_object(RegionSettings, entry, f"[{i}]")
+                    for i, entry in enumerate(raw))
+    if len({entry.region for entry in regions}) != len(regions):
+        raise ValueError("regions must be unique")
+    return regions
+
+
+@dataclasses.dataclass(frozen=True)
+class HealthCheckSettings:
+    path: str = "/healthz"
+    matcher: str = "200"
+    interval: int = 10
+    timeout: int = 5
+    healthy_threshold: int = 2
+    unhealthy_threshold: int = 2
+
+
+@dataclasses.dataclass(frozen=True)
+class LoadBalancerSettings:
+    """Tuning of the web ALB, its target group and listeners; times are in seconds."""
+
+    idle_timeout: int = 60
+    client_keep_alive: int = 3600
+    deregistration_delay: int = 30
+    slow_start: int = 30
+    algorithm: str = "round_robin"
+    http_redirect: bool = True
+    health_check: HealthCheckSettings = HealthCheckSettings()
+
+
+LOAD_BALANCING_ALGORITHMS = ("round_robin", "least_outstanding_requests", "weighted_random")
+
+
+def _parse_load_balancer(value: str) -> LoadBalancerSettings:
+    raw = json.loads(value)
+    if not isinstance(raw, dict):
+        raise ValueError("loadBalancer must be an object")
+    converted = {}
+    if "healthCheck" in raw:
+        converted["health_check"] = _from_object(HealthCheckSettings, raw["healthCheck"], "healthCheck")
+    lb = _from_object(LoadBalancerSettings, raw, "loadBalancer", **converted)
+    health_check = lb.health_check
+
+    if not 1 <= lb.idle_timeout <= 4000:
+        raise ValueError(f"idleTimeout must be between 1 and 4000, got {lb.idle_timeout}")
+    if not 60 <= lb.client_keep_alive <= 604800:
+        raise ValueError(f"clientKeepAlive must be between 60 and 604800, got {lb.client_keep_alive}")
+    if not 0 <= lb.deregistration_delay <= 3600:
+        raise ValueError(f"deregistrationDelay must be between 0 and 3600, got {lb.deregistration_delay}")
+    if lb.slow_start and not 30 <= lb.slow_start <= 900:
+        raise ValueError(f"slowStart must be 0 or between 30 and 900, got {lb.slow_start}")
+    if lb.algorithm not in LOAD_BALANCING_ALGORITHMS:
+        raise ValueError(f"algorithm must be one of {LOAD_BALANCING_ALGORITHMS}, got {lb.algorithm!r}")
+    if lb.slow_start and lb.algorithm != "round_robin":
+        raise ValueError(f"slowStart only works with round_robin, set it to 0 for {lb.algorithm}")
+    if not 5 <= health_check.interval <= 300:
+        raise ValueError(f"healthCheck.interval must be between 5 and 300, got {health_check.interval}")
+    if not 2 <= health_check.timeout < health_check.interval:
+        raise ValueError("healthCheck.timeout must be at least 2 and shorter than healthCheck.interval")
+    for name in ("healthy_threshold", "unhealthy_threshold"):
+        if not 2 <= getattr(health_check, name) <= 10:
+            raise ValueError(f"healthCheck thresholds must be between 2 and 10, got {getattr(health_check, name)}")
+    return lb
+
+
+@dataclasses.dataclass(frozen=True)
+class CacheBehavior:
+    """A CloudFront cache behavior for the paths matching `path_pattern`; "*" replaces the default one."""
+
+    path_pattern: str
+    min_ttl: int = 0
+    default_ttl: int = 86400
+    max_ttl: int = 31536000
+    query_strings: bool = False
+    compress: bool = True
+
+
+def _parse_behaviors(value: str) -> tuple:
+    raw = json.loads(value)
+    if not isinstance(raw, list):
+        raise ValueError("must be a list of behavior objects")
+    behaviors = tuple(_from_object(CacheBehavior, behavior, f"[{i}]") for i, behavior in enumerate(raw))
+    for behavior in behaviors:
+        if not 0 <= behavior.min_ttl <= behavior.default_ttl <= behavior.max_ttl:
+            raise ValueError(f"{behavior.path_pattern}: TTLs must satisfy 0 <= minTtl <= defaultTtl <= maxTtl")
+    if len({behavior.path_pattern for behavior in behaviors}) != len(behaviors):
+        raise ValueError("path patterns must be unique")
+    return behaviors
+
+
+def is_graviton(instance_type: str) -> bool:
+    """Whether `instance_type` runs on AWS Graviton (arm64), like a1.large, t4g.micro or c7gn.large."""
+    family = instance_type.split(".", 1)[0]
+    # a1 is the first-generation Graviton family, every later one has a "g" after the generation
+    return family == "a1" or re.match(r"^[a-z]+\d+g", family) is not None
+
+
+def _parse_instance_types(value: str) -> tuple:
+    raw = json.loads(value)
+    if not isinstance(raw, list) or not raw or not all(isinstance(t, str) for t in raw):
+        raise ValueError("must be a non-empty list of instance types")
+    if len(set(raw)) != len(raw):
+        raise ValueError("instance types must be unique")
+    return tuple(raw)
+
+
+def _parse_vpc_endpoints(value: str) -> tuple:
+    raw = json.loads(value)
+    services = GATEWAY_ENDPOINT_SERVICES + INTERFACE_ENDPOINT_SERVICES
+    if not isinstance(raw, list) or any(service not in services for service in raw):
+        raise ValueError(f"must be a list of services out of {services}")
+    if len(set(raw)) != len(raw):
+        raise ValueError("services must be unique")
+    return tuple(raw)
+
+
+def _parse_alarm_thresholds(value: str) -> dict:
+    raw = json.loads(value)
+    if not isinstance(raw, dict):
+        raise ValueError("must be an object of alarm names to thresholds")
+    for name, threshold in raw.items():
+        if name not in ALARMS:
+            raise ValueError(f"unknown alarm {name!r}, expected one of {tuple(ALARMS)}")
+        if threshold is not None and (isinstance(threshold, bool) or not isinstance(threshold, (int, float))):
+            raise ValueError(f"{name} must be a number, or null to drop the alarm")
+    return raw
+
+
+def _setting(key: str, parse=str, default=dataclasses.MISSING, namespace=PROJECT_NAMESPACE):
+    """Declare a settings field backed by the `namespace:key` config value."""
+    return dataclasses.field(default=default,
+                             metadata={"key": key, "namespace": namespace, "parse": parse})
+
+
+@dataclasses.dataclass(frozen=True)
+class Settings:
+    """All stack configuration, parsed into native types.
+
+    Secrets are not part of the dataclass fields; they are wrapped into secret
+    Outputs the first time a resource reads them.
+    """
+
+    aws_profile: str = _setting("profile", namespace="aws")
+    aws_region: str = _setting("region", namespace="aws")
+    gcp_project: str = _setting("project", namespace="gcp")
+    gcp_region: str = _setting("region", namespace="gcp")
+
+    vpc_name: str = _setting("vpcName")
+    vpc_cidr_block: ipaddress.IPv4Network = _setting("vpcCidrBlock", _parse_cidr)
+    internet_gateway_name: str = _setting("internetGatewayName")
+    public_rt_name: str = _setting("publicRtName")
+    private_rt_name: str = _setting("privateRtName")
+    public_subnet_name: str = _setting("publicSubnet")
+    private_subnet_name: str = _setting("privateSubnet")
+    public_cidr_block: ipaddress.IPv4Network = _setting("publicCidrBlock", _parse_cidr)
+    subnet_mask: int = _setting("subnetMask", int)
+
+    parameter_group_name: str = _setting("myParameterGroupName")
+    db_subnet_group_name: str = _setting("dbSubnetGrpName")
+    engine: str = _setting("engine")
+    engine_version: str = _setting("engineVersion")
+    identifier: str = _setting("identifier")
+    instance_class: str = _setting("instanceClass")
+    db_name: str = _setting("dbName")
+    storage_type: str = _setting("storageType")
+    allocated_storage: int = _setting("allocatedStorage", int)
+
+    ami_id: str = _setting("amiId")
+    key_pair: str = _setting("keyPair")
+    ec2_name: str = _setting("ec2Name")
+    domain_name: str = _setting("domainName")
+    hosted_zone_id: str = _setting("hosted_zone_id")
+    application_port: int = _setting("applicationPort", int)
+    listener_port: int = _setting("listenerPort", int)
+    ssl_policy: str = _setting("sslPolicy")
+    certificate_arn: str = _setting("certificateArnName")
+    launch_template_name: str = _setting("launchTemplateName")
+    auto_scaling_group_name: str = _setting("autoScalingGroupName")
+    max_size: int = _setting("maxSize", int)
+    min_size: int = _setting("minSize", int)
+    desired_capacity: int = _setting("cap", int)
+    cool_down: int = _setting("coolDown", int)
+    period: int = _setting("period", int)
+    up_threshold: float = _setting("upThreshold", float)
+    down_threshold: float = _setting("downThreshold", float)
+
+    sns_topic_name: str = _setting("snsTopicName")
+    account_id: str = _setting("accountId")
+    mailgun_domain: str = _setting("mailgunDomain")
+    dynamodb_table_name: str = _setting("DynamoDbTableName")
+    lambda_file_path: str = _setting("lambdaFilePath")
+
+    bucket_account_id: str = _setting("bucketAccountId")
+    bucket_display_name: str = _setting("bucketDisplayName")
+    gcp_bucket_name: str = _setting("gcpBucketName")
+    bucket_location: str = _setting("location")
+
+    ipv6_enabled: bool = _setting("ipv6Enabled", _parse_bool, default=False)
+    az_count: int = _setting("azCount", int, default=3)
+    availability_zones: list = _setting("availabilityZones", _parse_json, default=None)
+    az_cache_ttl: int = _setting("azCacheTtl", int, default=86400)
+    db_connection_mode: str = _setting("dbConnectionMode", default="inline")
+    db_parameter_path: str = _setting("dbParameterPath", default=None)
+    scaling: ScalingSettings = _setting("scaling", _parse_scaling, default=ScalingSettings())
+    db_max_connections: int = _setting("dbMaxConnections", int, default=None)
+    db_tune_parameters: bool = _setting("dbTuneParameters", _parse_bool, default=True)
+    db_parameters: dict = _setting("dbParameters", _parse_json, default=None)
+    db_storage_iops: int = _setting("dbStorageIops", int, default=None)
+    db_storage_throughput: int = _setting("dbStorageThroughput", int, default=None)
+    db_max_allocated_storage: int = _setting("dbMaxAllocatedStorage", int, default=None)
+    db_proxy_enabled: bool = _setting("dbProxyEnabled", _parse_bool, default=False)
+    db_proxy_max_connections_percent: int = _setting("dbProxyMaxConnectionsPercent", int, default=90)
+    db_proxy_require_tls: bool = _setting("dbProxyRequireTls", _parse_bool, default=False)
+    db_read_replica_count: int = _setting("dbReadReplicaCount", int, default=0)
+    db_multi_az: bool = _setting("dbMultiAz", _parse_bool, default=False)
+    db_performance_insights: bool = _setting("dbPerformanceInsights", _parse_bool, default=False)
+    db_performance_insights_retention: int = _setting("dbPerformanceInsightsRetention", int, default=7)
+    cache_enabled: bool = _setting("cacheEnabled", _parse_bool, default=False)
+    cache_engine: str = _setting("cacheEngine", default="valkey")
+    cache_engine_version: str = _setting("cacheEngineVersion", default=None)
+    cache_node_type: str = _setting("cacheNodeType", default="cache.t4g.micro")
+    cache_shard_count: int = _setting("cacheShardCount", int, default=1)
+    cache_replicas_per_shard: int = _setting("cacheReplicasPerShard", int, default=1)
+    lambda_architecture: str = _setting("lambdaArchitecture", default="x86_64")
+    lambda_memory_size: int = _setting("lambdaMemorySize", int, default=512)
+    lambda_timeout: int = _setting("lambdaTimeout", int, default=30)
+    lambda_ephemeral_storage: int = _setting("lambdaEphemeralStorage", int, default=512)
+    lambda_reserved_concurrency: int = _setting("lambdaReservedConcurrency", int, default=-1)
+    lambda_provisioned_concurrency: int = _setting("lambdaProvisionedConcurrency", int, default=0)
+    sqs_buffer_enabled: bool = _setting("sqsBufferEnabled", _parse_bool, default=False)
+    sqs_batch_size: int = _setting("sqsBatchSize", int, default=10)
+    sqs_batching_window: int = _setting("sqsBatchingWindow", int, default=5)
+    sqs_max_concurrency: int = _setting("sqsMaxConcurrency", int, default=None)
+    sqs_max_receive_count: int = _setting("sqsMaxReceiveCount", int, default=5)
+    sqs_visibility_timeout: int = _setting("sqsVisibilityTimeout", int, default=None)
+    sqs_report_batch_item_failures: bool = _setting("sqsReportBatchItemFailures", _parse_bool, default=True)
+    dynamodb_billing_mode: str = _setting("dynamoDbBillingMode", default="PAY_PER_REQUEST")
+    dynamodb_capacity: DynamoDbCapacity = _setting("dynamoDbCapacity", _parse_capacity, default=DynamoDbCapacity())
+    dynamodb_indexes: tuple = _setting("dynamoDbIndexes", _parse_indexes, default=())
+    dynamodb_ttl_attribute: str = _setting("dynamoDbTtlAttribute", default=None)
+    dax_enabled: bool = _setting("daxEnabled", _parse_bool, default=False)
+    dax_node_type: str = _setting("daxNodeType", default="dax.t3.small")
+    dax_replication_factor: int = _setting("daxReplicationFactor", int, default=1)
+    regions: tuple = _setting("regions", _parse_regions, default=())
+    regions_cidr_block: ipaddress.IPv4Network = _setting("regionsCidrBlock", _parse_cidr,
+                                                         default=ipaddress.ip_network("10.0.0.0/8"))
+    compute_topology: str = _setting("computeTopology", default="public")
+    nat_gateways: str = _setting("natGateways", default="per-az")
+    vpc_endpoints: tuple = _setting("vpcEndpoints", _parse_vpc_endpoints, default=())
+    instance_types: tuple = _setting("instanceTypes", _parse_instance_types, default=("t2.micro",))
+    arm64_ami_id: str = _setting("arm64AmiId", default=None)
+    on_demand_base_capacity: int = _setting("onDemandBaseCapacity", int, default=0)
+    on_demand_percentage: int = _setting("onDemandPercentageAboveBase", int, default=100)
+    spot_allocation_strategy: str = _setting("spotAllocationStrategy", default="price-capacity-optimized")
+    capacity_rebalance: bool = _setting("capacityRebalance", _parse_bool, default=False)
+    warm_pool_enabled: bool = _setting("warmPoolEnabled", _parse_bool, default=False)
+    warm_pool_min_size: int = _setting("warmPoolMinSize", int, default=0)
+    warm_pool_state: str = _setting("warmPoolState", default="Stopped")
+    root_device_name: str = _setting("rootDeviceName", default="/dev/xvda")
+    root_volume_size: int = _setting("rootVolumeSize", int, default=25)
+    root_volume_iops: int = _setting("rootVolumeIops", int, default=3000)
+    root_volume_throughput: int = _setting("rootVolumeThroughput", int, default=125)
+    load_balancer: LoadBalancerSettings = _setting("loadBalancer", _parse_load_balancer,
+                                                   default=LoadBalancerSettings())
+    monitoring_enabled: bool = _setting("monitoringEnabled", _parse_bool, default=False)
+    alarm_thresholds: dict = _setting("alarmThresholds", _parse_alarm_thresholds, default=None)
+    alarm_period: int = _setting("alarmPeriod", int, default=60)
+    alarm_email: str = _setting("alarmEmail", default=None)
+    cloudfront_enabled: bool = _setting("cloudFrontEnabled", _parse_bool, default=False)
+    cloudfront_behaviors: tuple = _setting("cloudFrontBehaviors", _parse_behaviors, default=())
+    cloudfront_certificate_arn: str = _setting("cloudFrontCertificateArn", default=None)
+    cloudfront_origin_shield: bool = _setting("cloudFrontOriginShield", _parse_bool, default=True)
+    cloudfront_origin_shield_region: str = _setting("cloudFrontOriginShieldRegion", default=None)
+    cloudfront_price_class: str = _setting("cloudFrontPriceClass", default="PriceClass_100")
+
+    def _validate(self) -> list:
+        errors = []
+        for name in ("application_port", "listener_port"):
+            if not 0 < getattr(self, name) < 65536:
+                errors.append(f"{name} must be a TCP port, got {getattr(self, name)}")
+        if not self.min_size <= self.desired_capacity <= self.max_size:
+            errors.append(f"cap must be between minSize and maxSize, got "
+                          f"{self.min_size} <= {self.desired_capacity} <= {self.max_size}")
+        if self.down_threshold >= self.up_threshold:
+            errors.append("downThreshold must be lower than upThreshold")
+        if not self.vpc_cidr_block.prefixlen <= self.subnet_mask <= self.vpc_cidr_block.max_prefixlen:
+            errors.append(f"subnetMask /{self.subnet_mask} does not fit inside {self.vpc_cidr_block}")
+        if self.db_connection_mode not in ("inline", "ssm"):
+            errors.append(f"dbConnectionMode must be 'inline' or 'ssm', got {self.db_connection_mode!r}")
+        if self.instance_class not in DB_INSTANCE_CLASSES:
+            if self.db_tune_parameters:
+                errors.append(f"instanceClass {self.instance_class!r} is missing from db_instance_classes.py, "
+                              "add it or set dbTuneParameters to false")
+            elif self.db_max_connections is None and self.monitoring_enabled:
+                errors.append(f"instanceClass {self.instance_class!r} has no known memory size, "
+                              "set dbMaxConnections for the connections alarm")
+        if self.db_parameters is not None and not isinstance(self.db_parameters, dict):
+            errors.append("dbParameters must be an object of parameter names to values")
+        errors += self._validate_db_storage()
+        if not 0 <= self.db_read_replica_count <= 15:
+            errors.append(f"dbReadReplicaCount must be between 0 and 15, got {self.db_read_replica_count}")
+        if self.db_performance_insights_retention != 7 and self.db_performance_insights_retention % 31:
+            errors.append("dbPerformanceInsightsRetention must be 7 or a multiple of 31 days, got "
+                          f"{self.db_performance_insights_retention}")
+        if self.cache_engine not in CACHE_ENGINE_VERSIONS:
+            errors.append(f"cacheEngine must be one of {tuple(CACHE_ENGINE_VERSIONS)}, got {self.cache_engine!r}")
+        if not 1 <= self.cache_shard_count <= 500:
+            errors.append(f"cacheShardCount must be between 1 and 500, got {self.cache_shard_count}")
+        if not 0 <= self.cache_replicas_per_shard <= 5:
+            errors.append(f"cacheReplicasPerShard must be between 0 and 5, got {self.cache_replicas_per_shard}")
+        if self.lambda_architecture not in ("x86_64", "arm64"):
+            errors.append(f"lambdaArchitecture must be 'x86_64' or 'arm64', got {self.lambda_architecture!r}")
+        if not 128 <= self.lambda_memory_size <= 10240:
+            errors.append(f"lambdaMemorySize must be between 128 and 10240 MB, got {self.lambda_memory_size}")
+        if not 1 <= self.lambda_timeout <= 900:
+            errors.append(f"lambdaTimeout must be between 1 and 900 seconds, got {self.lambda_timeout}")
+        if not 512 <= self.lambda_ephemeral_storage <= 10240:
+            errors.append(f"lambdaEphemeralStorage must be between 512 and 10240 MB, got {self.lambda_ephemeral_storage}")
+        if self.lambda_reserved_concurrency < -1:
+            errors.append("lambdaReservedConcurrency must be -1 (unreserved) or more")
+        if self.lambda_provisioned_concurrency < 0:
+            errors.append("lambdaProvisionedConcurrency must not be negative")
+        if (self.lambda_provisioned_concurrency and self.lambda_reserved_concurrency != -1
+                and self.lambda_provisioned_concurrency > self.lambda_reserved_concurrency):
+            errors.append("lambdaProvisionedConcurrency cannot exceed lambdaReservedConcurrency")
+        if not 1 <= self.sqs_batch_size <= 10000:
+            errors.append(f"sqsBatchSize must be between 1 and 10000, got {self.sqs_batch_size}")
+        elif self.sqs_batch_size > 10 and not self.sqs_batching_window:
+            errors.append("sqsBatchSize above 10 needs a non-zero sqsBatchingWindow")
+        if not 0 <= self.sqs_batching_window <= 300:
+            errors.append(f"sqsBatchingWindow must be between 0 and 300 seconds, got {self.sqs_batching_window}")
+        if self.sqs_max_concurrency is not None and not 2 <= self.sqs_max_concurrency <= 1000:
+            errors.append(f"sqsMaxConcurrency must be between 2 and 1000, got {self.sqs_max_concurrency}")
+        if self.sqs_visibility_timeout is not None and self.sqs_visibility_timeout < self.lambda_timeout:
+            errors.append("sqsVisibilityTimeout must be at least lambdaTimeout")
+        if self.dynamodb_billing_mode not in ("PAY_PER_REQUEST", "PROVISIONED"):
+            errors.append(f"dynamoDbBillingMode must be PAY_PER_REQUEST or PROVISIONED, got {self.dynamodb_billing_mode!r}")
+        key_types = {"id": "S"}
+        for index in self.dynamodb_indexes:
+            for key, key_type in ((index.hash_key, index.hash_key_type), (index.range_key, index.range_key_type)):
+                if key and key_types.setdefault(key, key_type) != key_type:
+                    errors.append(f"dynamoDbIndexes: attribute {key!r} is used with more than one type")
+        if not 1 <= self.dax_replication_factor <= 10:
+            errors.append(f"daxReplicationFactor must be between 1 and 10, got {self.dax_replication_factor}")
+        if self.regions:
+            if self.aws_region not in {entry.region for entry in self.regions}:
+                errors.append(f"regions must include aws:region ({self.aws_region})")
+            for entry in self.regions:
+                if entry.region != self.aws_region and not (entry.ami_id and entry.certificate_arn):
+                    errors.append(f"regions: {entry.region} needs its own amiId and certificateArn")
+                if entry.region != self.aws_region and self.arm64_ami_id and not entry.arm64_ami_id:
+                    errors.append(f"regions: {entry.region} needs its own arm64AmiId")
+            try:
+                self.region_settings()
+            except ValueError as e:
+                errors.append(f"regions: {e}")
+        if self.compute_topology not in ("public", "private"):
+            errors.append(f"computeTopology must be 'public' or 'private', got {self.compute_topology!r}")
+        if self.nat_gateways not in ("per-az", "single", "none"):
+            errors.append(f"natGateways must be 'per-az', 'single' or 'none', got {self.nat_gateways!r}")
+        elif self.nat_gateways == "none" and self.private_compute:
+            # Without NAT the private instances reach AWS only through endpoints
+            missing = [service for service in ("ssm", "ssmmessages", "ec2messages", "sns", "logs", "monitoring")
+                       if service not in self.vpc_endpoints]
+            if missing:
+                errors.append(f"natGateways 'none' needs vpcEndpoints for {', '.join(missing)}")
+        if any(map(is_graviton, self.instance_types)) and not self.arm64_ami_id:
+            errors.append("instanceTypes includes Graviton types, set arm64AmiId")
+        if not 0 <= self.on_demand_percentage <= 100:
+            errors.append(f"onDemandPercentageAboveBase must be between 0 and 100, got {self.on_demand_percentage}")
+        if not 0 <= self.on_demand_base_capacity <= self.max_size:
+            errors.append(f"onDemandBaseCapacity must be between 0 and maxSize, got {self.on_demand_base_capacity}")
+        if self.spot_allocation_strategy not in ("price-capacity-optimized", "capacity-optimized",
+                                                 "capacity-optimized-prioritized", "lowest-price"):
+            errors.append(f"spotAllocationStrategy {self.spot_allocation_strategy!r} is not a spot allocation strategy")
+        if self.warm_pool_enabled:
+            # Auto Scaling rejects warm pools on groups with a mixed instances policy
+            if self.uses_mixed_instances_policy:
+                errors.append("warmPoolEnabled needs a single entry in instanceTypes and no spot capacity")
+            if self.warm_pool_state not in ("Stopped", "Running", "Hibernated"):
+                errors.append(f"warmPoolState must be Stopped, Running or Hibernated, got {self.warm_pool_state!r}")
+            if not 0 <= self.warm_pool_min_size <= self.max_size:
+                errors.append(f"warmPoolMinSize must be between 0 and maxSize, got {self.warm_pool_min_size}")
+        if not 8 <= self.root_volume_size <= 16384:
+            errors.append(f"rootVolumeSize must be between 8 and 16384 GiB, got {self.root_volume_size}")
+        if not 3000 <= self.root_volume_iops <= min(16000, 500 * self.root_volume_size):
+            errors.append(f"rootVolumeIops must be between 3000 and min(16000, 500 per GiB), got {self.root_volume_iops}")
+        if not 125 <= self.root_volume_throughput <= min(1000, self.root_volume_iops // 4):
+            errors.append("rootVolumeThroughput must be between 125 and min(1000, rootVolumeIops / 4) MiB/s, got "
+                          f"{self.root_volume_throughput}")
+        # AWS service metrics are standard resolution, one datapoint a minute at best
+        if self.alarm_period <= 0 or self.alarm_period % 60:
+            errors.append(f"alarmPeriod must be a multiple of 60 seconds, got {self.alarm_period}")
+        if self.cloudfront_enabled:
+            # CloudFront only accepts viewer certificates from us-east-1
+            certificate_arn = self.cloudfront_certificate_arn or self.certificate_arn
+            if certificate_arn.split(":")[3:4] != ["us-east-1"]:
+                errors.append("cloudFrontCertificateArn must be an ACM certificate in us-east-1")
+            if len(self.regions) > 1:
+                errors.append("cloudFrontEnabled cannot be combined with more than one region")
+        if self.cloudfront_price_class not in ("PriceClass_100", "PriceClass_200", "PriceClass_All"):
+            errors.append(f"cloudFrontPriceClass must be PriceClass_100, PriceClass_200 or PriceClass_All, "
+                          f"got {self.cloudfront_price_class!r}")
+        if not 1 <= self.db_proxy_max_connections_percent <= 100:
+            errors.append(f"dbProxyMaxConnectionsPercent must be between 1 and 100, got "
+                          f"{self.db_proxy_max_connections_percent}")
+        return errors
+
+    def _validate_db_storage(self) -> list:
+        errors = []
+        storage_type, size = self.storage_type, self.allocated_storage
+        iops, throughput = self.db_storage_iops, self.db_storage_throughput
+        if storage_type not in ("gp2", "gp3", "io1", "io2", "standard"):
+            errors.append(f"storageType must be gp2, gp3, io1, io2 or standard, got {storage_type!r}")
+        elif storage_type == "gp3":
+            # Below 400 GiB Postgres on gp3 gets a fixed 3000 IOPS and 125 MiB/s
+            if (iops or throughput) and size < 400:
+                errors.append("dbStorageIops and dbStorageThroughput need allocatedStorage of at least 400 GiB on gp3")
+            elif iops and not 12000 <= iops <= 64000:
+                errors.append(f"dbStorageIops must be between 12000 and 64000 on gp3, got {iops}")
+            elif throughput and not 500 <= throughput <= 4000:
+                errors.append(f"dbStorageThroughput must be between 500 and 4000 MiB/s on gp3, got {throughput}")
+        elif storage_type in ("io1", "io2"):
+            ratio = 50 if storage_type == "io1" else 1000
+            if size < 100:
+                errors.append(f"{storage_type} needs allocatedStorage of at least 100 GiB")
+            if not iops or not 1000 <= iops <= ratio * size:
+                errors.append(f"dbStorageIops is required on {storage_type}, between 1000 and {ratio} per GiB")
+            if throughput:
+                errors.append("dbStorageThroughput only applies to gp3")
+        elif iops or throughput:
+            errors.append(f"dbStorageIops and dbStorageThroughput do not apply to {storage_type}")
+        if self.db_max_allocated_storage is not None and self.db_max_allocated_storage <= size:
+            errors.append("dbMaxAllocatedStorage must be larger than allocatedStorage")
+        return errors
+
+    @property
+    def private_compute(self) -> bool:
+        return self.compute_topology == "private"
+
+    @property
+    def uses_mixed_instances_policy(self) -> bool:
+        return len(self.instance_types) > 1 or self.on_demand_percentage < 100
+
+    def region_settings(self) -> list:
+        """Settings for every region the regional tiers are deployed to, home region (aws:region) first.
+
+        Each extra region gets its own AMI, certificate and a VPC CIDR that does not
+        overlap any other region's, so the VPCs can later be peered or routed together.
+        """
+        extra = [entry for entry in self.regions if entry.region != self.aws_region]
+        planner = SubnetPlanner(str(self.regions_cidr_block))
+        planner.reserve(self.vpc_cidr_block)
+        for entry in extra:
+            if entry.vpc_cidr_block:
+                planner.reserve(entry.vpc_cidr_block)
+
+        regional = [self]
+        for entry in extra:
+            cidr_block = (ipaddress.ip_network(entry.vpc_cidr_block) if entry.vpc_cidr_block
+                          else planner.allocate(self.vpc_cidr_block.prefixlen))
+            regional.append(dataclasses.replace(self,
+                aws_region=entry.region,
+                ami_id=entry.ami_id,
+                arm64_ami_id=entry.arm64_ami_id,
+                certificate_arn=entry.certificate_arn,
+                vpc_cidr_block=cidr_block,
+                availability_zones=None,
+                dax_enabled=False))
+        return regional
+
+    @staticmethod
+    def _secret(key: str):
+        return pulumi.Config(PROJECT_NAMESPACE).require_secret(key)
+
+    @functools.cached_property
+    def db_username(self) -> pulumi.Output:
+        return self._secret("dbUsername")
+
+    @functools.cached_property
+    def db_password(self) -> pulumi.Output:
+        return self._secret("dbPassword")
+
+    @functools.cached_property
+    def mailgun_api_key(self) -> pulumi.Output:
+        return self._secret("mailgunApiKey")
+
+
+_SECRET_KEYS = ("dbUsername", "dbPassword", "mailgunApiKey")
+
+
+@functools.lru_cache(maxsize=None)
+def load_settings() -> Settings:
+    """Read, convert and validate the whole stack config, reporting every problem at once."""
+    configs = {}
+    values = {}
+    errors = []
+
+    for field in dataclasses.fields(Settings):
+        namespace, key = field.metadata["namespace"], field.metadata["key"]
+        config = configs.setdefault(namespace, pulumi.Config(namespace))
+        raw = config.get(key)
+        if raw is None:
+            if field.default is dataclasses.MISSING:
+                errors.append(f"{namespace}:{key} is required")
+            continue
+        try:
+            values[field.name] = field.metadata["parse"](raw)
+        except (TypeError, ValueError) as e:
+            errors.append(f"{namespace}:{key} is invalid: {e}")
+
+    project_config = configs[PROJECT_NAMESPACE]
+    for key in _SECRET_KEYS:
+        if project_config.get(key) is None:
+            errors.append(f"{PROJECT_NAMESPACE}:{key} is required")
+
+    if not errors:
+        settings = Settings(**values)
+        errors = settings._validate()
+        if not errors:
+            return settings
+
+    raise ValueError("Invalid stack configuration:\n  " + "\n  ".join(errors))
@@ -0,0 +1,114 @@
+"""Subnet allocation for carving VPC address space"""
+
+import bisect
+import ipaddress
+
+
+class SubnetPlanner:
+    """Buddy-style allocator that carves subnets out of a parent CIDR block.
+
+    Free space is tracked as aligned power-of-two blocks per prefix length, so
+    mixed prefix lengths pack without fragmentation and allocations are handed
+    out lowest address first. Allocated ranges are kept sorted so overlap checks
+    are a binary search. Works for both IPv4 and IPv6 parent blocks.
+    """
+
+    def __init__(self, cidr_block: str):
+        self.network = ipaddress.ip_network(cidr_block)
+        self._bits = self.network.max_prefixlen
+        # prefix length -> sorted start addresses of free blocks of that size
+        self._free = {self.network.prefixlen: [int(self.network.network_address)]}
+        # sorted start/end addresses of allocated ranges
+        self._starts = []
+        self._ends = []
+
+    def _block_size(self, prefixlen: int) -> int:
+        return 1 << (self._bits - prefixlen)
+
+    def _to_network(self, start: int, prefixlen: int):
+        return ipaddress.ip_network((start, prefixlen))
+
+    def _validate_prefix(self, prefixlen: int):
+        if not self.network.prefixlen <= prefixlen <= self._bits:
+            raise ValueError(f"Prefix length /{prefixlen} does not fit inside {self.network}")
+
+    def overlaps(self, cidr_block) -> bool:
+        """Return True if `cidr_block` intersects any allocated range."""
+        network = ipaddress.ip_network(cidr_block)
+        start = int(network.network_address)
+        end = int(network.broadcast_address)
+        # Allocations are disjoint, so only the closest one starting at or before `end` can overlap
+        i = bisect.bisect_right(self._starts, end)
+        return i > 0 and self._ends[i - 1] >= start
+
+    def _record(self, start: int, prefixlen: int):
+        i = bisect.bisect_left(self._starts, start)
+        self._starts.insert(i, start)
+        self._ends.insert(i, start + self._block_size(prefixlen) - 1)
+
+    def allocate(self, prefixlen: int):
+        """Allocate the lowest free subnet with the given prefix length."""
+        self._validate_prefix(prefixlen)
+
+        # Take the smallest free block that can hold the request
+        for size in range(prefixlen, self.network.prefixlen - 1, -1):
+            if self._free.get(size):
+                break
+        else:
+            raise ValueError('Exceeded the maximum number of subnets for the given VPC CIDR block')
+
+        start = self._free[size].pop(0)
+
+        # Split it down to the requested size, freeing the upper buddy at each level
+        while size < prefixlen:
+            size += 1
+            bisect.insort(self._free.setdefault(size, []), start + self._block_size(size))
+
+        self._record(start, prefixlen)
+        return self._to_network(start, prefixlen)
+
+    def reserve(self, cidr_block):
+        """Mark an existing subnet as allocated so it is never handed out again."""
+        network = ipaddress.ip_network(cidr_block)
+        if not network.subnet_of(self.network):
+            raise ValueError(f"{network} is outside of {self.network}")
+        if self.overlaps(network):
+            raise ValueError(f"{network} overlaps an existing allocation")
+
+        target = int(network.network_address)
+        prefixlen = network.prefixlen
+
+        # Find the free block that contains the target, walking up from its own size
+        for size in range(prefixlen, self.network.prefixlen - 1, -1):
+            start = target & ~(self._block_size(size) - 1)
+            blocks = self._free.get(size, [])
+            i = bisect.bisect_left(blocks, start)
+            if i < len(blocks) and blocks[i] == start:
+                blocks.pop(i)
+                break
+
+        # Split down towards the target, freeing whichever half does not contain it
+        while size < prefixlen:
+            size += 1
+            half = self._block_size(size)
+            if target >= start + half:
+                bisect.insort(self._free.setdefault(size, []), start)
+                start += half
+            else:
+                bisect.insort(self._free.setdefault(size, []), start + half)
+
+        self._record(target, prefixlen)
+        return network
+
+
+def plan_subnets(cidr_block: str, prefixlens, reserved=()) -> list:
+    """Plan one subnet per entry in `prefixlens`, skipping any `reserved` CIDRs."""
+    planner = SubnetPlanner(cidr_block)
+    for existing in reserved:
+        planner.reserve(existing)
+    return [str(planner.allocate(prefixlen)) for prefixlen in prefixlens]
+
+
+def plan_ipv6_subnets(ipv6_cidr_block: str, count: int) -> list:
+    """Plan `count` /64 subnets out of a VPC's IPv6 block."""
+    return plan_subnets(ipv6_cidr_block, [64] * count)
@@ -0,0 +1,135 @@
+"""Fixtures that evaluate the program offline against the mocks in offline.py"""
+
+import contextlib
+import json
+import os
+
+import pulumi
+import pytest
+
+from pulumi.runtime.stack import wait_for_rpcs
+from pulumi.runtime.sync_await import _sync_await
+
+from offline import OfflineMocks, RecordingMonitor, run_program
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots")
+
+
+def pytest_addoption(parser):
+    parser.addoption("--snapshot-update", action="store_true",
+                     help="rewrite the files under tests/snapshots instead of comparing with them")
+
+
+@contextlib.contextmanager
+def count_apply_callbacks():
+    """Count the `Output.apply` callbacks that run inside the block, in counter[0]."""
+    counter = [0]
+    apply = pulumi.Output.apply
+
+    def counting_apply(self, func, run_with_unknowns=False):
+        def counted(*args, **kwargs):
+            counter[0] += 1
+            return func(*args, **kwargs)
+        return apply(self, counted, run_with_unknowns)
+
+    pulumi.Output.apply = counting_apply
+    try:
+        yield counter
+    finally:
+        pulumi.Output.apply = apply
+
+
+class Synthesis:
+    """What one offline evaluation of the program registered, with lookups by type and name."""
+
+    def __init__(self, monitor: RecordingMonitor, apply_callbacks: int):
+        self.monitor = monitor
+        self.registrations = monitor.registrations
+        self.apply_callbacks = apply_callbacks
+
+    def urns(self, type_: str, name: str = None) -> list:
+        return sorted(urn for urn, registration in self.registrations.items()
+                      if registration["type"] == type_ and name in (None, registration["name"]))
+
+    def urn(self, type_: str, name: str) -> str:
+        urns = self.urns(type_, name)
+        assert len(urns) == 1, f"expected one {type_} named {name}, found {len(urns)}"
+        return urns[0]
+
+    def names(self, type_: str) -> list:
+        return sorted(self.registrations[urn]["name"] for urn in self.urns(type_))
+
+    def count(self, type_: str) -> int:
+        return len(self.urns(type_))
+
+    def state(self, type_: str, name: str) -> dict:
+        """The properties the mocks saw for the resource, outputs included."""
+        return self.monitor.resources[self.urn(type_, name)].state
+
+    def depends_on(self, urn: str, other: str) -> bool:
+        """Whether `urn` waits on `other`, directly or through any chain of dependencies."""
+        seen = set()
+        pending = [urn]
+        while pending:
+            for dependency in self.registrations[pending.pop()]["dependencies"]:
+                if dependency == other:
+                    return True
+                if dependency not in seen and dependency in self.registrations:
+                    seen.add(dependency)
+                    pending.append(dependency)
+        return False
+
+
+@pytest.fixture
+def synthesize():
+    """Evaluate the program for a stack with config overrides and return the Synthesis.
+
+    Override values that are not strings are passed as JSON, like the stack files do.
+    `program` evaluates another program file in place of __main__.py.
+    """
+    def synthesize(stack: str = "dev", preview: bool = False, program: str = None, **overrides) -> Synthesis:
+        with count_apply_callbacks() as counter:
+            monitor = run_program(stack, overrides, preview=preview, program=program)
+        return Synthesis(monitor, counter[0])
+    return synthesize
+
+
+@pytest.fixture
+def mocked_runtime():
+    """Point the Pulumi runtime at the offline mocks without running the program; returns the mocks."""
+    def mocked_runtime(preview: bool = True, region: str = "us-east-1") -> OfflineMocks:
+        pulumi.runtime.settings.set_root_resource(None)
+        monitor = RecordingMonitor(OfflineMocks(region))
+        pulumi.runtime.set_mocks(monitor.mocks, project="pulumi_python", stack="test",
+                                 preview=preview, monitor=monitor)
+        return monitor.mocks
+    yield mocked_runtime
+    # Finish the root stack registration so it does not run inside the next test's program
+    _sync_await(wait_for_rpcs())
+
+
+@pytest.fixture
+def snapshot(request):
+    """Compare a value with its file under tests/snapshots, or rewrite it with --snapshot-update.
+
+    Strings are stored as they are, anything else as indented JSON.
+    """
+    update = request.config.getoption("--snapshot-update")
+
+    def snapshot(name: str, value):
+        path = os.path.join(SNAPSHOT_DIR, name)
+        text = value if isinstance(value, str) else json.dumps(value, indent=2, sort_keys=True) + "\n"
+        if update:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(text)
+            return
+        if not os.path.exists(path):
+            pytest.fail(f"no snapshot {name}, record it with --snapshot-update")
+        with open(path) as f:
+            expected = f.read()
+        if isinstance(value, str):
+            assert value == expected
+        else:
+            assert json.loads(text) == json.loads(expected)
+    return snapshot
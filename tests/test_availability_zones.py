@@ -0,0 +1,105 @@
+import json
+import os
+
+import pytest
+
+import availability_zones
+from availability_zones import get_availability_zones, select_availability_zones
+
+US_EAST_1_AZS = [f"us-east-1{suffix}" for suffix in "abcdef"]
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(availability_zones, "CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def lookups(mocked_runtime, monkeypatch):
+    """Set up the mocked runtime for a preview or an update; returns the list of AZ invokes made so far."""
+    invokes = []
+
+    def lookups(preview: bool) -> list:
+        mocks = mocked_runtime(preview=preview)
+        call = mocks.call
+
+        def recording_call(args):
+            if args.token == "aws:index/getAvailabilityZones:getAvailabilityZones":
+                invokes.append(args.args)
+            return call(args)
+        monkeypatch.setattr(mocks, "call", recording_call)
+        return invokes
+    return lookups
+
+
+def test_update_asks_the_provider_and_fills_the_cache(cache_dir, lookups):
+    invokes = lookups(preview=False)
+
+    assert get_availability_zones("us-east-1", "685750396583", "dev", 3600) == US_EAST_1_AZS
+    assert invokes == [{"state": "available"}]
+    with open(cache_dir / "azs-685750396583-dev-us-east-1.json") as f:
+        assert json.load(f)["names"] == US_EAST_1_AZS
+
+
+def test_preview_with_a_warm_cache_skips_the_invoke(cache_dir, lookups):
+    lookups(preview=False)
+    get_availability_zones("us-east-1", "685750396583", "dev", 3600)
+
+    invokes = lookups(preview=True)
+    invokes.clear()
+    assert get_availability_zones("us-east-1", "685750396583", "dev", 3600) == US_EAST_1_AZS
+    assert invokes == []
+
+
+def test_preview_refetches_a_stale_cache(cache_dir, lookups):
+    lookups(preview=False)
+    get_availability_zones("us-east-1", "685750396583", "dev", 3600)
+    path = cache_dir / "azs-685750396583-dev-us-east-1.json"
+    entry = json.loads(path.read_text())
+    path.write_text(json.dumps({**entry, "fetchedAt": entry["fetchedAt"] - 7200}))
+
+    invokes = lookups(preview=True)
+    invokes.clear()
+    get_availability_zones("us-east-1", "685750396583", "dev", 3600)
+    assert len(invokes) == 1
+
+
+def test_cache_entries_are_not_shared_across_accounts_or_profiles(cache_dir, lookups):
+    lookups(preview=False)
+    get_availability_zones("us-east-1", "685750396583", "dev", 3600)
+
+    invokes = lookups(preview=True)
+    invokes.clear()
+    get_availability_zones("us-east-1", "998931800090", "prod", 3600)
+    get_availability_zones("us-east-1", "685750396583", "admin", 3600)
+    assert len(invokes) == 2
+    assert sorted(os.listdir(cache_dir)) == [
+        "azs-685750396583-admin-us-east-1.json",
+        "azs-685750396583-dev-us-east-1.json",
+        "azs-998931800090-prod-us-east-1.json",
+    ]
+
+
+def test_zero_ttl_never_touches_the_cache(cache_dir, lookups):
+    invokes = lookups(preview=True)
+
+    get_availability_zones("us-east-1", "685750396583", "dev", 0)
+    get_availability_zones("us-east-1", "685750396583", "dev", 0)
+    assert len(invokes) == 2
+    assert os.listdir(cache_dir) == []
+
+
+def test_select_first_count():
+    assert select_availability_zones(US_EAST_1_AZS, 2) == ["us-east-1a", "us-east-1b"]
+
+
+def test_select_explicit_list():
+    assert select_availability_zones(US_EAST_1_AZS, 3, ["us-east-1f", "us-east-1c"]) == ["us-east-1f", "us-east-1c"]
+
+
+def test_select_rejects_unknown_zones_and_bad_counts():
+    with pytest.raises(ValueError, match="not available"):
+        select_availability_zones(US_EAST_1_AZS, 3, ["us-west-2a"])
+    with pytest.raises(ValueError, match="azCount"):
+        select_availability_zones(US_EAST_1_AZS, 7)
@@ -0,0 +1,40 @@
+RULE = "aws:ec2/securityGroupRule:SecurityGroupRule"
+LISTENER = "aws:lb/listener:Listener"
+RECORD = "aws:route53/record:Record"
+DISTRIBUTION = ("aws:cloudfront/distribution:Distribution", "cdnDistribution")
+
+
+def test_load_balancer_only_admits_cloudfront_on_https(synthesize):
+    synthesis = synthesize("dev", cloudFrontEnabled="true")
+
+    assert "lb-ingress-http" not in synthesis.names(RULE)
+    https = synthesis.state(RULE, "lb-ingress-https")
+    assert (https["fromPort"], https["prefixListIds"]) == (443, ["pl-offline"])
+    assert "cidrBlocks" not in https
+
+
+def test_cloudfront_has_no_http_redirect_listener(synthesize):
+    synthesis = synthesize("dev", cloudFrontEnabled="true")
+    assert synthesis.names(LISTENER) == ["listener"]
+
+
+def test_ipv6_viewers_get_an_alias_record(synthesize):
+    synthesis = synthesize("dev", cloudFrontEnabled="true")
+    distribution = synthesis.state(*DISTRIBUTION)
+
+    assert distribution["isIpv6Enabled"] is True
+    records = {name: synthesis.state(RECORD, name) for name in synthesis.names(RECORD)}
+    assert sorted(records) == ["aRecord", "aaaaRecord"]
+    for record_type, record in zip(("A", "AAAA"), (records["aRecord"], records["aaaaRecord"])):
+        assert record["type"] == record_type
+        assert record["aliases"] == [{"name": distribution["domain_name"], "zoneId": "ZOFFLINE",
+                                      "evaluateTargetHealth": False}]
+
+
+def test_without_cloudfront_the_load_balancer_is_public(synthesize):
+    synthesis = synthesize("dev")
+
+    for name in ("lb-ingress-http", "lb-ingress-https"):
+        assert synthesis.state(RULE, name)["cidrBlocks"] == ["0.0.0.0/0"]
+    assert synthesis.names(LISTENER) == ["httpRedirectListener", "listener"]
+    assert synthesis.names(RECORD) == ["aRecord"]
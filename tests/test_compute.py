@@ -0,0 +1,173 @@
+import base64
+import gzip
+import json
+
+import pytest
+
+DB_INSTANCE = ("aws:rds/instance:Instance", "mydbinstance")
+LAUNCH_TEMPLATE = ("aws:ec2/launchTemplate:LaunchTemplate", "launch_template")
+AUTO_SCALING_GROUP = ("aws:autoscaling/group:Group", "webAppAutoScalingGroup")
+INSTANCE = ("aws:ec2/instance:Instance", "web-app")
+PARAMETER = "aws:ssm/parameter:Parameter"
+
+
+def user_data(synthesis) -> str:
+    encoded = synthesis.state(*LAUNCH_TEMPLATE)["userData"]
+    if isinstance(encoded, dict):
+        # Inline user data embeds the database password, so the mocks see it as a secret
+        encoded = encoded["value"]
+    return gzip.decompress(base64.b64decode(encoded)).decode()
+
+
+@pytest.mark.parametrize("resource", [LAUNCH_TEMPLATE, AUTO_SCALING_GROUP, INSTANCE], ids=lambda r: r[1])
+def test_ssm_mode_compute_does_not_wait_for_the_database(resource, synthesize):
+    synthesis = synthesize("dev", dbConnectionMode="ssm")
+    assert not synthesis.depends_on(synthesis.urn(*resource), synthesis.urn(*DB_INSTANCE))
+
+
+@pytest.mark.parametrize("resource", [LAUNCH_TEMPLATE, AUTO_SCALING_GROUP, INSTANCE], ids=lambda r: r[1])
+def test_inline_mode_compute_waits_for_the_database(resource, synthesize):
+    synthesis = synthesize("dev")
+    assert synthesis.depends_on(synthesis.urn(*resource), synthesis.urn(*DB_INSTANCE))
+
+
+def test_ssm_mode_publishes_the_connection_info(synthesize):
+    synthesis = synthesize("dev", dbConnectionMode="ssm")
+    db_instance = synthesis.urn(*DB_INSTANCE)
+
+    assert synthesis.names(PARAMETER) == [
+        "dbParameter-host", "dbParameter-name", "dbParameter-password", "dbParameter-port",
+        "dbParameter-read-host", "dbParameter-username"]
+    for key in ("host", "read-host", "port"):
+        assert synthesis.depends_on(synthesis.urn(PARAMETER, f"dbParameter-{key}"), db_instance)
+    assert synthesis.state(PARAMETER, "dbParameter-host")["name"] == "/pulumi_python/dev/db/host"
+    assert synthesis.state(PARAMETER, "dbParameter-password")["type"] == "SecureString"
+
+
+def test_ssm_mode_user_data_reads_parameter_store(synthesize):
+    synthesis = synthesize("dev", dbConnectionMode="ssm")
+    script = user_data(synthesis)
+
+    assert 'PARAMETER_PATH="/pulumi_python/dev/db"' in script
+    assert "DBHOST=$(param host)" in script
+    assert "mydbinstance" not in script
+
+    policies = [json.loads(synthesis.monitor.resources[urn].state["policy"])
+                for urn in synthesis.urns("aws:iam/policy:Policy")]
+    statements = [statement for policy in policies for statement in policy["Statement"]]
+    assert {"Effect": "Allow", "Action": "ssm:GetParametersByPath",
+            "Resource": "arn:aws:ssm:us-east-1:685750396583:parameter/pulumi_python/dev/db"} in statements
+
+
+def test_inline_mode_publishes_no_parameters(synthesize):
+    synthesis = synthesize("dev")
+
+    assert synthesis.count(PARAMETER) == 0
+    assert "DBHOST=" in user_data(synthesis)
+
+
+POLICY = "aws:autoscaling/policy:Policy"
+ALARM = "aws:cloudwatch/metricAlarm:MetricAlarm"
+SCHEDULE = "aws:autoscaling/schedule:Schedule"
+
+SCALING_MODES = {
+    "simple": (["scaleDown", "scaleUp"], ["cpuHighAlarm", "cpuLowAlarm"]),
+    "target-tracking": (["targetTracking"], []),
+    "step": (["stepScaleIn", "stepScaleOut"], ["cpuHighAlarm", "cpuLowAlarm"]),
+    "predictive": (["predictiveScaling"], []),
+    "scheduled": ([], []),
+}
+
+
+@pytest.mark.parametrize("mode", sorted(SCALING_MODES))
+def test_each_scaling_mode_creates_only_its_policies(mode, synthesize):
+    schedules = [{"name": "night", "recurrence": "0 22 * * *", "desiredCapacity": 1}] if mode == "scheduled" else []
+    synthesis = synthesize("dev", scaling={"mode": mode, "schedules": schedules})
+    policies, alarms = SCALING_MODES[mode]
+
+    assert synthesis.names(POLICY) == policies
+    assert synthesis.names(ALARM) == alarms
+    for name in policies:
+        assert synthesis.state(POLICY, name)["autoscalingGroupName"] == "webapp_asg"
+
+
+def test_simple_alarms_trigger_their_policies(synthesize):
+    synthesis = synthesize("dev")
+
+    assert synthesis.state(ALARM, "cpuHighAlarm")["alarmActions"] == [synthesis.state(POLICY, "scaleUp")["arn"]]
+    assert synthesis.state(ALARM, "cpuLowAlarm")["alarmActions"] == [synthesis.state(POLICY, "scaleDown")["arn"]]
+
+
+def test_target_tracking_on_request_count_is_keyed_on_the_target_group(synthesize):
+    synthesis = synthesize("dev", scaling={"mode": "target-tracking", "targetTracking": {"metric": "requestCount"}})
+    configuration = synthesis.state(POLICY, "targetTracking")["targetTrackingConfiguration"]
+
+    assert configuration["predefinedMetricSpecification"] == {
+        "predefinedMetricType": "ALBRequestCountPerTarget",
+        "resourceLabel": "apploadbalancer/offline/targetgroup/offline",
+    }
+    assert configuration["targetValue"] == 50
+
+
+def test_step_policies_scale_by_how_far_the_alarm_is_breached(synthesize):
+    synthesis = synthesize("dev", scaling={"mode": "step"})
+    scale_out = synthesis.state(POLICY, "stepScaleOut")
+
+    assert [step["scalingAdjustment"] for step in scale_out["stepAdjustments"]] == [1, 2, 3]
+    assert "metricIntervalUpperBound" not in scale_out["stepAdjustments"][-1]
+    assert synthesis.state(ALARM, "cpuHighAlarm")["alarmActions"] == [scale_out["arn"]]
+    assert synthesis.state(ALARM, "cpuLowAlarm")["alarmActions"] == [synthesis.state(POLICY, "stepScaleIn")["arn"]]
+
+
+def test_predictive_policy_and_schedules(synthesize):
+    synthesis = synthesize("dev", scaling={"mode": "predictive", "schedules": [
+        {"name": "business-hours", "recurrence": "0 8 * * MON-FRI", "minSize": 2}]})
+
+    configuration = synthesis.state(POLICY, "predictiveScaling")["predictiveScalingConfiguration"]
+    assert configuration["mode"] == "ForecastAndScale"
+    assert configuration["metricSpecification"]["predefinedMetricPairSpecification"] == {
+        "predefinedMetricType": "ASGCPUUtilization"}
+
+    schedule = synthesis.state(SCHEDULE, "schedule-business-hours")
+    assert (schedule["recurrence"], schedule["minSize"], schedule["timeZone"]) == ("0 8 * * MON-FRI", 2, "UTC")
+
+
+LOAD_BALANCER = ("aws:lb/loadBalancer:LoadBalancer", "appLoadBalancer")
+TARGET_GROUP = ("aws:lb/targetGroup:TargetGroup", "targetGroup")
+
+
+def test_load_balancer_and_target_group_defaults(synthesize):
+    synthesis = synthesize("dev")
+    lb = synthesis.state(*LOAD_BALANCER)
+    target_group = synthesis.state(*TARGET_GROUP)
+
+    assert (lb["idleTimeout"], lb["clientKeepAlive"]) == (60, 3600)
+    assert (target_group["deregistrationDelay"], target_group["slowStart"],
+            target_group["loadBalancingAlgorithmType"]) == (30, 30, "round_robin")
+    assert target_group["healthCheck"] == {
+        "enabled": True, "path": "/healthz", "matcher": "200", "interval": 10, "timeout": 5,
+        "healthyThreshold": 2, "unhealthyThreshold": 2}
+
+
+def test_load_balancer_settings_are_applied(synthesize):
+    synthesis = synthesize("dev", loadBalancer={
+        "idleTimeout": 120, "clientKeepAlive": 600, "deregistrationDelay": 5, "slowStart": 0,
+        "algorithm": "least_outstanding_requests", "httpRedirect": False,
+        "healthCheck": {"path": "/ready", "interval": 15}})
+    lb = synthesis.state(*LOAD_BALANCER)
+    target_group = synthesis.state(*TARGET_GROUP)
+
+    assert (lb["idleTimeout"], lb["clientKeepAlive"]) == (120, 600)
+    assert (target_group["deregistrationDelay"], target_group["slowStart"],
+            target_group["loadBalancingAlgorithmType"]) == (5, 0, "least_outstanding_requests")
+    assert (target_group["healthCheck"]["path"], target_group["healthCheck"]["interval"]) == ("/ready", 15)
+    assert synthesis.names("aws:lb/listener:Listener") == ["listener"]
+
+
+def test_http_redirects_to_the_https_listener(synthesize):
+    synthesis = synthesize("dev")
+    redirect = synthesis.state("aws:lb/listener:Listener", "httpRedirectListener")
+
+    assert (redirect["port"], redirect["protocol"]) == (80, "HTTP")
+    assert redirect["defaultActions"][0]["redirect"] == {"protocol": "HTTPS", "port": "443",
+                                                         "statusCode": "HTTP_301"}
@@ -0,0 +1,116 @@
+import base64
+import gzip
+
+import pytest
+
+PARAMETER_GROUP = ("aws:rds/parameterGroup:ParameterGroup", "myparametergroup")
+
+
+def parameters(synthesis) -> dict:
+    return {parameter["name"]: parameter["value"] for parameter in synthesis.state(*PARAMETER_GROUP)["parameters"]}
+
+
+@pytest.mark.parametrize("tune", ["true", "false"])
+def test_max_connections_is_left_to_rds(tune, synthesize):
+    synthesis = synthesize("dev", dbTuneParameters=tune)
+    assert parameters(synthesis)["max_connections"] == "LEAST({DBInstanceClassMemory/9531392},5000)"
+
+
+def test_explicit_max_connections(synthesize):
+    assert parameters(synthesize("dev", dbMaxConnections="200"))["max_connections"] == "200"
+
+
+def test_proxy_takes_a_share_of_the_database_connections(synthesize):
+    synthesis = synthesize("dev", dbProxyEnabled="true", dbConnectionMode="ssm", dbProxyMaxConnectionsPercent="75")
+
+    pool = synthesis.state("aws:rds/proxyDefaultTargetGroup:ProxyDefaultTargetGroup",
+                           "dbProxyTargetGroup")["connectionPoolConfig"]
+    assert pool["maxConnectionsPercent"] == 75
+    target = synthesis.urn("aws:rds/proxyTarget:ProxyTarget", "dbProxyTarget")
+    assert synthesis.depends_on(target, synthesis.urn("aws:rds/instance:Instance", "mydbinstance"))
+
+
+def test_inline_user_data_connects_through_the_proxy(synthesize):
+    synthesis = synthesize("dev", dbProxyEnabled="true")
+    encoded = synthesis.state("aws:ec2/launchTemplate:LaunchTemplate", "launch_template")["userData"]
+    # Inline user data embeds the database password, so the mocks see it as a secret
+    script = gzip.decompress(base64.b64decode(encoded["value"])).decode()
+
+    proxy = synthesis.state("aws:rds/proxy:Proxy", "dbProxy")
+    assert f"DBHOST={proxy['endpoint']}\n" in script
+    assert "DBPORT=5432\n" in script
+    assert synthesis.state("aws:rds/instance:Instance", "mydbinstance")["address"] not in script
+
+
+REPLICA = "aws:rds/instance:Instance"
+READER_RECORD = "aws:route53/record:Record"
+
+
+def connection_parameter(synthesis, key: str) -> str:
+    # The provider marks every parameter value as secret
+    return synthesis.state("aws:ssm/parameter:Parameter", f"dbParameter-{key}")["value"]["value"]
+
+
+def test_replicas_are_spread_round_robin_over_the_azs(synthesize):
+    synthesis = synthesize("dev", dbReadReplicaCount="4", dbConnectionMode="ssm")
+    primary = synthesis.state(REPLICA, "mydbinstance")
+
+    zones = [synthesis.state(REPLICA, f"mydbinstance-replica-{i}")["availabilityZone"] for i in range(4)]
+    assert zones == ["us-east-1a", "us-east-1b", "us-east-1c", "us-east-1a"]
+    for i in range(4):
+        assert synthesis.state(REPLICA, f"mydbinstance-replica-{i}")["replicateSourceDb"] == primary["identifier"]
+
+
+def test_one_replica_is_the_reader_host(synthesize):
+    synthesis = synthesize("dev", dbReadReplicaCount="1", dbConnectionMode="ssm")
+
+    assert synthesis.count(READER_RECORD) == 1  # only the site's A record
+    assert connection_parameter(synthesis, "read-host") == synthesis.state(REPLICA, "mydbinstance-replica-0")["address"]
+
+
+def test_several_replicas_share_a_weighted_reader_name(synthesize):
+    synthesis = synthesize("dev", dbReadReplicaCount="3", dbConnectionMode="ssm")
+    zone = synthesis.state("aws:route53/zone:Zone", "dbReaderZone")
+    reader_name = f"reader.{zone['name']}"
+
+    records = [synthesis.state(READER_RECORD, f"dbReaderRecord-{i}") for i in range(3)]
+    assert [record["records"] for record in records] == [
+        [synthesis.state(REPLICA, f"mydbinstance-replica-{i}")["address"]] for i in range(3)]
+    for i, record in enumerate(records):
+        assert (record["name"], record["type"], record["setIdentifier"]) == (reader_name, "CNAME", f"replica-{i}")
+        assert record["weightedRoutingPolicies"] == [{"weight": 1}]
+        assert record["zoneId"] == zone["zone_id"]
+    assert zone["vpcs"] == [{"vpcId": "vpc-id"}]
+    assert connection_parameter(synthesis, "read-host") == reader_name
+
+
+def test_without_replicas_reads_go_to_the_primary(synthesize):
+    synthesis = synthesize("dev", dbConnectionMode="ssm")
+    assert connection_parameter(synthesis, "read-host") == connection_parameter(synthesis, "host")
+
+
+TABLE = ("aws:dynamodb/table:Table", "myDynamoDbTable")
+SCALING_TARGET = "aws:appautoscaling/target:Target"
+BY_EMAIL = [{"name": "byEmail", "hashKey": "email"}]
+
+
+def test_autoscaling_owns_provisioned_table_and_index_capacity(synthesize):
+    synthesis = synthesize("dev", dynamoDbBillingMode="PROVISIONED", dynamoDbIndexes=BY_EMAIL)
+
+    assert synthesis.registrations[synthesis.urn(*TABLE)]["ignoreChanges"] == [
+        "readCapacity", "writeCapacity",
+        "globalSecondaryIndexes[*].readCapacity", "globalSecondaryIndexes[*].writeCapacity"]
+    assert synthesis.names(SCALING_TARGET) == [
+        "dynamoDbReadTarget", "dynamoDbReadTarget-byEmail", "dynamoDbWriteTarget", "dynamoDbWriteTarget-byEmail"]
+    target = synthesis.state(SCALING_TARGET, "dynamoDbReadTarget-byEmail")
+    assert (target["resourceId"], target["scalableDimension"]) == (
+        "table/csye6225DynamoDb/index/byEmail", "dynamodb:index:ReadCapacityUnits")
+
+
+def test_on_demand_tables_have_no_capacity_to_manage(synthesize):
+    synthesis = synthesize("dev", dynamoDbIndexes=BY_EMAIL)
+
+    assert synthesis.registrations[synthesis.urn(*TABLE)]["ignoreChanges"] == []
+    assert synthesis.count(SCALING_TARGET) == 0
+    index, = synthesis.state(*TABLE)["globalSecondaryIndexes"]
+    assert "readCapacity" not in index
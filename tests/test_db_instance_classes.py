@@ -0,0 +1,76 @@
+import pytest
+
+from db_instance_classes import (DB_INSTANCE_CLASSES, GIB, MAX_CONNECTIONS_FORMULA, instance_class_memory_bytes,
+                                 instance_memory_bytes, max_connections, postgres_parameters)
+
+
+@pytest.mark.parametrize("instance_class, expected", [
+    # Close to, and never above, what RDS reports for these classes
+    ("db.t3.micro", 84),
+    ("db.m5.large", 811),
+    ("db.r6g.large", 1622),
+    ("db.r7g.4xlarge", 5000),
+])
+def test_max_connections_estimate(instance_class, expected):
+    assert max_connections(instance_class) == expected
+
+
+def test_class_memory_leaves_room_for_the_os():
+    assert instance_class_memory_bytes("db.t3.micro") == GIB - 256 * 1024 ** 2
+    assert instance_class_memory_bytes("db.r6g.large") == 16 * GIB - 16 * GIB // 10
+    for instance_class in ("db.t4g.small", "db.m6g.xlarge", "db.r5.2xlarge"):
+        assert instance_class_memory_bytes(instance_class) < instance_memory_bytes(instance_class)
+
+
+def test_formula_is_left_for_rds_to_evaluate():
+    assert MAX_CONNECTIONS_FORMULA == "LEAST({DBInstanceClassMemory/9531392},5000)"
+
+
+def test_unknown_instance_class():
+    with pytest.raises(ValueError, match="unknown RDS instance class 'db.x2g.large'"):
+        max_connections("db.x2g.large")
+
+
+def test_memory_sizes_are_left_to_rds():
+    parameters = postgres_parameters("db.t3.micro", "gp3")
+
+    assert parameters["max_connections"] == (MAX_CONNECTIONS_FORMULA, "pending-reboot")
+    assert parameters["shared_buffers"] == ("{DBInstanceClassMemory/32768}", "pending-reboot")
+    assert parameters["effective_cache_size"] == ("{DBInstanceClassMemory*3/32768}", "immediate")
+
+
+@pytest.mark.parametrize("instance_class, connections, work_mem", [
+    ("db.t3.micro", None, 4096),  # the 4 MB floor
+    ("db.m5.large", None, 4096),
+    ("db.r6g.xlarge", None, 4096),
+    ("db.r6g.xlarge", 500, 11324),
+    ("db.r7g.4xlarge", 200, 113246),
+])
+def test_work_mem_is_split_over_the_connections(instance_class, connections, work_mem):
+    parameters = postgres_parameters(instance_class, "gp3", connections)
+    assert parameters["work_mem"] == (work_mem, "immediate")
+    if connections:
+        assert parameters["max_connections"] == (connections, "pending-reboot")
+
+
+def test_work_mem_never_exceeds_the_memory_left_by_shared_buffers():
+    for instance_class in DB_INSTANCE_CLASSES:
+        connections = max_connections(instance_class)
+        work_mem = postgres_parameters(instance_class, "gp3")["work_mem"][0] * 1024
+        if work_mem > 4 * 1024 ** 2:
+            assert work_mem * connections <= instance_class_memory_bytes(instance_class) * 3 // 4
+
+
+@pytest.mark.parametrize("instance_class, workers, per_gather", [
+    ("db.t4g.micro", 2, 1), ("db.m6g.2xlarge", 8, 4), ("db.r5.4xlarge", 16, 8)])
+def test_parallel_workers_follow_the_vcpus(instance_class, workers, per_gather):
+    parameters = postgres_parameters(instance_class, "gp3")
+
+    assert parameters["max_parallel_workers"][0] == workers
+    assert parameters["max_parallel_workers_per_gather"][0] == per_gather
+    assert parameters["max_worker_processes"][0] == max(8, workers)
+
+
+def test_random_page_cost_depends_on_the_storage():
+    assert postgres_parameters("db.t3.micro", "standard")["random_page_cost"][0] == "4"
+    assert postgres_parameters("db.t3.micro", "gp3")["random_page_cost"][0] == "1.1"
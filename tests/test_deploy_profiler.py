@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+from deploy_profiler import analyze, build_graph
+
+# __main__.py before it was split into tiers
+FLAT_PROGRAM = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots", "deploy_profiler",
+                            "flat_program.py")
+
+DB_INSTANCE = ("aws:rds/instance:Instance", "mydbinstance")
+
+# Resources that only ever needed the network, and could start while the database was being created
+INDEPENDENT_OF_DB = [
+    ("aws:lb/loadBalancer:LoadBalancer", "appLoadBalancer"),
+    ("aws:lb/targetGroup:TargetGroup", "targetGroup"),
+    ("aws:lb/listener:Listener", "listener"),
+    ("aws:route53/record:Record", "aRecord"),
+    ("aws:iam/role:Role", "cloudWatchAgentRole"),
+    ("aws:iam/instanceProfile:InstanceProfile", "cloudWatchAgentInstanceProfile"),
+    ("aws:lambda/function:Function", "myLambdaFunction"),
+    ("aws:sns/topic:Topic", "myTopic"),
+    ("aws:dynamodb/table:Table", "myDynamoDbTable"),
+    ("gcp:storage/bucket:Bucket", "myBucket"),
+]
+
+
+def profile(synthesis) -> dict:
+    return analyze(build_graph(synthesis.registrations))
+
+
+@pytest.fixture
+def flat_profile(synthesize):
+    return profile(synthesize("dev", program=FLAT_PROGRAM))
+
+
+def test_flat_program_profile(flat_profile):
+    assert flat_profile["criticalPath"] == [
+        "vpc", "privateSubnet-2", "dbsubnetgrp", "mydbinstance", "launch_template", "webAppAutoScalingGroup",
+        "scaleDown", "cpuLowAlarm"]
+
+
+def test_inline_mode_keeps_the_flat_critical_path(flat_profile, synthesize):
+    result = profile(synthesize("dev"))
+
+    # Inline user data embeds the database endpoint, so the web instances still wait for the
+    # database: the tiers alone do not shorten the path, only ssm mode does
+    assert result["criticalPath"] == flat_profile["criticalPath"]
+    assert result["makespan"] == flat_profile["makespan"]
+
+
+def test_ssm_mode_takes_compute_off_the_critical_path(flat_profile, synthesize):
+    result = profile(synthesize("dev", dbConnectionMode="ssm"))
+
+    assert len(result["criticalPath"]) < len(flat_profile["criticalPath"])
+    assert result["makespan"] < flat_profile["makespan"]
+    # The path now ends at the SSM parameters that publish the endpoint, not at the instances
+    assert result["criticalPath"][-2] == "mydbinstance"
+    assert result["criticalPath"][-1].startswith("dbParameter-")
+
+
+@pytest.mark.parametrize("type_, name", INDEPENDENT_OF_DB, ids=[name for _, name in INDEPENDENT_OF_DB])
+def test_resources_do_not_wait_for_the_database(type_, name, synthesize):
+    synthesis = synthesize("dev")
+    assert not synthesis.depends_on(synthesis.urn(type_, name), synthesis.urn(*DB_INSTANCE))
+
+
+def test_components_wait_for_their_children(synthesize):
+    synthesis = synthesize("dev")
+    nodes = build_graph(synthesis.registrations)
+    compute = synthesis.urn("pulumi_python:components:Compute", "compute")
+
+    assert synthesis.urn("aws:autoscaling/group:Group", "webAppAutoScalingGroup") in nodes[compute]["dependencies"]
+    assert nodes[synthesis.urn("aws:lb/listener:Listener", "listener")]["tier"] == "compute"
+
+
+def test_analyze_schedules_resources_as_early_as_possible():
+    def node(name, *dependencies, custom=True):
+        return {"name": name, "type": "aws:test/node:Node", "parent": None, "custom": custom,
+                "dependencies": set(dependencies), "tier": name}
+    nodes = {"a": node("a"), "b": node("b", "a"), "c": node("c", "a"), "d": node("d", "b", "c")}
+    timings = {"a": {"start": 0, "end": 10}, "b": {"start": 10, "end": 40},
+               "c": {"start": 10, "end": 15}, "d": {"start": 40, "end": 45}}
+
+    result = analyze(nodes, timings)
+
+    assert result["makespan"] == 45
+    assert result["criticalPath"] == ["a", "b", "d"]
+    slack = {resource["name"]: resource["slack"] for resource in result["resources"]}
+    assert slack == {"a": 0, "b": 0, "c": 25, "d": 0}
+
+
+def test_analyze_breaks_critical_path_ties_on_the_urn():
+    def node(name, *dependencies):
+        return {"name": name, "type": "aws:test/node:Node", "parent": None, "custom": True,
+                "dependencies": set(dependencies), "tier": name}
+    # Both subnets finish at the same time, in either insertion order
+    for subnets in (["subnet-0", "subnet-1"], ["subnet-1", "subnet-0"]):
+        nodes = {"vpc": node("vpc"), **{name: node(name, "vpc") for name in subnets},
+                 "db": node("db", *subnets)}
+        assert analyze(nodes)["criticalPath"] == ["vpc", "subnet-1", "db"]
+
+
+def test_analyze_rejects_cycles():
+    nodes = {"a": {"name": "a", "type": "t", "parent": None, "custom": True, "dependencies": {"b"}},
+             "b": {"name": "b", "type": "t", "parent": None, "custom": True, "dependencies": {"a"}}}
+    with pytest.raises(ValueError, match="cycle"):
+        analyze(nodes)
@@ -0,0 +1,135 @@
+import os
+import shutil
+import subprocess
+import sys
+import zipfile
+
+import pytest
+
+import lambda_package
+import offline
+from lambda_package import build_function_package, build_layer_package, file_base64_sha256
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def package_cache(tmp_path, monkeypatch):
+    cache = tmp_path / "cache"
+    monkeypatch.setattr(lambda_package, "PACKAGE_CACHE_DIR", str(cache))
+    return cache
+
+
+@pytest.fixture
+def source_dir(tmp_path):
+    """Function sources next to a vendored distribution, the way `pip install --target .` leaves them."""
+    root = tmp_path / "src"
+    files = {
+        "main.py": "from helpers import greet\n\ndef handler(event, context):\n    return greet()\n",
+        "helpers.py": "def greet():\n    return 'hi'\n",
+        "__pycache__/helpers.cpython-311.pyc": "",
+        "vendored/__init__.py": "VERSION = '1.0'\n",
+        "vendored-1.0.dist-info/METADATA": "Name: vendored\n",
+        "vendored-1.0.dist-info/RECORD": "vendored/__init__.py,,\nvendored-1.0.dist-info/METADATA,,\n",
+    }
+    for path, content in files.items():
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text(content)
+    return root
+
+
+def names(zip_path: str) -> list:
+    with zipfile.ZipFile(zip_path) as archive:
+        return archive.namelist()
+
+
+def test_sources_and_vendored_dependencies_go_to_separate_packages(package_cache, source_dir):
+    assert names(build_function_package(str(source_dir))) == ["helpers.py", "main.py"]
+    assert names(build_layer_package(str(source_dir), "python3.11", "x86_64")) == [
+        "python/vendored-1.0.dist-info/METADATA", "python/vendored-1.0.dist-info/RECORD",
+        "python/vendored/__init__.py"]
+
+
+def test_no_dependencies_means_no_layer(package_cache, source_dir):
+    shutil.rmtree(source_dir / "vendored")
+    shutil.rmtree(source_dir / "vendored-1.0.dist-info")
+    assert build_layer_package(str(source_dir), "python3.11", "x86_64") is None
+
+
+def test_packages_are_byte_identical_across_builds(package_cache, source_dir):
+    first = build_function_package(str(source_dir))
+    digest = file_base64_sha256(first)
+
+    shutil.rmtree(package_cache)
+    os.utime(source_dir / "main.py", (0, 0))
+    second = build_function_package(str(source_dir))
+
+    assert second == first
+    assert file_base64_sha256(second) == digest
+
+
+def test_unchanged_sources_are_not_zipped_again(package_cache, source_dir, monkeypatch):
+    build_function_package(str(source_dir))
+    writes = []
+    monkeypatch.setattr(lambda_package, "write_reproducible_zip", lambda *args: writes.append(args))
+
+    build_function_package(str(source_dir))
+    assert writes == []
+
+    (source_dir / "helpers.py").write_text("def greet():\n    return 'hello'\n")
+    build_function_package(str(source_dir))
+    assert len(writes) == 1
+
+
+def test_layer_key_includes_runtime_and_architecture(package_cache, source_dir):
+    x86 = build_layer_package(str(source_dir), "python3.11", "x86_64")
+    assert build_layer_package(str(source_dir), "python3.11", "arm64") != x86
+    assert build_layer_package(str(source_dir), "python3.12", "x86_64") != x86
+
+
+def test_packaging_does_not_import_pulumi():
+    result = subprocess.run([sys.executable, "-c", "import sys, lambda_package; print('pulumi' in sys.modules)"],
+                            cwd=PROJECT_DIR, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+
+@pytest.fixture
+def preview_package_cache(tmp_path, monkeypatch):
+    """Package cache the offline previews use in place of their per-process one."""
+    cache = tmp_path / "preview-cache"
+    monkeypatch.setattr(offline, "_package_cache_dir", str(cache))
+    return cache
+
+
+@pytest.fixture
+def zips_opened(monkeypatch):
+    """Number of zipfile.ZipFile objects constructed so far, in zips_opened[0]."""
+    opened = [0]
+    zip_file = zipfile.ZipFile
+
+    def counting_zip_file(*args, **kwargs):
+        opened[0] += 1
+        return zip_file(*args, **kwargs)
+    monkeypatch.setattr(zipfile, "ZipFile", counting_zip_file)
+    return opened
+
+
+def preview():
+    return offline.run_program("dev", preview=True)
+
+
+def test_preview_with_a_cold_package_cache(preview_package_cache, benchmark):
+    benchmark.group = "preview"
+    benchmark.pedantic(preview, setup=lambda: shutil.rmtree(preview_package_cache, ignore_errors=True),
+                       rounds=5, warmup_rounds=1)
+
+
+def test_preview_with_a_warm_package_cache(preview_package_cache, zips_opened, benchmark):
+    benchmark.group = "preview"
+    preview()
+    assert zips_opened[0] > 0
+    zips_opened[0] = 0
+
+    benchmark.pedantic(preview, rounds=5, warmup_rounds=1)
+    # Nothing is re-packaged once the cache holds the packages
+    assert zips_opened[0] == 0
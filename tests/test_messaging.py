@@ -0,0 +1,58 @@
+import json
+
+FUNCTION = ("aws:lambda/function:Function", "myLambdaFunction")
+ALIAS = ("aws:lambda/alias:Alias", "myLambdaAlias")
+PROVISIONED = "aws:lambda/provisionedConcurrencyConfig:ProvisionedConcurrencyConfig"
+
+
+def test_alias_points_at_the_published_version(synthesize):
+    synthesis = synthesize("dev")
+    function = synthesis.state(*FUNCTION)
+    alias = synthesis.state(*ALIAS)
+
+    assert function["publish"] is True
+    assert (alias["name"], alias["functionName"], alias["functionVersion"]) == ("live", function["name"],
+                                                                              function["version"])
+
+
+def test_sns_invokes_the_alias_not_the_function(synthesize):
+    synthesis = synthesize("dev")
+    alias = synthesis.state(*ALIAS)
+
+    permission = synthesis.state("aws:lambda/permission:Permission", "myLambdaPermission")
+    assert permission["qualifier"] == "live"
+    assert synthesis.state("aws:sns/topicSubscription:TopicSubscription", "myLambdaSubscription")["endpoint"] == \
+        alias["arn"]
+
+
+def test_queue_hands_batches_to_the_alias(synthesize):
+    synthesis = synthesize("dev", sqsBufferEnabled="true")
+    mapping = synthesis.state("aws:lambda/eventSourceMapping:EventSourceMapping", "myLambdaEventSourceMapping")
+    assert mapping["functionName"] == synthesis.state(*ALIAS)["arn"]
+
+
+def test_provisioned_concurrency_is_configured_on_the_alias(synthesize):
+    synthesis = synthesize("dev", lambdaProvisionedConcurrency="2", lambdaReservedConcurrency="10")
+
+    config = synthesis.state(PROVISIONED, "myLambdaProvisionedConcurrency")
+    assert (config["qualifier"], config["provisionedConcurrentExecutions"]) == ("live", 2)
+    assert synthesis.depends_on(synthesis.urn(PROVISIONED, "myLambdaProvisionedConcurrency"), synthesis.urn(*ALIAS))
+    assert synthesis.state(*FUNCTION)["reservedConcurrentExecutions"] == 10
+
+
+def test_no_provisioned_concurrency_by_default(synthesize):
+    synthesis = synthesize("dev")
+
+    assert synthesis.count(PROVISIONED) == 0
+    # -1 leaves the function on the account's unreserved pool
+    assert synthesis.state(*FUNCTION)["reservedConcurrentExecutions"] == -1
+
+
+def test_lambda_can_query_but_never_scan_the_table(synthesize):
+    synthesis = synthesize("dev", dynamoDbIndexes=[{"name": "byEmail", "hashKey": "email"}])
+    table_arn = synthesis.state("aws:dynamodb/table:Table", "myDynamoDbTable")["arn"]
+
+    table, index = json.loads(synthesis.state("aws:iam/policy:Policy", "dynamoDbPolicy")["policy"])["Statement"]
+    assert table["Action"] == ["dynamodb:PutItem", "dynamodb:GetItem", "dynamodb:UpdateItem", "dynamodb:Query"]
+    assert table["Resource"] == table_arn
+    assert (index["Action"], index["Resource"]) == ("dynamodb:Query", [f"{table_arn}/index/byEmail"])
@@ -0,0 +1,65 @@
+import pytest
+
+from db_instance_classes import GIB
+
+ALARM = "aws:cloudwatch/metricAlarm:MetricAlarm"
+TOPIC = "aws:sns/topic:Topic"
+MONITORING = {"monitoringEnabled": "true", "alarmEmail": "ops@example.com"}
+EVERY_TIER = {**MONITORING, "dbReadReplicaCount": "2", "dbProxyEnabled": "true", "dbConnectionMode": "ssm",
+              "daxEnabled": "true", "cacheEnabled": "true", "cacheReplicasPerShard": "1",
+              "cloudFrontEnabled": "true", "computeTopology": "private", "natGateways": "single"}
+
+
+def alarm(synthesis, name: str) -> dict:
+    return synthesis.state(ALARM, f"alarm-{name}")
+
+
+@pytest.mark.parametrize("name, dimensions", [
+    ("rdsReplicaLag-0", {"DBInstanceIdentifier": "csye6225-replica-0"}),
+    ("rdsReplicaLag-1", {"DBInstanceIdentifier": "csye6225-replica-1"}),
+    ("rdsProxyBorrowLatency", {"ProxyName": "csye6225-proxy"}),
+    ("daxThrottles", {"ClusterId": "csye6225-dax"}),
+    ("cacheEngineCpu-001", {"CacheClusterId": "csye6225-cache-001"}),
+    ("cacheEngineCpu-002", {"CacheClusterId": "csye6225-cache-002"}),
+    ("cloudFront5xxRate", {"DistributionId": "cdnDistribution-id", "Region": "Global"}),
+    ("natPortAllocationErrors-0", {"NatGatewayId": "natGateway-0-id"}),
+])
+def test_every_tier_is_alarmed(name, dimensions, synthesize):
+    assert alarm(synthesize("dev", **EVERY_TIER), name)["dimensions"] == dimensions
+
+
+def test_tiers_the_stack_does_not_have_get_no_alarms(synthesize):
+    names = synthesize("dev", **MONITORING).names(ALARM)
+    for prefix in ("rdsReplica", "rdsProxy", "dax", "cache", "cloudFront", "nat"):
+        assert not [name for name in names if name.startswith(f"alarm-{prefix}")]
+
+
+def test_cluster_mode_cache_alarms_every_node_of_every_shard(synthesize):
+    synthesis = synthesize("dev", **MONITORING, cacheEnabled="true", dbConnectionMode="ssm",
+                           cacheShardCount="2", cacheReplicasPerShard="1")
+    names = [name for name in synthesis.names(ALARM) if name.startswith("alarm-cacheMemory-")]
+
+    assert names == ["alarm-cacheMemory-0001-001", "alarm-cacheMemory-0001-002",
+                     "alarm-cacheMemory-0002-001", "alarm-cacheMemory-0002-002"]
+
+
+@pytest.mark.parametrize("overrides, ceiling", [
+    ({}, 100),
+    ({"allocatedStorage": "400", "dbMaxAllocatedStorage": "1000"}, 1000),
+])
+def test_free_storage_threshold_follows_the_storage_ceiling(overrides, ceiling, synthesize):
+    # Storage autoscaling grows the volume past allocatedStorage, up to dbMaxAllocatedStorage
+    synthesis = synthesize("dev", **MONITORING, **overrides)
+    assert alarm(synthesis, "rdsFreeStorage")["threshold"] == ceiling * GIB / 10
+
+
+def test_cloudfront_alarms_notify_a_topic_in_us_east_1(synthesize):
+    synthesis = synthesize("dev", **EVERY_TIER)
+    assert synthesis.names(TOPIC) == ["alertTopic", "myTopic"]
+
+    homed_elsewhere = synthesize("dev", **{**MONITORING, "cloudFrontEnabled": "true", "aws:region": "us-west-2"})
+    assert homed_elsewhere.names(TOPIC) == ["alertTopic", "alertTopic-us-east-1", "myTopic"]
+    topic = homed_elsewhere.state(TOPIC, "alertTopic-us-east-1")
+    assert alarm(homed_elsewhere, "cloudFront5xxRate")["alarmActions"] == [topic["arn"]]
+    assert alarm(homed_elsewhere, "albTarget5xx")["alarmActions"] == [
+        homed_elsewhere.state(TOPIC, "alertTopic")["arn"]]
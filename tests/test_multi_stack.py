@@ -0,0 +1,103 @@
+import argparse
+import asyncio
+import shutil
+import threading
+import time
+
+import pytest
+from pulumi import automation as auto
+
+import multi_stack
+
+STACKS = ["dev", "prod", "staging"]
+
+
+class FakeStack:
+    """Stands in for an Automation API stack, recording how many run at the same time."""
+
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def preview(self, parallel, color, on_output):
+        with FakeStack.lock:
+            FakeStack.running += 1
+            FakeStack.peak = max(FakeStack.peak, FakeStack.running)
+        on_output("Previewing update\n")
+        # Blocks like the pulumi CLI does, so overlapping stacks only come from the worker threads
+        time.sleep(0.2)
+        with FakeStack.lock:
+            FakeStack.running -= 1
+        return auto.PreviewResult(stdout="", stderr="", change_summary={auto.OpType.CREATE: 3,
+                                                                         auto.OpType.SAME: 1})
+
+
+@pytest.fixture(autouse=True)
+def main_thread_event_loop():
+    # asyncio.run leaves the main thread without an event loop, and the Pulumi runtime of later tests needs one
+    loop = asyncio.get_event_loop_policy().get_event_loop()
+    yield
+    asyncio.set_event_loop(loop)
+
+
+@pytest.fixture
+def workspaces(monkeypatch):
+    """Options each fake stack was created with, by stack name."""
+    created = {}
+    FakeStack.running = FakeStack.peak = 0
+
+    def create_or_select_stack(stack_name, work_dir=None, opts=None, **kwargs):
+        created[stack_name] = (work_dir, opts)
+        return FakeStack()
+    monkeypatch.setattr(auto, "create_or_select_stack", create_or_select_stack)
+    return created
+
+
+def automation_args(tmp_path, concurrency: int) -> argparse.Namespace:
+    return argparse.Namespace(stack=STACKS, operation="preview", concurrency=concurrency, parallel=None,
+                              backend_url=f"file://{tmp_path}", offline=False)
+
+
+@pytest.mark.parametrize("concurrency", [1, 2, 3])
+def test_stacks_run_in_threads_up_to_the_concurrency(concurrency, workspaces, tmp_path):
+    results = asyncio.run(multi_stack.run_all(automation_args(tmp_path, concurrency)))
+
+    assert FakeStack.peak == concurrency
+    assert [result.status for result in results] == ["succeeded"] * len(STACKS)
+    assert sorted(workspaces) == STACKS
+
+
+def test_every_stack_uses_the_backend_and_the_project(workspaces, tmp_path):
+    asyncio.run(multi_stack.run_all(automation_args(tmp_path, 2)))
+
+    for work_dir, opts in workspaces.values():
+        assert work_dir == multi_stack.PROJECT_DIR
+        assert opts.env_vars == {"PULUMI_BACKEND_URL": f"file://{tmp_path}"}
+
+
+def test_output_is_prefixed_and_changes_are_summarized(workspaces, tmp_path, capsys):
+    assert multi_stack.main(["preview", "--stack", "dev", "--stack", "prod", "--backend-url", f"file://{tmp_path}"]) == 0
+    out = capsys.readouterr().out
+
+    assert "[dev ] Previewing update" in out
+    assert "[prod] preview succeeded in" in out
+    summary = [line for line in out.splitlines() if line.startswith(("dev ", "prod "))]
+    assert len(summary) == 2
+    assert all(line.endswith("create=3, same=1") for line in summary)
+    assert "OpType" not in out
+
+
+@pytest.mark.skipif(shutil.which("pulumi") is None, reason="needs the pulumi CLI")
+def test_inline_program_against_a_local_backend(tmp_path, monkeypatch):
+    import pulumi
+
+    monkeypatch.setenv("PULUMI_CONFIG_PASSPHRASE", "offline")
+
+    def program():
+        pulumi.export("answer", 42)
+    output = multi_stack.PrefixedOutput(["ci"])
+
+    changes = multi_stack._run_automation("ci", "up", f"file://{tmp_path}", None, output, program=program)
+    assert changes == {"create": 1}
+    assert multi_stack._run_automation("ci", "preview", f"file://{tmp_path}", None, output, program=program) == {
+        "same": 1}
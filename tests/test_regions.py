@@ -0,0 +1,69 @@
+import collections
+import ipaddress
+import itertools
+
+US_WEST_2 = {
+    "region": "us-west-2",
+    "amiId": "ami-0a1b2c3d4e5f60718",
+    "certificateArn": "arn:aws:acm:us-west-2:685750396583:certificate/offline",
+}
+REGIONS = ["us-east-1", US_WEST_2]
+FIVE_REGIONS = ["us-east-1", *({"region": region, "amiId": "ami-0a1b2c3d4e5f60718",
+                                "certificateArn": f"arn:aws:acm:{region}:685750396583:certificate/offline"}
+                               for region in ("us-west-2", "eu-west-1", "eu-central-1", "ap-southeast-1"))]
+TIERS = ("Networking", "Data", "Compute")
+
+
+def test_every_urn_is_unique(synthesize):
+    synthesis = synthesize("dev", regions=REGIONS)
+    names = collections.Counter((r["type"], r["name"]) for r in synthesis.registrations.values())
+    assert [key for key, count in names.items() if count > 1] == []
+
+
+def test_extra_region_tiers_keep_the_component_types(synthesize):
+    synthesis = synthesize("dev", regions=REGIONS)
+
+    for tier in TIERS:
+        type_ = f"pulumi_python:components:{tier}"
+        assert synthesis.names(type_) == sorted([tier.lower(), f"{tier.lower()}-us-west-2"])
+    assert not [r for r in synthesis.registrations.values() if ":us-west-2:" in r["type"]]
+
+
+def test_extra_region_children_are_named_after_the_region(synthesize):
+    synthesis = synthesize("dev", regions=REGIONS)
+    compute = synthesis.urn("pulumi_python:components:Compute", "compute-us-west-2")
+
+    children = [r["name"] for r in synthesis.registrations.values() if r["parent"] == compute]
+    assert children and all(name.endswith("-us-west-2") for name in children)
+    assert synthesis.state("aws:ec2/vpc:Vpc", "vpc-us-west-2")["cidrBlock"] != \
+        synthesis.state("aws:ec2/vpc:Vpc", "vpc")["cidrBlock"]
+
+
+def test_home_region_urns_do_not_change(synthesize):
+    single = set(synthesize("dev").registrations)
+    multi = set(synthesize("dev", regions=REGIONS).registrations)
+
+    # Adding a region adds resources, but never renames one in the home region
+    assert sorted(single - multi) == []
+
+
+def test_five_regions_get_disjoint_vpc_cidrs(synthesize):
+    synthesis = synthesize("dev", regions=FIVE_REGIONS)
+
+    cidrs = [ipaddress.ip_network(synthesis.state("aws:ec2/vpc:Vpc", name)["cidrBlock"])
+             for name in synthesis.names("aws:ec2/vpc:Vpc")]
+    assert len(cidrs) == 5
+    for first, second in itertools.combinations(cidrs, 2):
+        assert not first.overlaps(second)
+
+
+def test_five_regions_get_one_latency_record_each(synthesize):
+    synthesis = synthesize("dev", regions=FIVE_REGIONS)
+    regions = ["us-east-1", *(entry["region"] for entry in FIVE_REGIONS[1:])]
+
+    records = [synthesis.state("aws:route53/record:Record", name)
+               for name in synthesis.names("aws:route53/record:Record")]
+    assert sorted(record["setIdentifier"] for record in records) == sorted(regions)
+    for record in records:
+        assert record["type"] == "A"
+        assert record["latencyRoutingPolicies"] == [{"region": record["setIdentifier"]}]
@@ -0,0 +1,145 @@
+import ipaddress
+
+import pulumi
+import pytest
+
+from offline import load_stack_config
+from settings import ScalingSettings, is_graviton, load_settings
+
+
+@pytest.fixture
+def stack_settings(mocked_runtime):
+    """Load the Settings of a stack file with config overrides, the way the program does."""
+    def stack_settings(stack: str = "dev", **overrides):
+        mocked_runtime()
+        config, secret_keys = load_stack_config(stack, overrides)
+        pulumi.runtime.set_all_config(config, secret_keys)
+        load_settings.cache_clear()
+        return load_settings()
+    return stack_settings
+
+
+@pytest.fixture
+def secret_reads(monkeypatch):
+    """Names of the secrets read through pulumi.Config so far."""
+    reads = []
+    require_secret = pulumi.Config.require_secret
+
+    def recording_require_secret(self, key):
+        reads.append(key)
+        return require_secret(self, key)
+    monkeypatch.setattr(pulumi.Config, "require_secret", recording_require_secret)
+    return reads
+
+
+def test_values_are_converted_to_native_types(stack_settings):
+    settings = stack_settings("prod")
+
+    assert settings.max_size == 3
+    assert settings.up_threshold == 3.0
+    assert settings.application_port == 5000
+    assert settings.vpc_cidr_block == ipaddress.ip_network("10.0.0.0/16")
+    assert settings.scaling == ScalingSettings()
+    assert settings.aws_profile == "prod"
+
+
+def test_secrets_stay_unresolved_until_a_resource_reads_them(stack_settings, secret_reads):
+    settings = stack_settings()
+
+    assert secret_reads == []
+    assert "db_password" not in vars(settings)
+
+    password = settings.db_password
+    assert isinstance(password, pulumi.Output)
+    assert secret_reads == ["dbPassword"]
+
+    # Later reads reuse the same Output
+    assert settings.db_password is password
+    assert secret_reads == ["dbPassword"]
+
+
+def test_settings_are_loaded_once(stack_settings):
+    settings = stack_settings()
+    assert load_settings() is settings
+
+
+def test_every_problem_is_reported_at_once(stack_settings):
+    with pytest.raises(ValueError) as error:
+        stack_settings(maxSize="many", applicationPort="70000", cap="5", dbConnectionMode="env",
+                       scaling={"mode": "sometimes"})
+
+    message = str(error.value)
+    assert "pulumi_python:maxSize is invalid" in message
+    assert "pulumi_python:scaling is invalid: mode must be one of" in message
+    # Conversion errors stop before the cross-field checks, which need every value
+    assert "dbConnectionMode" not in message
+
+
+def test_cross_field_checks_are_reported_together(stack_settings):
+    with pytest.raises(ValueError) as error:
+        stack_settings(applicationPort="70000", cap="5", dbConnectionMode="env", downThreshold="5")
+
+    message = str(error.value)
+    assert message.startswith("Invalid stack configuration:")
+    for expected in ("application_port must be a TCP port", "cap must be between minSize and maxSize",
+                     "downThreshold must be lower than upThreshold", "dbConnectionMode must be"):
+        assert expected in message
+
+
+# What __main__.py read at import time before settings.py, one require() per key in this order
+ORIGINAL_CONFIG_READS = [
+    ("aws", "profile", False), ("aws", "region", False), ("gcp", "project", False), ("gcp", "region", False),
+    *(("pulumi_python", key, key in ("dbUsername", "dbPassword", "mailgunApiKey")) for key in (
+        "vpcName", "vpcCidrBlock", "internetGatewayName", "publicRtName", "privateRtName", "publicSubnet",
+        "privateSubnet", "publicCidrBlock", "subnetMask", "myParameterGroupName", "dbSubnetGrpName", "engine",
+        "engineVersion", "identifier", "instanceClass", "dbName", "storageType", "allocatedStorage", "dbUsername",
+        "dbPassword", "amiId", "keyPair", "ec2Name", "domainName", "hosted_zone_id", "applicationPort",
+        "listenerPort", "maxSize", "minSize", "cap", "coolDown", "period", "upThreshold", "downThreshold",
+        "snsTopicName", "bucketAccountId", "bucketDisplayName", "gcpBucketName", "location", "mailgunApiKey",
+        "mailgunDomain", "DynamoDbTableName", "lambdaFilePath", "accountId", "sslPolicy", "certificateArnName",
+        "launchTemplateName", "autoScalingGroupName")),
+]
+
+
+def original_loader() -> dict:
+    """The config loading of the original __main__.py: untyped strings, secrets resolved up front."""
+    configs = {namespace: pulumi.Config(namespace) for namespace in ("pulumi_python", "aws", "gcp")}
+    return {(namespace, key): configs[namespace].require_secret(key) if secret else configs[namespace].require(key)
+            for namespace, key, secret in ORIGINAL_CONFIG_READS}
+
+
+def test_original_loader_reads_every_stack_key(stack_settings):
+    stack_settings()
+    assert len(original_loader()) == len(ORIGINAL_CONFIG_READS)
+
+
+@pytest.mark.parametrize("loader", ["original", "lazy", "eager"])
+@pytest.mark.parametrize("stack", ["dev", "prod"])
+def test_startup_time(stack, loader, stack_settings, benchmark):
+    # "original" is the import-time loader settings.py replaced; "eager" also resolves every secret
+    # up front, which is what the original loader did
+    stack_settings(stack)
+    benchmark.group = f"settings {stack}"
+
+    def load():
+        if loader == "original":
+            return original_loader()
+        load_settings.cache_clear()
+        settings = load_settings()
+        if loader == "eager":
+            settings.db_username, settings.db_password, settings.mailgun_api_key
+        return settings
+
+    benchmark(load)
+
+
+@pytest.mark.parametrize("instance_type", ["a1.large", "a1.metal", "t4g.micro", "c7gn.large", "m6gd.xlarge",
+                                           "x2gd.medium", "im4gn.large", "g5g.xlarge", "r8g.2xlarge"])
+def test_graviton_instance_types(instance_type):
+    assert is_graviton(instance_type)
+
+
+@pytest.mark.parametrize("instance_type", ["t3.micro", "t3a.micro", "m5.large", "c5n.large", "g4dn.xlarge",
+                                           "p4d.24xlarge", "inf1.xlarge", "mac1.metal"])
+def test_x86_instance_types(instance_type):
+    assert not is_graviton(instance_type)
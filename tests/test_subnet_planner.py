@@ -0,0 +1,96 @@
+import ipaddress
+import random
+
+import pytest
+
+from subnet_planner import SubnetPlanner, plan_ipv6_subnets, plan_subnets
+
+
+def assert_disjoint(networks):
+    ranges = sorted((int(n.network_address), int(n.broadcast_address)) for n in map(ipaddress.ip_network, networks))
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end < start
+
+
+def plan_10k():
+    planner = SubnetPlanner("10.0.0.0/8")
+    return [planner.allocate(24) for _ in range(10000)]
+
+
+def test_reproduces_the_third_octet_cidrs():
+    # What calculate_subnet_cidr_block gave the dev and prod VPCs: public subnets i, private ones i + 3
+    planner = SubnetPlanner("10.0.0.0/16")
+    public = [str(planner.allocate(24)) for _ in range(3)]
+    private = [str(planner.allocate(24)) for _ in range(3)]
+
+    assert public == ["10.0.0.0/24", "10.0.1.0/24", "10.0.2.0/24"]
+    assert private == ["10.0.3.0/24", "10.0.4.0/24", "10.0.5.0/24"]
+
+
+def test_packs_mixed_prefix_lengths_lowest_address_first():
+    assert plan_subnets("10.0.0.0/16", [24, 26, 25, 26, 24]) == [
+        "10.0.0.0/24", "10.0.1.0/26", "10.0.1.128/25", "10.0.1.64/26", "10.0.2.0/24"]
+
+
+def test_mixed_prefix_lengths_never_overlap():
+    rng = random.Random(6225)
+    planner = SubnetPlanner("10.0.0.0/8")
+    networks = [planner.allocate(rng.randint(20, 28)) for _ in range(2000)]
+    assert_disjoint(networks)
+
+
+def test_reserved_blocks_are_never_allocated():
+    assert plan_subnets("10.0.0.0/16", [24, 24, 24], reserved=["10.0.1.0/24", "10.0.2.128/25"]) == [
+        "10.0.0.0/24", "10.0.3.0/24", "10.0.4.0/24"]
+
+
+def test_reserve_rejects_overlaps_and_foreign_blocks():
+    planner = SubnetPlanner("10.0.0.0/16")
+    planner.allocate(24)
+    with pytest.raises(ValueError, match="overlaps"):
+        planner.reserve("10.0.0.128/25")
+    with pytest.raises(ValueError, match="outside"):
+        planner.reserve("10.1.0.0/24")
+
+
+def test_overlaps():
+    planner = SubnetPlanner("10.0.0.0/16")
+    planner.allocate(24)
+    planner.reserve("10.0.8.0/22")
+
+    assert planner.overlaps("10.0.0.0/16")
+    assert planner.overlaps("10.0.0.7/32")
+    assert planner.overlaps("10.0.10.0/24")
+    assert not planner.overlaps("10.0.1.0/24")
+    assert not planner.overlaps("10.0.12.0/22")
+
+
+def test_exhaustion_and_bad_prefixes():
+    planner = SubnetPlanner("10.0.0.0/23")
+    planner.allocate(24)
+    planner.allocate(24)
+    with pytest.raises(ValueError, match="Exceeded"):
+        planner.allocate(24)
+    with pytest.raises(ValueError, match="does not fit"):
+        planner.allocate(22)
+
+
+def test_ipv6_plan():
+    subnets = plan_ipv6_subnets("2600:1f18:0:ff00::/56", 6)
+
+    assert subnets[:2] == ["2600:1f18:0:ff00::/64", "2600:1f18:0:ff01::/64"]
+    assert all(ipaddress.ip_network(subnet).prefixlen == 64 for subnet in subnets)
+    assert_disjoint(subnets)
+
+
+def test_10k_subnets_do_not_overlap():
+    networks = plan_10k()
+
+    assert len(set(networks)) == 10000
+    assert_disjoint(networks)
+
+
+def test_plan_10k_subnets(benchmark):
+    benchmark.group = "subnet planner"
+    networks = benchmark(plan_10k)
+    assert str(networks[-1]) == "10.39.15.0/24"
@@ -0,0 +1,131 @@
+"""Regression checks on the whole resource graph, for the stack files and every feature flag
+
+Each configuration's resource inventory, dependency edges, key properties and
+`apply` callback count are compared with its file under snapshots/synthesis.
+Record them again after an intended change with `pytest --snapshot-update`.
+"""
+
+import json
+
+import pytest
+
+from offline import run_program
+
+ARM64_AMI_ID = "ami-0f0e0d0c0b0a09080"
+US_WEST_2 = {
+    "region": "us-west-2",
+    "amiId": "ami-0a1b2c3d4e5f60718",
+    "certificateArn": "arn:aws:acm:us-west-2:685750396583:certificate/offline",
+}
+
+# Configuration name -> (stack, config overrides), one per feature flag group
+CONFIGS = {
+    "dev": ("dev", {}),
+    "prod": ("prod", {}),
+    "azs": ("dev", {"azCount": "2", "ipv6Enabled": "true"}),
+    "ssm": ("dev", {"dbConnectionMode": "ssm"}),
+    "target-tracking": ("dev", {"scaling": {"mode": "target-tracking", "targetTracking": {"metric": "requestCount"}}}),
+    "step": ("dev", {"scaling": {"mode": "step"}}),
+    "predictive": ("dev", {"scaling": {"mode": "predictive", "schedules": [
+        {"name": "business-hours", "recurrence": "0 8 * * MON-FRI", "minSize": 2}]}}),
+    "scheduled": ("dev", {"scaling": {"mode": "scheduled", "schedules": [
+        {"name": "night", "recurrence": "0 22 * * *", "desiredCapacity": 1}]}}),
+    "db-proxy": ("dev", {"dbProxyEnabled": "true", "dbConnectionMode": "ssm"}),
+    "db-replicas": ("dev", {"dbReadReplicaCount": "2", "dbMultiAz": "true", "dbPerformanceInsights": "true"}),
+    "db-storage": ("dev", {"instanceClass": "db.m6g.large", "allocatedStorage": "400", "dbStorageIops": "12000",
+                           "dbStorageThroughput": "500", "dbMaxAllocatedStorage": "1000"}),
+    "cache": ("dev", {"cacheEnabled": "true", "dbConnectionMode": "ssm"}),
+    "lambda": ("dev", {"lambdaArchitecture": "arm64", "lambdaProvisionedConcurrency": "2",
+                       "lambdaReservedConcurrency": "10"}),
+    "sqs": ("dev", {"sqsBufferEnabled": "true", "sqsMaxConcurrency": "5"}),
+    "dynamodb": ("dev", {"dynamoDbBillingMode": "PROVISIONED", "dynamoDbTtlAttribute": "expiresAt",
+                         "dynamoDbIndexes": [{"name": "byEmail", "hashKey": "email"}], "daxEnabled": "true"}),
+    "regions": ("dev", {"regions": ["us-east-1", US_WEST_2]}),
+    "cloudfront": ("dev", {"cloudFrontEnabled": "true", "cloudFrontBehaviors": [{"pathPattern": "/static/*"}]}),
+    "load-balancer": ("dev", {"loadBalancer": {"algorithm": "least_outstanding_requests", "slowStart": 0,
+                                               "httpRedirect": False}}),
+    "mixed-instances": ("dev", {"instanceTypes": ["t3.micro", "t4g.micro"], "arm64AmiId": ARM64_AMI_ID,
+                                "onDemandPercentageAboveBase": "50", "capacityRebalance": "true"}),
+    "warm-pool": ("dev", {"warmPoolEnabled": "true", "warmPoolMinSize": "1"}),
+    "private": ("dev", {"computeTopology": "private", "natGateways": "single", "vpcEndpoints": ["s3", "dynamodb"]}),
+    "private-no-nat": ("dev", {"computeTopology": "private", "natGateways": "none", "vpcEndpoints": [
+        "s3", "ssm", "ssmmessages", "ec2messages", "sns", "logs", "monitoring"]}),
+    "monitoring": ("dev", {"monitoringEnabled": "true", "alarmEmail": "ops@example.com",
+                           "sqsBufferEnabled": "true", "dynamoDbIndexes": [{"name": "byEmail", "hashKey": "email"}]}),
+}
+
+# Properties whose drift changes what gets deployed, by (type, name)
+KEY_PROPERTIES = {
+    ("aws:ec2/vpc:Vpc", "vpc"): ("cidrBlock",),
+    ("aws:rds/instance:Instance", "mydbinstance"): (
+        "instanceClass", "engine", "engineVersion", "allocatedStorage", "storageType", "maxAllocatedStorage",
+        "multiAz", "publiclyAccessible"),
+    ("aws:rds/parameterGroup:ParameterGroup", "myparametergroup"): ("family", "parameters"),
+    ("aws:lb/loadBalancer:LoadBalancer", "appLoadBalancer"): ("internal", "idleTimeout", "clientKeepAlive"),
+    ("aws:lb/targetGroup:TargetGroup", "targetGroup"): (
+        "port", "protocol", "deregistrationDelay", "slowStart", "loadBalancingAlgorithmType", "healthCheck"),
+    ("aws:lb/listener:Listener", "listener"): ("port", "protocol", "sslPolicy", "certificateArn"),
+    ("aws:ec2/launchTemplate:LaunchTemplate", "launch_template"): (
+        "imageId", "instanceType", "blockDeviceMappings", "networkInterfaces"),
+    ("aws:autoscaling/group:Group", "webAppAutoScalingGroup"): (
+        "minSize", "maxSize", "desiredCapacity", "vpcZoneIdentifiers"),
+    ("aws:lambda/function:Function", "myLambdaFunction"): ("runtime", "handler", "memorySize", "timeout", "architectures"),
+    ("aws:dynamodb/table:Table", "myDynamoDbTable"): ("name", "billingMode", "hashKey"),
+    ("aws:route53/record:Record", "aRecord"): ("name", "type", "aliases", "setIdentifier", "latencyRoutingPolicies"),
+    ("aws:route53/record:Record", "aRecord-us-west-2"): (
+        "name", "type", "aliases", "setIdentifier", "latencyRoutingPolicies"),
+}
+
+
+def _node(registration: dict) -> str:
+    return f"{registration['type']}::{registration['name']}"
+
+
+def graph_snapshot(synthesis) -> dict:
+    """The parts of an evaluation that must not change between runs: inventory, edges, key properties and applies."""
+    registrations = synthesis.registrations
+    nodes = {urn: _node(registration) for urn, registration in registrations.items()}
+
+    inventory = {}
+    for registration in registrations.values():
+        inventory[registration["type"]] = inventory.get(registration["type"], 0) + 1
+
+    edges = set()
+    for urn, registration in registrations.items():
+        for dependency in registration["dependencies"]:
+            if dependency in nodes:
+                edges.add(f"{nodes[urn]} -> {nodes[dependency]}")
+        if registration["parent"] in nodes:
+            edges.add(f"{nodes[urn]} -> parent {nodes[registration['parent']]}")
+
+    properties = {}
+    for urn, registration in registrations.items():
+        keys = KEY_PROPERTIES.get((registration["type"], registration["name"]))
+        if keys and urn in synthesis.monitor.resources:
+            state = synthesis.monitor.resources[urn].state
+            properties[_node(registration)] = {key: state.get(key) for key in keys}
+
+    return {
+        "inventory": dict(sorted(inventory.items())),
+        "edges": sorted(edges),
+        # Round-trip through JSON so numbers and nested values compare like the stored snapshot
+        "properties": json.loads(json.dumps(properties, sort_keys=True, default=str)),
+        "applyCallbacks": synthesis.apply_callbacks,
+    }
+
+
+@pytest.mark.parametrize("config", sorted(CONFIGS))
+def test_resource_graph(config, synthesize, snapshot):
+    stack, overrides = CONFIGS[config]
+    snapshot(f"synthesis/{config}.json", graph_snapshot(synthesize(stack, **overrides)))
+
+
+def test_resource_graph_is_deterministic(synthesize):
+    assert graph_snapshot(synthesize("dev")) == graph_snapshot(synthesize("dev"))
+
+
+@pytest.mark.parametrize("stack", ["dev", "prod"])
+def test_synthesis_time(stack, benchmark):
+    # Compare against earlier runs with --benchmark-autosave and --benchmark-compare
+    benchmark.group = "synthesis"
+    benchmark.pedantic(run_program, args=(stack,), kwargs={"preview": False}, rounds=5, warmup_rounds=1)
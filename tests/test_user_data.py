@@ -0,0 +1,54 @@
+import base64
+import gzip
+import random
+
+import pytest
+
+import user_data
+from user_data import USER_DATA_LIMIT, UserDataTooLargeError, render_script, render_user_data
+
+LAUNCH_TEMPLATE = ("aws:ec2/launchTemplate:LaunchTemplate", "launch_template")
+ENV = {"DBHOST": "db.internal", "DBPORT": 5432, "PORT": 5000}
+
+
+@pytest.fixture(autouse=True)
+def empty_memo(monkeypatch):
+    monkeypatch.setattr(user_data, "_rendered", {})
+
+
+def decompress(encoded: str) -> str:
+    return gzip.decompress(base64.b64decode(encoded)).decode()
+
+
+@pytest.mark.parametrize("mode", ["inline", "ssm"])
+def test_rendered_document(mode, synthesize, snapshot):
+    encoded = synthesize("dev", dbConnectionMode=mode).state(*LAUNCH_TEMPLATE)["userData"]
+    if isinstance(encoded, dict):
+        encoded = encoded["value"]
+    snapshot(f"user_data/{mode}.txt", decompress(encoded))
+
+
+def test_output_is_byte_identical_across_renders():
+    first = render_user_data(ENV)
+    user_data._rendered.clear()
+    assert render_user_data(dict(reversed(ENV.items()))) != first
+    assert render_user_data(dict(ENV)) == first
+
+
+def test_gzip_header_has_no_timestamp():
+    compressed = base64.b64decode(render_user_data(ENV))
+    assert compressed[:2] == b"\x1f\x8b"
+    assert compressed[4:8] == b"\x00\x00\x00\x00"
+
+
+def test_values_are_quoted_unless_expanded():
+    assert "<<'EOF'\nDBHOST=db.internal\nDBPORT=5432\nPORT=5000\nEOF" in render_script(ENV)
+    assert "<<EOF\nDBHOST=$(param host)\nEOF" in render_script({"DBHOST": "$(param host)"}, expand=True)
+
+
+def test_oversized_user_data_is_rejected():
+    rng = random.Random(7)
+    # Random hex barely compresses, so this stays above the limit after gzip
+    env = {f"KEY{i}": "%064x" % rng.getrandbits(256) for i in range(USER_DATA_LIMIT // 40)}
+    with pytest.raises(UserDataTooLargeError, match="EC2 allows at most 16384"):
+        render_user_data(env)
@@ -0,0 +1,83 @@
+"""Rendering of instance user_data as compressed multipart cloud-init"""
+
+import base64
+import gzip
+import hashlib
+import json
+
+# EC2 rejects user_data above 16 KB, measured before base64 encoding
+USER_DATA_LIMIT = 16 * 1024
+
+ENV_FILE = "/home/ec2-user/webapp/.env"
+
+_BOUNDARY = "==WEBAPP-USER-DATA=="
+
+_SCRIPT_TEMPLATE = """#!/bin/bash
+ENV_FILE="{env_file}"
+{prelude}
+# Create or overwrite the environment file in a single write, readable by its owner only
+umask 077
+cat > "$ENV_FILE" <<{delimiter}
+{env}
+EOF
+
+# Optionally, you can change the owner and group of the file if needed
+sudo chown ec2-user:ec2-group $ENV_FILE
+
+# Adjust the permissions of the environment file
+sudo chmod 600 $ENV_FILE
+
+# Configure and restart the CloudWatch Agent
+sudo /opt/aws/amazon-cloudwatch-agent/bin/amazon-cloudwatch-agent-ctl -a fetch-config -m ec2 -c file:/opt/aws/amazon-cloudwatch-agent/etc/amazon-cloudwatch-agent.json -s
+sudo systemctl restart amazon-cloudwatch-agent
+"""
+
+_MULTIPART_TEMPLATE = """Content-Type: multipart/mixed; boundary="{boundary}"
+MIME-Version: 1.0
+
+--{boundary}
+Content-Type: text/x-shellscript; charset="utf-8"
+MIME-Version: 1.0
+Content-Disposition: attachment; filename="webapp-env.sh"
+
+{script}
+--{boundary}--
+"""
+
+_rendered = {}
+
+
+class UserDataTooLargeError(ValueError):
+    """Raised when rendered user_data does not fit in EC2's 16 KB limit."""
+
+
+def render_script(env: dict, prelude: str = "", expand: bool = False) -> str:
+    """Bash script that writes `env` to the web app's .env file.
+
+    Values are written verbatim unless `expand` is set, in which case the shell
+    expands them, so they can refer to variables or functions set up in `prelude`.
+    """
+    return _SCRIPT_TEMPLATE.format(
+        env_file=ENV_FILE,
+        prelude=f"\n{prelude.strip()}\n" if prelude else "",
+        delimiter="EOF" if expand else "'EOF'",
+        env="\n".join(f"{key}={value}" for key, value in env.items()),
+    )
+
+
+def render_user_data(env: dict, prelude: str = "", expand: bool = False) -> str:
+    """Render the env script as gzip-compressed multipart cloud-init, base64 encoded.
+
+    Rendering is deterministic and memoized on a hash of the inputs, so unchanged
+    inputs give byte-identical output and never show up as a launch template diff.
+    """
+    key = hashlib.sha256(json.dumps([env, prelude, expand]).encode("utf-8")).hexdigest()
+    if key not in _rendered:
+        document = _MULTIPART_TEMPLATE.format(boundary=_BOUNDARY, script=render_script(env, prelude, expand))
+        # A fixed mtime keeps the gzip header, and so the output, stable across runs
+        compressed = gzip.compress(document.encode("utf-8"), compresslevel=9, mtime=0)
+        if len(compressed) > USER_DATA_LIMIT:
+            raise UserDataTooLargeError(
+                f"user_data is {len(compressed)} bytes after compression, EC2 allows at most {USER_DATA_LIMIT}")
+        _rendered[key] = base64.b64encode(compressed).decode("utf-8")
+    return _rendered[key]